@@ -3,11 +3,13 @@ from sqlalchemy.orm import Session
 from typing import Dict, Any, List
 from ..dependencies import get_db, get_current_user
 from ..services.model_manager import ModelManager
+from ..services.model_versioning import ModelVersionManager
 from ..models.sql_models import Model, User
 from ..schemas.model import ModelCreate, ModelResponse, ModelUpdate
 
 router = APIRouter()
 model_manager = ModelManager()
+version_manager = ModelVersionManager(model_manager)
 
 @router.post("/models/upload", response_model=ModelResponse)
 async def upload_model(
@@ -102,7 +104,8 @@ async def load_model(
         raise HTTPException(status_code=404, detail="Model not found")
     
     try:
-        await model_manager.load_model(model_id)
+        # Loaded models are served through a handle so rollbacks swap them in place
+        await model_manager.get_handle(model_id)
         return {"message": "Model loaded successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -120,3 +123,39 @@ async def unload_model(
     
     await model_manager.unload_model(model_id)
     return {"message": "Model unloaded successfully"}
+
+@router.post("/models/{model_id}/versions")
+async def create_model_version(
+    model_id: str,
+    version_data: Dict[str, Any],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Snapshot the model's current weights and configuration as a new version."""
+    model = db.query(Model).filter(Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    try:
+        version = await version_manager.create_version(db, model_id, version_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"hash": version.hash, "status": version.status}
+
+@router.post("/models/{model_id}/versions/{version_hash}/rollback")
+async def rollback_model_version(
+    model_id: str,
+    version_hash: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Serve a stored version again, hot-swapping any loaded instance of the model."""
+    model = db.query(Model).filter(Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    success = await version_manager.rollback_version(db, model_id, version_hash)
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to roll back model version")
+    
+    return {"message": "Model rolled back successfully"}
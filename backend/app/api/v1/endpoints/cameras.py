@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket
+from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, Header, Query
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional, Dict
 from sqlalchemy.orm import Session
 from ....models.sql_models import Camera
 from ....schemas.camera import CameraCreate, CameraUpdate, CameraResponse
 from ....core.deps import get_db, get_current_user
+from ....core.config import settings
 from ....services.camera_manager import CameraManager
-import cv2
+from ....services.frame_hub import frame_hub
+from ....services.preview_flow import preview_flow
+import time
 import asyncio
 import logging
 
@@ -151,36 +155,153 @@ async def get_camera_status(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _owned_camera(db: Session, camera_id: int, current_user) -> Camera:
+    camera = db.query(Camera).filter(
+        Camera.id == camera_id,
+        Camera.owner_id == current_user.id
+    ).first()
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera
+
+@router.get("/{camera_id}/snapshot")
+async def get_camera_snapshot(
+    camera_id: int,
+    tier: str = 'preview',
+    quality: int = Query(settings.PREVIEW_JPEG_QUALITY, ge=10, le=100),
+    if_none_match: Optional[str] = Header(None),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Latest frame as JPEG from the shared frame cache; 304 when the client's ETag is current"""
+    _owned_camera(db, camera_id, current_user)
+    if tier not in frame_hub.tiers and tier != 'full':
+        raise HTTPException(status_code=400, detail=f"Unknown frame tier '{tier}'")
+    tiered = frame_hub.latest(camera_id)
+    if tiered is None:
+        raise HTTPException(status_code=404, detail="No frame available; is the stream running?")
+
+    etag = tiered.etag(tier, quality)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=await frame_hub.encode(tiered, tier, quality),
+        media_type='image/jpeg',
+        headers=headers
+    )
+
+@router.get("/{camera_id}/mjpeg")
+async def stream_camera_mjpeg(
+    camera_id: int,
+    tier: str = 'preview',
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """MJPEG (multipart/x-mixed-replace) live feed of an already-running stream
+
+    Viewers only subscribe to the shared frame hub; the stream itself is
+    started and stopped through the stream endpoints, never per viewer.
+    """
+    _owned_camera(db, camera_id, current_user)
+    if tier not in frame_hub.tiers and tier != 'full':
+        raise HTTPException(status_code=400, detail=f"Unknown frame tier '{tier}'")
+    if frame_hub.latest(camera_id) is None:
+        raise HTTPException(status_code=409, detail="Camera stream is not running")
+
+    async def parts():
+        # Same flow control as the WebSocket preview; TCP backpressure times each part
+        viewer = preview_flow.open(camera_id, tier)
+        subscription = frame_hub.subscribe(camera_id, viewer.tier)
+        try:
+            while True:
+                await viewer.wait_turn()
+                tiered = await subscription.next(timeout=1.0)
+                if tiered is None and frame_hub.latest(camera_id) is None:
+                    # The stream was stopped; end the response
+                    break
+                if tiered is None or viewer.is_stale(tiered.captured_at):
+                    continue
+                data = await frame_hub.encode(tiered, viewer.tier, viewer.quality)
+                started = time.monotonic()
+                yield (
+                    b'--frame\r\nContent-Type: image/jpeg\r\n'
+                    b'Content-Length: ' + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n'
+                )
+                viewer.record_send(time.monotonic() - started, len(data))
+                subscription.tier = viewer.tier
+        finally:
+            subscription.close()
+            preview_flow.close(viewer)
+
+    return StreamingResponse(
+        parts(),
+        media_type='multipart/x-mixed-replace; boundary=frame',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
 @router.websocket("/{camera_id}/ws")
 async def camera_websocket(
     websocket: WebSocket,
     camera_id: int,
-    db: Session = Depends(get_db)
+    tier: str = 'preview'
 ):
-    """WebSocket endpoint for real-time camera feed"""
+    """WebSocket feed of an already-running stream, starting at a tier (full, preview, thumbnail)
+
+    Like the MJPEG feed, viewers only subscribe to the shared frame hub;
+    streams are started and stopped through the stream endpoints.
+    """
     await websocket.accept()
-    camera_manager = CameraManager(db)
     
     try:
-        # Start the stream if not already started
-        if not await camera_manager.start_stream(camera_id):
-            await websocket.close(code=1008, reason="Failed to start camera stream")
+        if tier not in frame_hub.tiers and tier != 'full':
+            await websocket.close(code=1008, reason=f"Unknown frame tier '{tier}'")
+            return
+        if frame_hub.latest(camera_id) is None:
+            await websocket.close(code=1008, reason="Camera stream is not running")
             return
 
-        while True:
-            try:
-                # Get the latest frame
-                frame = camera_manager.active_streams[camera_id]['last_frame']
-                if frame is not None:
-                    # Encode frame to JPEG
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    # Send frame
-                    await websocket.send_bytes(buffer.tobytes())
-                await asyncio.sleep(0.033)  # ~30 FPS
-            except Exception as e:
-                logger.error(f"Error sending frame: {str(e)}")
-                break
+        # Quality, tier and frame rate adapt to how fast this socket drains
+        viewer = preview_flow.open(camera_id, tier)
+        subscription = frame_hub.subscribe(camera_id, viewer.tier)
+        # Nothing is sent while no frames arrive, so a disconnect is noticed by reading
+        receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+        try:
+            while not receiver.done():
+                try:
+                    await viewer.wait_turn()
+                    # Only the newest frame is taken; frames published meanwhile are skipped
+                    tiered = await subscription.next(timeout=1.0)
+                    if tiered is None and frame_hub.latest(camera_id) is None:
+                        # The stream was stopped or its capture died
+                        break
+                    if tiered is None or viewer.is_stale(tiered.captured_at):
+                        continue
+                    # Encoded once per frame, tier and quality, shared with every other viewer
+                    data = await frame_hub.encode(tiered, viewer.tier, viewer.quality)
+                    started = time.monotonic()
+                    await websocket.send_bytes(data)
+                    viewer.record_send(time.monotonic() - started, len(data))
+                    subscription.tier = viewer.tier
+                except Exception as e:
+                    logger.error(f"Error sending frame: {str(e)}")
+                    break
+        finally:
+            receiver.cancel()
+            subscription.close()
+            preview_flow.close(viewer)
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
     finally:
-        await websocket.close()
+        try:
+            await websocket.close()
+        except RuntimeError:
+            # Already closed by the client
+            pass
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Read (and ignore) client messages until the socket disconnects."""
+    while True:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            return
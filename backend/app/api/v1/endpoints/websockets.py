@@ -1,41 +1,53 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from ....services.websocket_service import manager
 from ....services.video_analytics_service import video_analytics_service
+from ....services.frame_tracing import frame_tracer
+from ....services.pipeline_metrics import pipeline_metrics
+from ....services.frame_protocol import decode_message, decode_image, FrameProtocolError
+from ....services.frame_ingest import FrameSubmission, LatestFrameSlot
+from typing import Optional
+import asyncio
 import logging
 import json
-import cv2
-import numpy as np
 import base64
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Trace and metrics key for every browser frame. Camera ids and module names
+# in messages come from the client and would give each value its own series
+# and trace sequence, so none of them is used as a key
+WEBSOCKET_SOURCE = 'websocket'
+
 @router.websocket("/ws/{module}")
-async def websocket_endpoint(websocket: WebSocket, module: str):
+async def websocket_endpoint(websocket: WebSocket, module: str, ingest: str = 'latest'):
+    """Frames arrive as binary protocol messages (see frame_protocol) or legacy base64 JSON.
+
+    With ``ingest=latest`` (default) receiving runs alongside processing and
+    only the newest waiting frame is processed; ``ingest=inline`` processes
+    every frame before reading the next message.
+    """
     await manager.connect(websocket, module)
+    slot = LatestFrameSlot() if ingest == 'latest' else None
+    consumer = asyncio.create_task(_consume_latest(websocket, slot)) if slot else None
     try:
         while True:
-            # Receive frame data
-            data = await websocket.receive_text()
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                raise WebSocketDisconnect(message.get('code', 1000))
             try:
-                frame_data = json.loads(data)
-                if frame_data['type'] == 'video_frame':
-                    # Decode base64 frame
-                    frame_bytes = base64.b64decode(frame_data['frame'])
-                    nparr = np.frombuffer(frame_bytes, np.uint8)
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    
-                    # Process frame
-                    results = await video_analytics_service.process_frame(frame, module)
-                    
-                    # Send results back to client
-                    await manager.send_personal_message({
-                        'type': 'analysis_results',
-                        'results': results
-                    }, websocket)
+                submission = _parse_message(message, module)
+                if submission is None:
+                    continue
+                if slot is not None:
+                    slot.put(submission)
+                else:
+                    await _process_frame(websocket, submission)
                     
             except json.JSONDecodeError:
                 logger.error("Invalid JSON data received")
+            except FrameProtocolError as e:
+                logger.error(f"Invalid binary frame received: {str(e)}")
             except Exception as e:
                 logger.error(f"Error processing frame: {str(e)}")
                 
@@ -44,6 +56,60 @@ async def websocket_endpoint(websocket: WebSocket, module: str):
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
         manager.disconnect(websocket, module)
+    finally:
+        if consumer:
+            consumer.cancel()
+
+def _parse_message(message: dict, module: str) -> Optional[FrameSubmission]:
+    """Frame submission for a video frame message; control messages are handled here."""
+    if message.get('bytes') is not None:
+        # Binary frame: header now, JPEG decoded later straight from the received buffer
+        header, payload = decode_message(message['bytes'])
+        # The connection's path picks the module; a header may only repeat it
+        if header.module and header.module != module:
+            raise FrameProtocolError(f"Frame for module {header.module!r} sent on the {module!r} socket")
+        # Stamp the frame on arrival; the client's own capture time is echoed back
+        trace = frame_tracer.start_frame(WEBSOCKET_SOURCE, source_ts=header.timestamp)
+        return FrameSubmission(module, payload, 'jpeg', trace, header.seq)
+
+    frame_data = json.loads(message.get('text') or '')
+    if frame_data['type'] == 'video_frame':
+        trace = frame_tracer.start_frame(WEBSOCKET_SOURCE, source_ts=frame_data.get('captured_at'))
+        return FrameSubmission(module, frame_data['frame'], 'base64', trace)
+    elif frame_data['type'] == 'trace_ack':
+        # Browser echoes the trace of a rendered message to close the glass-to-glass span
+        frame_tracer.record_client_ack(frame_data.get('trace'))
+    return None
+
+async def _consume_latest(websocket: WebSocket, slot: LatestFrameSlot):
+    while True:
+        submission = await slot.get()
+        try:
+            await _process_frame(websocket, submission)
+        except Exception as e:
+            logger.error(f"Error processing frame: {str(e)}")
+
+async def _process_frame(websocket: WebSocket, submission: FrameSubmission):
+    # Decode base64 frame
+    with pipeline_metrics.time_stage(submission.trace.camera_id, 'decode'):
+        payload = submission.payload
+        if submission.encoding == 'base64':
+            payload = base64.b64decode(payload)
+        frame = decode_image(payload)
+    if frame is None:
+        raise ValueError("Frame could not be decoded")
+    
+    # Process frame
+    results = await video_analytics_service.process_frame(frame, submission.module, submission.trace)
+    
+    # Send results back to client
+    response = {
+        'type': 'analysis_results',
+        'results': results
+    }
+    if submission.client_seq is not None:
+        response['seq'] = submission.client_seq
+    await manager.send_personal_message(frame_tracer.stamp(response, submission.trace), websocket)
 
 @router.websocket("/ws/stream/{camera_id}")
 async def camera_stream(websocket: WebSocket, camera_id: str):
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict
 import os
 from pathlib import Path
 
@@ -25,6 +25,83 @@ class Settings(BaseSettings):
     # Camera Settings
     DEFAULT_FRAME_RATE: int = 30
     DEFAULT_RESOLUTION: tuple = (1280, 720)
+    # Downscaled tiers produced once per captured frame, by maximum width
+    FRAME_TIERS: Dict[str, int] = {
+        'inference': 640,
+        'preview': 960,
+        'thumbnail': 320
+    }
+    PREVIEW_JPEG_QUALITY: int = 80
+    PREVIEW_SEND_BUDGET: float = 0.5  # fraction of a viewer's frame interval a send may take
+    PREVIEW_STALE_SECONDS: float = 1.0  # frames older than this are skipped, not sent
+    
+    # Model Monitoring Settings
+    PREDICTION_BATCH_SIZE: int = 500
+    PREDICTION_FLUSH_INTERVAL: float = 1.0  # seconds
+    PREDICTION_QUEUE_SIZE: int = 20000
+    METRICS_BUCKET_SECONDS: int = 60
+    METRICS_FLUSH_INTERVAL: float = 10.0  # seconds
+    METRICS_ROLLUP_RESOLUTIONS: List[int] = [60, 3600, 86400]  # 1 minute, 1 hour, 1 day
+    REPORT_CHUNK_SIZE: int = 5000
+    REPORT_MAX_CHART_POINTS: int = 1000
+    
+    # Drift Detection Settings
+    DRIFT_REFERENCE_SIZE: int = 5000  # detections in the reference window
+    DRIFT_WINDOW_SECONDS: float = 3600.0
+    DRIFT_WINDOW_SLOTS: int = 12
+    DRIFT_MIN_SAMPLES: int = 500
+    DRIFT_MAX_CLASSES: int = 100
+    DRIFT_PSI_THRESHOLD: float = 0.2
+    DRIFT_KS_THRESHOLD: float = 0.15
+    
+    # Frame Tracing Settings
+    TRACE_SAMPLE_RATE: float = 0.05  # fraction of frames recording latency spans
+    
+    # Readiness Thresholds
+    READY_MAX_FRAME_AGE: float = 10.0  # seconds since a camera's last frame
+    READY_MAX_INFERENCE_BACKLOG: int = 25  # frames waiting in a camera queue
+    READY_MAX_CONSUMER_LAG: int = 1000  # Kafka messages behind
+    READY_MAX_WRITER_FILL: float = 0.8  # fraction of a DB writer queue in use
+    
+    # Overload Control Settings
+    OVERLOAD_TARGET_LATENCY: float = 0.5  # seconds of queue wait plus inference per frame
+    OVERLOAD_RESTORE_RATIO: float = 0.6  # restore quality below this fraction of the target
+    OVERLOAD_INTERVAL: float = 2.0  # seconds between control steps
+    
+    # Multi-tenant Inference Scheduling
+    INFERENCE_WORKERS: int = 4
+    TENANT_DEFAULT_WEIGHT: float = 1.0
+    TENANT_WEIGHTS: Dict[str, float] = {}  # owner id -> weight
+    TENANT_MAX_QUEUE: int = 8  # queued inference jobs per owner
+    TENANT_MAX_INFLIGHT: int = 0  # concurrent jobs per owner, 0 for no cap
+    INFERENCE_FRAME_DEADLINE: float = 2.0  # seconds from capture a camera thread waits for a result
+    
+    # Per-camera analysis schedule overrides, e.g. {"emotions": {"target_fps": 0.5}}
+    ANALYSIS_SCHEDULE: Dict[str, Dict[str, float]] = {}
+    
+    # Compute Executor Settings
+    COMPUTE_THREADS: int = 4  # OpenCV/ONNX/torch work that releases the GIL
+    COMPUTE_PROCESSES: int = 2  # Python-heavy work; 0 runs it on threads instead
+    COMPUTE_MAX_PENDING: int = 64  # queued or running calls per pool
+    
+    # Camera Pipeline Settings
+    PIPELINE_QUEUE_SIZE: int = 4  # frames buffered between pipeline stages
+    PIPELINE_STAGE_WORKERS: Dict[str, int] = {
+        'preprocess': 1,
+        'inference': 2,
+        'postprocess': 1,
+        'persistence': 1
+    }
+    
+    # WebSocket Broadcast Settings
+    BROADCAST_QUEUE_SIZE: int = 32  # outbound messages buffered per client
+    BROADCAST_OVERFLOW: str = 'drop_oldest'  # 'drop_oldest', 'drop_newest' or 'evict'
+    BROADCAST_MAX_DROPS: int = 256  # consecutive drops before a slow client is evicted
+    BROADCAST_SEND_TIMEOUT: float = 5.0  # a single send stalled this long evicts the client
+    
+    # Preprocessing Buffers
+    PREPROCESS_BUFFER_RING: int = 8  # buffers per preprocessing plan; outputs stay valid this many frames
+    PREPROCESS_MAX_BUFFER_BYTES: int = 512 * 1024 * 1024  # over this, least recently used plans are released
     
     class Config:
         case_sensitive = True
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -123,3 +123,26 @@ class AttentionRecord(Base):
     
     # Relationships
     class_ = relationship("Class", back_populates="attention_records")
+
+class ModelMetricsAggregate(Base):
+    __tablename__ = "model_metrics_aggregates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_id = Column(String, index=True)
+    metric_name = Column(String)
+    resolution = Column(Integer)  # bucket width in seconds
+    bucket_start = Column(DateTime)
+    count = Column(Integer, default=0)
+    sum = Column(Float, default=0.0)
+    min = Column(Float)
+    max = Column(Float)
+    histogram = Column(JSON, nullable=True)  # bucket counts for latency metrics
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_model_metrics_aggregates_lookup",
+            "model_id", "resolution", "bucket_start", "metric_name",
+            unique=True
+        ),
+    )
@@ -9,6 +9,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from ..core.config import settings
+from .compute_executor import compute_executor
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +25,13 @@ class AdvancedAnalytics:
     ) -> Dict[str, Any]:
         """Analyze movement patterns from object detections."""
         try:
-            # Extract trajectories
-            trajectories = self._extract_trajectories(detections)
-            
-            # Cluster trajectories to identify common paths
-            clusters = self._cluster_trajectories(trajectories)
-            
-            # Calculate movement statistics
-            stats = self._calculate_movement_stats(trajectories)
+            # Trajectory clustering is Python-heavy, so it runs in a worker process
+            trajectories, clusters, stats = await compute_executor.run_cpu(
+                AdvancedAnalytics._summarize_movement, detections
+            )
             
             # Update heat map
-            self._update_heat_map(camera_id, trajectories)
+            await compute_executor.run(self._update_heat_map, camera_id, trajectories)
             
             return {
                 'common_paths': clusters,
@@ -50,27 +47,9 @@ class AdvancedAnalytics:
     ) -> Dict[str, Any]:
         """Detect anomalies in behavior patterns."""
         try:
-            # Convert data to time series
-            ts_data = pd.DataFrame(historical_data)
-            
-            # Calculate statistical measures
-            mean = ts_data.mean()
-            std = ts_data.std()
-            
-            # Detect anomalies using Z-score
-            z_scores = np.abs((current_data - mean) / std)
-            anomalies = z_scores > 3  # 3 standard deviations
-            
-            # Analyze temporal patterns
-            temporal_anomalies = self._detect_temporal_anomalies(
-                current_data, historical_data
+            return await compute_executor.run_cpu(
+                AdvancedAnalytics._score_anomalies, current_data, historical_data
             )
-            
-            return {
-                'statistical_anomalies': anomalies.tolist(),
-                'temporal_anomalies': temporal_anomalies,
-                'confidence_scores': (1 - (z_scores / 10)).clip(0, 1).tolist()
-            }
         except Exception as e:
             logger.error(f"Error detecting anomalies: {str(e)}")
             return {}
@@ -81,7 +60,9 @@ class AdvancedAnalytics:
         """Analyze behavior patterns of detected objects."""
         try:
             # Extract object interactions
-            interactions = self._analyze_object_interactions(detections)
+            interactions = await compute_executor.run_cpu(
+                AdvancedAnalytics._analyze_object_interactions, detections
+            )
             
             # Analyze dwell time
             dwell_analysis = self._analyze_dwell_time(detections)
@@ -112,12 +93,11 @@ class AdvancedAnalytics:
     ) -> Dict[str, Any]:
         """Generate occupancy analytics for defined zones."""
         try:
+            zone_counts = await compute_executor.run(self._count_objects_in_zones, detections, zones)
             zone_occupancy = {}
             for zone in zones:
                 # Count objects in each zone
-                objects_in_zone = self._count_objects_in_zone(
-                    detections, zone['coordinates']
-                )
+                objects_in_zone = zone_counts[zone['id']]
                 
                 # Calculate occupancy percentage
                 occupancy = (objects_in_zone / zone['capacity']) * 100
@@ -137,8 +117,44 @@ class AdvancedAnalytics:
             logger.error(f"Error generating occupancy analytics: {str(e)}")
             return {}
 
+    @staticmethod
+    def _summarize_movement(detections: List[Dict[str, Any]]) -> tuple:
+        """Trajectories, clusters and statistics; runs in a compute process."""
+        trajectories = AdvancedAnalytics._extract_trajectories(detections)
+        clusters = AdvancedAnalytics._cluster_trajectories(trajectories)
+        stats = AdvancedAnalytics._calculate_movement_stats(trajectories)
+        return trajectories, clusters, stats
+
+    @staticmethod
+    def _score_anomalies(
+        current_data: Dict[str, Any], historical_data: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Z-score and temporal anomaly detection; runs in a compute process."""
+        # Convert data to time series
+        ts_data = pd.DataFrame(historical_data)
+        
+        # Calculate statistical measures
+        mean = ts_data.mean()
+        std = ts_data.std()
+        
+        # Detect anomalies using Z-score
+        z_scores = np.abs((current_data - mean) / std)
+        anomalies = z_scores > 3  # 3 standard deviations
+        
+        # Analyze temporal patterns
+        temporal_anomalies = AdvancedAnalytics._detect_temporal_anomalies(
+            current_data, historical_data
+        )
+        
+        return {
+            'statistical_anomalies': anomalies.tolist(),
+            'temporal_anomalies': temporal_anomalies,
+            'confidence_scores': (1 - (z_scores / 10)).clip(0, 1).tolist()
+        }
+
+    @staticmethod
     def _extract_trajectories(
-        self, detections: List[Dict[str, Any]]
+        detections: List[Dict[str, Any]]
     ) -> List[np.ndarray]:
         """Extract object trajectories from detections."""
         trajectories = {}
@@ -153,8 +169,9 @@ class AdvancedAnalytics:
         
         return [np.array(traj) for traj in trajectories.values()]
 
+    @staticmethod
     def _cluster_trajectories(
-        self, trajectories: List[np.ndarray]
+        trajectories: List[np.ndarray]
     ) -> List[Dict[str, Any]]:
         """Cluster similar trajectories to identify common paths."""
         if not trajectories:
@@ -204,8 +221,9 @@ class AdvancedAnalytics:
         
         return clusters
 
+    @staticmethod
     def _calculate_movement_stats(
-        self, trajectories: List[np.ndarray]
+        trajectories: List[np.ndarray]
     ) -> Dict[str, Any]:
         """Calculate movement statistics from trajectories."""
         stats = {
@@ -256,8 +274,9 @@ class AdvancedAnalytics:
             self.heat_maps[camera_id], None, 0, 255, cv2.NORM_MINMAX
         )
 
+    @staticmethod
     def _detect_temporal_anomalies(
-        self, current_data: Dict[str, Any], historical_data: List[Dict[str, Any]]
+        current_data: Dict[str, Any], historical_data: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Detect temporal anomalies in behavior patterns."""
         anomalies = []
@@ -293,8 +312,9 @@ class AdvancedAnalytics:
         
         return anomalies
 
+    @staticmethod
     def _analyze_object_interactions(
-        self, detections: List[Dict[str, Any]]
+        detections: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Analyze interactions between detected objects."""
         interactions = []
@@ -332,10 +352,11 @@ class AdvancedAnalytics:
                     'duration': 1  # Will be updated in post-processing
                 })
         
-        return self._post_process_interactions(interactions)
+        return AdvancedAnalytics._post_process_interactions(interactions)
 
+    @staticmethod
     def _post_process_interactions(
-        self, interactions: List[Dict[str, Any]]
+        interactions: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Post-process interactions to calculate durations and patterns."""
         # Group interactions by object pairs
@@ -374,6 +395,15 @@ class AdvancedAnalytics:
         
         return processed_interactions
 
+    def _count_objects_in_zones(
+        self, detections: List[Dict[str, Any]], zones: List[Dict[str, Any]]
+    ) -> Dict[Any, int]:
+        """Count objects in every zone; runs on a compute thread."""
+        return {
+            zone['id']: self._count_objects_in_zone(detections, zone['coordinates'])
+            for zone in zones
+        }
+
     def _count_objects_in_zone(
         self, detections: List[Dict[str, Any]], zone_coords: List[List[int]]
     ) -> int:
@@ -0,0 +1,200 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import asyncio
+import threading
+import logging
+import time
+from .pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+# Every scheduler, so one collector can render each metric family exactly once
+_schedulers: List['AnalysisScheduler'] = []
+
+class AnalysisTask:
+    """One analysis run on camera frames at its own rate, priority and deadline.
+
+    ``fn`` receives the frame and the results gathered so far for that frame
+    (fresh or carried over from earlier frames) and may be sync or async.
+    ``deadline`` is measured from frame capture; lower ``priority`` runs first.
+    A task with ``requires`` only runs on frames where those tasks also ran,
+    for inputs that must come from the same frame's pixels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any, Dict[str, Any]], Any],
+        target_fps: float,
+        priority: int = 1,
+        deadline: float = 1.0,
+        default: Any = None,
+        requires: Tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.fn = fn
+        self.target_fps = target_fps
+        self.priority = priority
+        self.deadline = deadline
+        self.default = default
+        self.requires = requires
+
+class CameraSchedule:
+    """Per-camera run times and latest results for each task."""
+
+    def __init__(self, tasks: List[AnalysisTask]):
+        self.next_due = {task.name: 0.0 for task in tasks}
+        self.results = {task.name: task.default for task in tasks}
+        self.result_at: Dict[str, Optional[float]] = {task.name: None for task in tasks}
+
+class AnalysisScheduler:
+    """Runs each frame's due analyses in priority order and drops what would be late.
+
+    A task is due when its target interval has elapsed for that camera. Due
+    tasks run by priority; before starting one, its expected cost (EWMA of
+    past runs) is checked against the frame's deadline for that task, and a
+    task that cannot finish in time is dropped for this frame rather than
+    delaying everything behind it. Skipped and dropped tasks keep their last
+    result so callers always receive a complete result set.
+    """
+
+    def __init__(self, tasks: List[AnalysisTask], name: str = 'vision'):
+        self.name = name
+        # Stable order: priority, then declaration order (dependencies first)
+        self.tasks = sorted(tasks, key=lambda t: (t.priority, tasks.index(t)))
+        self._cameras: Dict[str, CameraSchedule] = {}
+        self._costs: Dict[str, float] = {task.name: 0.0 for task in tasks}
+        self._stats: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        _schedulers.append(self)
+
+    def configure(self, name: str, target_fps: Optional[float] = None,
+                  priority: Optional[int] = None, deadline: Optional[float] = None):
+        """Change a task's rate, priority or deadline at runtime."""
+        for task in self.tasks:
+            if task.name == name:
+                if target_fps is not None:
+                    task.target_fps = target_fps
+                if priority is not None:
+                    task.priority = priority
+                if deadline is not None:
+                    task.deadline = deadline
+        order = {task.name: i for i, task in enumerate(self.tasks)}
+        self.tasks.sort(key=lambda t: (t.priority, order[t.name]))
+
+    def forget_camera(self, camera_id: Any):
+        self._cameras.pop(str(camera_id), None)
+
+    async def run(
+        self,
+        camera_id: Any,
+        frame: Any,
+        captured_at: Optional[float] = None,
+        inputs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run the tasks due for this frame; returns results plus a schedule summary.
+
+        ``inputs`` are extra per-frame values made available to task functions.
+        """
+        camera_id = str(camera_id)
+        schedule = self._cameras.get(camera_id)
+        if schedule is None:
+            schedule = CameraSchedule(self.tasks)
+            self._cameras[camera_id] = schedule
+
+        # Deadlines are relative to capture; wall clock maps to the monotonic clock here
+        now = time.monotonic()
+        captured = now - max(time.time() - captured_at, 0.0) if captured_at is not None else now
+        ran, skipped, dropped, late = [], [], [], []
+        results = {**schedule.results, **(inputs or {})}
+
+        for task in self.tasks:
+            now = time.monotonic()
+            if task.target_fps <= 0 or now < schedule.next_due[task.name]:
+                skipped.append(task.name)
+                continue
+            if any(name not in ran for name in task.requires):
+                # Still due, so it runs on the next frame its inputs are fresh for
+                skipped.append(task.name)
+                continue
+
+            deadline = captured + task.deadline
+            if now + self._costs[task.name] > deadline:
+                # Decay the estimate so a task dropped after one slow run gets retried
+                self._costs[task.name] *= 0.9
+                dropped.append(task.name)
+                self._count(task.name, 'dropped')
+                continue
+
+            try:
+                result = task.fn(frame, results)
+                if asyncio.iscoroutine(result):
+                    result = await result
+            except Exception as e:
+                logger.error(f"Error in {self.name} analysis '{task.name}' for camera {camera_id}: {str(e)}")
+                self._count(task.name, 'failed')
+                continue
+
+            finished = time.monotonic()
+            cost = finished - now
+            previous = self._costs[task.name]
+            self._costs[task.name] = cost if previous == 0.0 else 0.8 * previous + 0.2 * cost
+
+            schedule.next_due[task.name] = now + 1.0 / task.target_fps
+            schedule.results[task.name] = result
+            schedule.result_at[task.name] = finished
+            results[task.name] = result
+            ran.append(task.name)
+            self._count(task.name, 'ran')
+            if finished > deadline:
+                late.append(task.name)
+                self._count(task.name, 'late')
+
+        now = time.monotonic()
+        results['_schedule'] = {
+            'ran': ran,
+            'skipped': skipped,
+            'dropped': dropped,
+            'late': late,
+            'result_age': {
+                name: (now - at if at is not None else None)
+                for name, at in schedule.result_at.items()
+            }
+        }
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            task.name: {
+                'target_fps': task.target_fps,
+                'priority': task.priority,
+                'deadline': task.deadline,
+                'expected_cost': self._costs[task.name],
+                **{outcome: stats.get((task.name, outcome), 0) for outcome in ('ran', 'dropped', 'late', 'failed')}
+            }
+            for task in self.tasks
+        }
+
+    def _count(self, task: str, outcome: str):
+        with self._lock:
+            self._stats[(task, outcome)] = self._stats.get((task, outcome), 0) + 1
+
+def _collect():
+    runs, costs = [], []
+    for scheduler in _schedulers:
+        with scheduler._lock:
+            stats = sorted(scheduler._stats.items())
+        runs.extend(
+            ({'scheduler': scheduler.name, 'task': task, 'outcome': outcome}, count)
+            for (task, outcome), count in stats
+        )
+        costs.extend(
+            ({'scheduler': scheduler.name, 'task': name}, cost) for name, cost in sorted(scheduler._costs.items())
+        )
+    return [
+        ('visioncave_analysis_runs_total', 'counter', 'Scheduled analysis outcomes per task', runs),
+        ('visioncave_analysis_expected_cost_seconds', 'gauge', 'EWMA run time per analysis task', costs)
+    ]
+
+pipeline_metrics.register_collector(_collect)
@@ -0,0 +1,212 @@
+from typing import Dict, Any, List, Optional
+from collections import deque
+import asyncio
+import logging
+import time
+from fastapi import WebSocket
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics, Histogram
+from .serialization import EncodedMessage, send_encoded
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'evict')
+
+# Every hub, so one collector can render each metric family exactly once
+_hubs: List['BroadcastHub'] = []
+
+class ClientChannel:
+    """Bounded outbound queue and writer task for one socket."""
+
+    def __init__(self, hub: 'BroadcastHub', websocket: WebSocket, group: str, encoding: str = 'json'):
+        self.hub = hub
+        self.websocket = websocket
+        self.group = group
+        self.encoding = encoding
+        self.queue: deque = deque()
+        self.drops_since_send = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+
+    def enqueue(self, message: EncodedMessage) -> bool:
+        """Queue a message without waiting; False if it (or an older one) was dropped."""
+        if self.closed:
+            return False
+        if len(self.queue) < self.hub.queue_size:
+            self.queue.append(message)
+            self._ready.set()
+            return True
+
+        policy = self.hub.overflow
+        if policy == 'evict':
+            self.hub.evict(self, 'queue_full')
+            return False
+        if policy == 'drop_oldest':
+            self.queue.popleft()
+            self.queue.append(message)
+        self.hub.count(self.group, 'dropped')
+        self.drops_since_send += 1
+        if self.drops_since_send >= self.hub.max_drops:
+            self.hub.evict(self, 'slow_consumer')
+        return False
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _write(self):
+        while not self.closed:
+            while not self.queue:
+                self._ready.clear()
+                await self._ready.wait()
+            message = self.queue.popleft()
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(send_encoded(self.websocket, message, self.encoding), self.hub.send_timeout)
+            except asyncio.TimeoutError:
+                self.hub.evict(self, 'send_timeout')
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Send to {self.group} client failed: {str(e)}")
+                self.hub.count(self.group, 'failed')
+                self.hub.remove(self.websocket, self.group)
+                return
+            self.hub.send_seconds.observe(time.monotonic() - started)
+            self.hub.count(self.group, 'sent')
+            self.drops_since_send = 0
+
+class BroadcastHub:
+    """Fan-out of messages to groups of sockets without waiting on any of them.
+
+    Each socket gets a bounded queue drained by its own writer task, so a
+    broadcast only enqueues and a slow or half-dead client never delays the
+    others. On overflow the ``overflow`` policy drops the oldest or newest
+    message, or evicts the client; a client that keeps dropping
+    (``max_drops`` in a row) or whose send stalls past ``send_timeout`` is
+    evicted and its socket closed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        queue_size: int = settings.BROADCAST_QUEUE_SIZE,
+        overflow: str = settings.BROADCAST_OVERFLOW,
+        max_drops: int = settings.BROADCAST_MAX_DROPS,
+        send_timeout: float = settings.BROADCAST_SEND_TIMEOUT
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'")
+        self.name = name
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.max_drops = max_drops
+        self.send_timeout = send_timeout
+        self.groups: Dict[str, Dict[WebSocket, ClientChannel]] = {}
+        self._counts: Dict[tuple, int] = {}
+        # Per hub only: groups may be per-client ids and would grow without bound
+        self.send_seconds = Histogram()
+        _hubs.append(self)
+
+    def add(self, websocket: WebSocket, group: str, encoding: str = 'json') -> ClientChannel:
+        channels = self.groups.setdefault(group, {})
+        channel = channels.get(websocket)
+        if channel is None:
+            channel = ClientChannel(self, websocket, group, encoding)
+            channels[websocket] = channel
+        return channel
+
+    def remove(self, websocket: WebSocket, group: str) -> bool:
+        channels = self.groups.get(group, {})
+        channel = channels.pop(websocket, None)
+        if not channels:
+            self.groups.pop(group, None)
+        if channel is None:
+            return False
+        channel.close()
+        return True
+
+    def members(self, group: str) -> List[WebSocket]:
+        return list(self.groups.get(group, {}))
+
+    def publish(self, group: str, message: Any) -> int:
+        """Queue a message for every client in a group; returns how many accepted it.
+
+        The message is serialized once per wire format in use by the group,
+        and every client is sent the same buffer.
+        """
+        channels = list(self.groups.get(group, {}).values())
+        if not channels:
+            return 0
+        encoded = self._encode(group, message, {channel.encoding for channel in channels})
+        if encoded is None:
+            return 0
+        return sum(channel.enqueue(encoded) for channel in channels)
+
+    def send_to(self, websocket: WebSocket, message: Any) -> bool:
+        """Queue a message for one client, in order with its broadcasts."""
+        for group, channels in self.groups.items():
+            channel = channels.get(websocket)
+            if channel is not None:
+                encoded = self._encode(group, message, {channel.encoding})
+                return encoded is not None and channel.enqueue(encoded)
+        return False
+
+    def _encode(self, group: str, message: Any, encodings: set) -> Optional[EncodedMessage]:
+        encoded = message if isinstance(message, EncodedMessage) else EncodedMessage(message)
+        try:
+            # Serialize up front so a bad payload fails here, not in every writer
+            for encoding in encodings:
+                encoded.prepare(encoding)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cannot serialize {self.name} message for {group}: {str(e)}")
+            self.count(group, 'unserializable')
+            return None
+        return encoded
+
+    def evict(self, channel: ClientChannel, reason: str):
+        if not self.remove(channel.websocket, channel.group):
+            return
+        self.count(channel.group, f'evicted_{reason}')
+        logger.warning(f"Evicted {self.name} client from {channel.group}: {reason}")
+        asyncio.ensure_future(self._close(channel.websocket))
+
+    def count(self, group: str, outcome: str):
+        key = (group, outcome)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            # 1013: try again later
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+def _collect():
+    clients, depths, max_depths, messages, send_seconds = [], [], [], [], []
+    for hub in _hubs:
+        for group, channels in sorted(hub.groups.items()):
+            labels = {'hub': hub.name, 'group': group}
+            queues = [len(channel.queue) for channel in channels.values()]
+            clients.append((labels, len(queues)))
+            depths.append((labels, sum(queues)))
+            max_depths.append((labels, max(queues, default=0)))
+        messages.extend(
+            ({'hub': hub.name, 'group': group, 'outcome': outcome}, count)
+            for (group, outcome), count in sorted(hub._counts.items())
+        )
+        send_seconds.append(({'hub': hub.name}, hub.send_seconds))
+    return [
+        ('visioncave_broadcast_clients', 'gauge', 'Connected clients per broadcast group', clients),
+        ('visioncave_broadcast_queue_depth', 'gauge', 'Messages queued for clients per group', depths),
+        ('visioncave_broadcast_queue_max_depth', 'gauge', 'Deepest client queue per group', max_depths),
+        ('visioncave_broadcast_messages_total', 'counter', 'Per-client messages by outcome', messages),
+        ('visioncave_broadcast_send_seconds', 'histogram', 'Time to send one message to one client', send_seconds)
+    ]
+
+pipeline_metrics.register_collector(_collect)
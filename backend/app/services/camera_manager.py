@@ -10,6 +10,10 @@ import requests
 from sqlalchemy.orm import Session
 from ..models.sql_models import Camera, Stream
 from .websocket_service import manager
+from .pipeline_metrics import pipeline_metrics
+from .frame_tracing import frame_tracer
+from .overload_controller import overload_controller
+from .frame_hub import frame_hub, FULL_TIER
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,7 @@ class CameraManager:
         self.db = db
         self.active_streams = {}
         self.frame_processors = {}
+        self.processor_tiers = {}
 
     async def add_camera(self, camera_data: Dict) -> Camera:
         """Add a new camera to the system"""
@@ -169,6 +174,8 @@ class CameraManager:
                 'last_update': datetime.now()
             }
 
+            overload_controller.register_camera(camera.id, camera.configuration)
+
             # Start frame reading loop
             asyncio.create_task(self._read_frames(camera.id))
             
@@ -183,55 +190,78 @@ class CameraManager:
 
     async def stop_stream(self, camera_id: int):
         """Stop camera stream"""
+        if await self._close_stream(camera_id, 'inactive'):
+            pipeline_metrics.forget_camera(camera_id)
+
+    async def _fail_stream(self, camera_id: int, reason: str):
+        """Close a stream whose capture died, leaving it failed in readiness until restarted or stopped"""
+        if await self._close_stream(camera_id, 'error'):
+            pipeline_metrics.mark_failed(camera_id, reason)
+
+    async def _close_stream(self, camera_id: int, status: str) -> bool:
         try:
-            if camera_id in self.active_streams:
-                stream = self.active_streams[camera_id]
-                stream['capture'].release()
-                del self.active_streams[camera_id]
+            if camera_id not in self.active_streams:
+                return False
+            stream = self.active_streams.pop(camera_id)
+            stream['capture'].release()
+            overload_controller.unregister_camera(camera_id)
+            frame_hub.forget_camera(camera_id)
 
-                camera = self.db.query(Camera).filter(Camera.id == camera_id).first()
-                if camera:
-                    camera.status = 'inactive'
-                    self.db.commit()
+            camera = self.db.query(Camera).filter(Camera.id == camera_id).first()
+            if camera:
+                camera.status = status
+                self.db.commit()
         except Exception as e:
             logger.error(f"Error stopping stream: {str(e)}")
+        return True
 
     async def _read_frames(self, camera_id: int):
         """Read frames from camera stream"""
         try:
             while camera_id in self.active_streams:
                 stream = self.active_streams[camera_id]
-                ret, frame = stream['capture'].read()
+                with pipeline_metrics.time_stage(camera_id, 'capture'):
+                    ret, frame = stream['capture'].read()
                 
                 if not ret:
                     logger.error(f"Failed to read frame from camera {camera_id}")
-                    await self.stop_stream(camera_id)
+                    pipeline_metrics.record_drop(camera_id, 'read_error')
+                    await self._fail_stream(camera_id, 'read_error')
                     break
 
+                pipeline_metrics.mark_frame(camera_id)
+                context = frame_tracer.start_frame(camera_id)
+                tiered = frame_hub.publish(camera_id, frame, context)
+
                 # Update last frame
                 stream['last_frame'] = frame
+                stream['last_frame_context'] = context
                 stream['last_update'] = datetime.now()
 
-                # Process frame if processor exists
-                if camera_id in self.frame_processors:
+                # Process frame if processor exists and the camera is not being shed
+                if camera_id in self.frame_processors and overload_controller.should_process(camera_id):
                     try:
-                        await self.frame_processors[camera_id](frame)
+                        with pipeline_metrics.time_stage(camera_id, 'processing'), frame_tracer.activate(context):
+                            tier = self.processor_tiers.get(camera_id, FULL_TIER)
+                            await self.frame_processors[camera_id](tiered.get(tier))
                     except Exception as e:
                         logger.error(f"Error processing frame: {str(e)}")
 
                 await asyncio.sleep(0.033)  # ~30 FPS
         except Exception as e:
             logger.error(f"Error in frame reading loop: {str(e)}")
-            await self.stop_stream(camera_id)
+            await self._fail_stream(camera_id, 'capture_error')
 
-    def add_frame_processor(self, camera_id: int, processor):
-        """Add a frame processor for a camera"""
+    def add_frame_processor(self, camera_id: int, processor, tier: str = FULL_TIER):
+        """Add a frame processor for a camera, fed frames at the given resolution tier"""
         self.frame_processors[camera_id] = processor
+        self.processor_tiers[camera_id] = tier
 
     def remove_frame_processor(self, camera_id: int):
         """Remove frame processor for a camera"""
         if camera_id in self.frame_processors:
             del self.frame_processors[camera_id]
+        self.processor_tiers.pop(camera_id, None)
 
     async def get_camera_status(self, camera_id: int) -> Dict:
         """Get current status of a camera"""
@@ -245,6 +275,7 @@ class CameraManager:
             'type': camera.type,
             'status': camera.status,
             'is_streaming': camera.id in self.active_streams,
+            'fps': pipeline_metrics.fps(camera.id),
             'last_update': self.active_streams[camera.id]['last_update'].isoformat() 
                 if camera.id in self.active_streams else None
         }
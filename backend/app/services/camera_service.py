@@ -1,9 +1,19 @@
 import cv2
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from ..models.sql_models import Camera, Stream
+from .pipeline_metrics import pipeline_metrics
+from .frame_tracing import frame_tracer
+from .overload_controller import overload_controller, camera_priority
+from .fair_scheduler import inference_scheduler
+from .frame_pipeline import FramePipeline, PipelineStage, FrameJob
+from .preprocessing import preprocess_engine, TransformSpec
+from .frame_hub import frame_hub
+from .model_handle import ModelHandle
+from ..core.config import settings
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
 import asyncio
 import json
 from kafka import KafkaProducer
@@ -11,14 +21,18 @@ from kafka.errors import KafkaError
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import threading
+import functools
 from queue import Queue
 import time
 
 logger = logging.getLogger(__name__)
 
 class CameraService:
-    def __init__(self):
+    def __init__(self, shadow_evaluator=None, model_monitor=None, model_manager=None):
         self.active_streams = {}
+        self.shadow_evaluator = shadow_evaluator
+        self.model_monitor = model_monitor
+        self.model_manager = model_manager
         self.frame_processors = {}
         self.executor = ThreadPoolExecutor(max_workers=10)
         self.kafka_producer = KafkaProducer(
@@ -115,120 +129,246 @@ class CameraService:
         if camera_id in self.active_streams:
             return
 
-        # Create frame queue and processing thread
+        # Inference leases the model through its serving handle so a hot swap
+        # or rollback reaches this stream without restarting it
+        model_handle = None
+        model_id = camera.configuration.get('modelId')
+        if self.model_manager and model_id:
+            model_handle = await self.model_manager.get_handle(model_id)
+
+        # Create frame queue and processing threads
         frame_queue = Queue(maxsize=30)
         stop_event = threading.Event()
         
         # Start frame capture thread
         self.executor.submit(
             self._capture_frames,
+            camera_id,
             camera.url,
             frame_queue,
             stop_event,
             camera.configuration
         )
         
-        # Start frame processing thread
-        self.executor.submit(
-            self._process_frames,
+        # Start the staged processing pipeline
+        pipeline = self._build_pipeline(
             camera_id,
             frame_queue,
             stop_event,
-            camera.configuration
+            camera.configuration,
+            camera.owner_id,
+            model_handle
         )
+        pipeline.start()
         
         self.active_streams[camera_id] = {
             'queue': frame_queue,
             'stop_event': stop_event,
-            'configuration': camera.configuration
+            'configuration': camera.configuration,
+            'pipeline': pipeline
         }
+        overload_controller.register_camera(camera_id, camera.configuration)
 
     def _capture_frames(
-        self, url: str, frame_queue: Queue, stop_event: threading.Event, config: Dict[str, Any]
+        self, camera_id: int, url: str, frame_queue: Queue, stop_event: threading.Event, config: Dict[str, Any]
     ):
         """Capture frames from camera in a separate thread."""
-        cap = cv2.VideoCapture(url)
-        
-        # Set camera properties
-        width, height = map(int, config['resolution'].split('x'))
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        cap.set(cv2.CAP_PROP_FPS, config['frameRate'])
+        try:
+            cap = cv2.VideoCapture(url)
+            
+            # Set camera properties
+            width, height = map(int, config['resolution'].split('x'))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            cap.set(cv2.CAP_PROP_FPS, config['frameRate'])
+        except Exception as e:
+            logger.error(f"Error opening camera {camera_id}: {str(e)}")
+            pipeline_metrics.mark_failed(camera_id, 'capture_error')
+            return
 
-        while not stop_event.is_set():
-            ret, frame = cap.read()
-            if not ret:
-                logger.error(f"Failed to read frame from camera {url}")
-                time.sleep(1)
-                continue
+        try:
+            while not stop_event.is_set():
+                with pipeline_metrics.time_stage(camera_id, 'capture'):
+                    ret, frame = cap.read()
+                if not ret:
+                    if stop_event.is_set():
+                        break
+                    logger.error(f"Failed to read frame from camera {url}")
+                    pipeline_metrics.record_drop(camera_id, 'read_error')
+                    # Failed in readiness while retrying; the next frame clears it
+                    pipeline_metrics.mark_failed(camera_id, 'read_error')
+                    time.sleep(1)
+                    continue
 
-            if not frame_queue.full():
-                frame_queue.put(frame)
-            else:
-                # Skip frame if queue is full
-                continue
+                pipeline_metrics.mark_frame(camera_id)
+                context = frame_tracer.start_frame(camera_id)
+                # Preview and thumbnail tiers for subscribed viewers are made here, once
+                frame_hub.publish(camera_id, frame, context)
+                if not frame_queue.full():
+                    frame_queue.put((frame, context))
+                else:
+                    # Skip frame if queue is full
+                    pipeline_metrics.record_drop(camera_id, 'queue_full')
+                pipeline_metrics.set_queue_depth(camera_id, 'frames', frame_queue.qsize())
+        except Exception as e:
+            logger.error(f"Capture thread for camera {camera_id} died: {str(e)}")
+            pipeline_metrics.mark_failed(camera_id, 'capture_error')
+        finally:
+            cap.release()
 
-        cap.release()
+    def _build_pipeline(
+        self,
+        camera_id: int,
+        frame_queue: Queue,
+        stop_event: threading.Event,
+        config: Dict[str, Any],
+        owner_id: Optional[int] = None,
+        model_handle: Optional[ModelHandle] = None
+    ) -> FramePipeline:
+        """Wire the preprocess, inference, postprocess and publish stages for a camera."""
+        workers = settings.PIPELINE_STAGE_WORKERS
+        stages = [
+            PipelineStage('preprocess', functools.partial(self._stage_preprocess, camera_id, config),
+                          workers.get('preprocess', 1)),
+            PipelineStage('inference', functools.partial(self._stage_inference, camera_id, config, owner_id, model_handle),
+                          workers.get('inference', 1)),
+            PipelineStage('postprocess', functools.partial(self._stage_postprocess, config),
+                          workers.get('postprocess', 1)),
+            PipelineStage('persistence', functools.partial(self._stage_publish, camera_id),
+                          workers.get('persistence', 1))
+        ]
+        return FramePipeline(camera_id, stages, frame_queue, stop_event, settings.PIPELINE_QUEUE_SIZE)
 
-    def _process_frames(
-        self, camera_id: int, frame_queue: Queue, stop_event: threading.Event, config: Dict[str, Any]
-    ):
-        """Process frames in a separate thread."""
-        while not stop_event.is_set():
-            if frame_queue.empty():
-                time.sleep(0.01)
-                continue
+    def _stage_preprocess(self, camera_id: int, config: Dict[str, Any], job: FrameJob) -> Optional[FrameJob]:
+        pipeline_metrics.observe_stage(camera_id, 'queue_wait', job.context.age())
+        
+        # Shed frames while the overload controller has lowered this camera's rate
+        if not overload_controller.should_process(camera_id):
+            pipeline_metrics.record_drop(camera_id, 'overload')
+            return None
+        
+        job.processed = self._preprocess_frame(
+            job.frame, config, overload_controller.resolution_scale(camera_id), camera_id
+        )
+        return job
 
-            frame = frame_queue.get()
-            
-            try:
-                # Apply any preprocessing
-                processed_frame = self._preprocess_frame(frame, config)
-                
-                # Run object detection if configured
-                if config.get('enableObjectDetection'):
-                    detections = self._detect_objects(processed_frame)
-                    # Send detections to Kafka
-                    self._send_to_kafka('detections', {
-                        'camera_id': camera_id,
-                        'timestamp': time.time(),
-                        'detections': detections
-                    })
-                
-                # Run analytics if configured
-                if config.get('enableAnalytics'):
-                    analytics = self._analyze_frame(processed_frame)
-                    # Send analytics to Kafka
-                    self._send_to_kafka('analytics', {
-                        'camera_id': camera_id,
-                        'timestamp': time.time(),
-                        'analytics': analytics
-                    })
-                
-            except Exception as e:
-                logger.error(f"Error processing frame: {str(e)}")
-
-    def _preprocess_frame(self, frame: np.ndarray, config: Dict[str, Any]) -> np.ndarray:
+    def _stage_inference(
+        self,
+        camera_id: int,
+        config: Dict[str, Any],
+        owner_id: Optional[int],
+        model_handle: Optional[ModelHandle],
+        job: FrameJob
+    ) -> Optional[FrameJob]:
+        if not config.get('enableObjectDetection'):
+            return job
+        
+        # Inference runs on the shared worker pool under the owner's fair share
+        inference_start = time.perf_counter()
+        future = inference_scheduler.submit(
+            owner_id,
+            self._run_inference,
+            model_handle,
+            job.processed,
+            priority=camera_priority(config)
+        )
+        # Bounded by the frame's deadline so a wedged job never hangs the stage worker
+        timeout = max(settings.INFERENCE_FRAME_DEADLINE - job.context.age(), 0.0)
+        try:
+            result = future.result(timeout=timeout)
+        except CancelledError:
+            pipeline_metrics.record_drop(camera_id, 'fair_share')
+            return None
+        except FutureTimeoutError:
+            future.cancel()
+            pipeline_metrics.record_drop(camera_id, 'inference_timeout')
+            return None
+        detections, active_version = result
+        inference_latency = time.perf_counter() - inference_start
+        frame_tracer.record(job.context, 'processed')
+        
+        # Detection-level drift is measured on live output, per model and camera
+        if self.model_monitor and config.get('modelId'):
+            self.model_monitor.observe_detections(config['modelId'], camera_id, detections)
+        
+        # Offer a sample of frames to the shadow candidate, if any
+        if self.shadow_evaluator and config.get('modelId'):
+            self.shadow_evaluator.offer(
+                config['modelId'],
+                job.processed,
+                detections,
+                inference_latency,
+                active_version=active_version,
+                camera_id=camera_id
+            )
+        
+        job.results['detections'] = detections
+        return job
+
+    def _stage_postprocess(self, config: Dict[str, Any], job: FrameJob) -> FrameJob:
+        if config.get('enableAnalytics'):
+            job.results['analytics'] = self._analyze_frame(job.processed)
+        return job
+
+    def _stage_publish(self, camera_id: int, job: FrameJob) -> FrameJob:
+        # Send detections and analytics to Kafka
+        for topic in ('detections', 'analytics'):
+            if topic in job.results:
+                self._send_to_kafka(topic, {
+                    'camera_id': camera_id,
+                    'timestamp': time.time(),
+                    topic: job.results[topic],
+                    'trace': job.context.to_dict()
+                })
+        return job
+
+    def _preprocess_frame(
+        self,
+        frame: np.ndarray,
+        config: Dict[str, Any],
+        resolution_scale: float = 1.0,
+        camera_id: Optional[int] = None
+    ) -> np.ndarray:
         """Apply preprocessing to frame."""
         try:
-            # Resize if needed
+            # Configured resize and overload downscale are folded into one resize
+            size = None
             if config.get('resize'):
-                width, height = map(int, config['resolution'].split('x'))
-                frame = cv2.resize(frame, (width, height))
-            
-            # Apply additional preprocessing based on configuration
-            if config.get('grayscale'):
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                size = tuple(map(int, config['resolution'].split('x')))
+            if resolution_scale < 1.0:
+                width, height = size or (frame.shape[1], frame.shape[0])
+                size = (max(int(width * resolution_scale), 1), max(int(height * resolution_scale), 1))
             
-            if config.get('blur'):
-                frame = cv2.GaussianBlur(frame, (5, 5), 0)
-            
-            return frame
+            spec = TransformSpec(
+                size=size,
+                interpolation=cv2.INTER_AREA if resolution_scale < 1.0 else cv2.INTER_LINEAR,
+                color='gray' if config.get('grayscale') else 'bgr',
+                blur=5 if config.get('blur') else 0
+            )
+            return preprocess_engine.transform(camera_id, frame, spec, ring=self._buffer_ring())
         except Exception as e:
             logger.error(f"Error in preprocessing: {str(e)}")
             return frame
 
-    def _detect_objects(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _buffer_ring() -> int:
+        # Enough buffers for every frame that can be queued or in a stage after preprocessing
+        workers = settings.PIPELINE_STAGE_WORKERS
+        return settings.PIPELINE_QUEUE_SIZE * 3 + sum(workers.values()) + 1
+
+    def _run_inference(
+        self, model_handle: Optional[ModelHandle], frame: np.ndarray
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Detect objects with a leased model; returns the detections and the version that made them."""
+        if model_handle is None:
+            return self._detect_objects(None, frame), None
+        
+        # The lease pins one session, so a concurrent swap cannot change the
+        # model or the reported version part way through the frame
+        with model_handle.lease_session() as session:
+            return self._detect_objects(session.model, frame), session.version
+
+    def _detect_objects(self, model: Any, frame: np.ndarray) -> List[Dict[str, Any]]:
         """Detect objects in frame."""
         # Implement object detection using your preferred model
         # This is a placeholder
@@ -253,6 +393,10 @@ class CameraService:
         if camera_id in self.active_streams:
             self.active_streams[camera_id]['stop_event'].set()
             del self.active_streams[camera_id]
+            pipeline_metrics.forget_camera(camera_id)
+            overload_controller.unregister_camera(camera_id)
+            preprocess_engine.forget(camera_id)
+            frame_hub.forget_camera(camera_id)
 
     async def restart_stream(self, camera_id: int):
         """Restart camera stream processing."""
@@ -272,7 +416,7 @@ class CameraService:
         return {
             'status': 'active',
             'frame_count': stream_info['queue'].qsize(),
-            'fps': stream_info['configuration']['frameRate']
+            'fps': pipeline_metrics.fps(camera_id)
         }
 
     def __del__(self):
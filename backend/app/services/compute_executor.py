@@ -0,0 +1,122 @@
+from typing import Dict, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import asyncio
+import functools
+import threading
+import weakref
+import logging
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+class ComputeBusy(Exception):
+    """Raised when a pool's queue is full and the caller asked not to wait."""
+
+class ComputeExecutor:
+    """Runs blocking CV/ML work off the event loop on bounded pools.
+
+    The thread pool is for work that releases the GIL (OpenCV, ONNX Runtime,
+    torch and TensorFlow inference); the process pool is for Python-heavy
+    work such as trajectory clustering, and needs picklable, module-level
+    callables. Each pool admits at most ``max_pending`` calls per event loop;
+    further callers wait for a slot, or get ComputeBusy with ``wait=False``.
+    """
+
+    def __init__(
+        self,
+        threads: int = settings.COMPUTE_THREADS,
+        processes: int = settings.COMPUTE_PROCESSES,
+        max_pending: int = settings.COMPUTE_MAX_PENDING
+    ):
+        self.threads = threads
+        self.processes = processes
+        self.max_pending = max_pending
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._semaphores: Dict[str, weakref.WeakKeyDictionary] = {
+            'thread': weakref.WeakKeyDictionary(),
+            'process': weakref.WeakKeyDictionary()
+        }
+        self._lock = threading.Lock()
+        self.stats = {
+            pool: {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'pending': 0}
+            for pool in ('thread', 'process')
+        }
+        pipeline_metrics.register_collector(self._collect)
+
+    async def run(self, fn: Callable, *args, wait: bool = True, **kwargs) -> Any:
+        """Run a GIL-releasing callable on the thread pool."""
+        return await self._submit('thread', fn, args, kwargs, wait)
+
+    async def run_cpu(self, fn: Callable, *args, wait: bool = True, **kwargs) -> Any:
+        """Run a Python-heavy, picklable callable on the process pool."""
+        if self.processes <= 0:
+            return await self._submit('thread', fn, args, kwargs, wait)
+        return await self._submit('process', fn, args, kwargs, wait)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._thread_pool:
+                self._thread_pool.shutdown(wait=wait)
+                self._thread_pool = None
+            if self._process_pool:
+                self._process_pool.shutdown(wait=wait)
+                self._process_pool = None
+
+    async def _submit(self, pool: str, fn: Callable, args: tuple, kwargs: Dict[str, Any], wait: bool) -> Any:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(pool, loop)
+        if not wait and semaphore.locked():
+            self.stats[pool]['rejected'] += 1
+            raise ComputeBusy(f"{pool} pool has {self.max_pending} calls pending")
+
+        async with semaphore:
+            self.stats[pool]['submitted'] += 1
+            self.stats[pool]['pending'] += 1
+            try:
+                result = await loop.run_in_executor(self._pool(pool), functools.partial(fn, *args, **kwargs))
+                self.stats[pool]['completed'] += 1
+                return result
+            except Exception:
+                self.stats[pool]['failed'] += 1
+                raise
+            finally:
+                self.stats[pool]['pending'] -= 1
+
+    def _semaphore(self, pool: str, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphores = self._semaphores[pool]
+        semaphore = semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_pending)
+            semaphores[loop] = semaphore
+        return semaphore
+
+    def _pool(self, pool: str):
+        with self._lock:
+            if pool == 'thread':
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='compute')
+                return self._thread_pool
+            if self._process_pool is None:
+                # Spawned workers do not inherit model handles or CUDA state from this process
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._process_pool
+
+    def _collect(self):
+        return [
+            ('visioncave_compute_calls_total', 'counter', 'Compute executor calls by pool and outcome', [
+                ({'pool': pool, 'outcome': outcome}, stats[outcome])
+                for pool, stats in sorted(self.stats.items())
+                for outcome in ('submitted', 'completed', 'failed', 'rejected')
+            ]),
+            ('visioncave_compute_pending', 'gauge', 'Compute calls queued or running per pool', [
+                ({'pool': pool}, stats['pending']) for pool, stats in sorted(self.stats.items())
+            ])
+        ]
+
+compute_executor = ComputeExecutor()
@@ -0,0 +1,211 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import numpy as np
+import threading
+import logging
+import time
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bin edges for the numeric detection features
+CONFIDENCE_BINS = np.linspace(0.0, 1.0, 21)
+BOX_SIZE_BINS = np.geomspace(4.0, 4096.0, 21)  # sqrt(box area) in pixels
+
+# Smoothing applied to empty bins before computing PSI
+PSI_EPSILON = 1e-4
+
+class WindowedHistogram:
+    """Fixed-size histogram over a sliding time window.
+
+    The window is a ring of sub-histograms; the running total is updated
+    incrementally as observations arrive and as old slots expire, so reading
+    the window costs O(bins) regardless of traffic.
+    """
+
+    def __init__(self, n_bins: int, slots: int, slot_seconds: float):
+        self.slot_seconds = slot_seconds
+        self._slots = np.zeros((slots, n_bins), dtype=np.int64)
+        self._total = np.zeros(n_bins, dtype=np.int64)
+        self._slot_index = 0
+        self._slot_started = time.monotonic()
+
+    def add(self, indices: np.ndarray):
+        self._rotate()
+        counts = np.bincount(indices, minlength=self._total.shape[0])
+        self._slots[self._slot_index] += counts
+        self._total += counts
+
+    def counts(self) -> np.ndarray:
+        self._rotate()
+        return self._total
+
+    def _rotate(self):
+        now = time.monotonic()
+        elapsed_slots = int((now - self._slot_started) // self.slot_seconds)
+        if elapsed_slots <= 0:
+            return
+        for _ in range(min(elapsed_slots, self._slots.shape[0])):
+            self._slot_index = (self._slot_index + 1) % self._slots.shape[0]
+            self._total -= self._slots[self._slot_index]
+            self._slots[self._slot_index] = 0
+        self._slot_started += elapsed_slots * self.slot_seconds
+
+class DriftState:
+    """Reference and current-window sketches for one model on one camera."""
+
+    def __init__(self, max_classes: int, reference_size: int, slots: int, slot_seconds: float):
+        self.max_classes = max_classes
+        self.reference_size = reference_size
+        self.class_index: Dict[str, int] = {}
+        self.sizes = {
+            'confidence': len(CONFIDENCE_BINS) - 1,
+            'box_size': len(BOX_SIZE_BINS) + 1,
+            'class_mix': max_classes + 1  # last slot collects classes beyond max_classes
+        }
+        self.reference = {name: np.zeros(size, dtype=np.int64) for name, size in self.sizes.items()}
+        self.current = {
+            name: WindowedHistogram(size, slots, slot_seconds)
+            for name, size in self.sizes.items()
+        }
+        self.reference_count = 0
+        self.reference_frozen_at: Optional[datetime] = None
+        self.last_observed_at: Optional[datetime] = None
+
+    @property
+    def reference_ready(self) -> bool:
+        return self.reference_frozen_at is not None
+
+    def observe(self, confidences: np.ndarray, box_sizes: np.ndarray, classes: List[str]):
+        indices = {
+            'confidence': np.clip(np.digitize(confidences, CONFIDENCE_BINS[1:-1]), 0, self.sizes['confidence'] - 1),
+            'box_size': np.digitize(box_sizes, BOX_SIZE_BINS),
+            'class_mix': np.array([self._class_slot(c) for c in classes], dtype=np.int64)
+        }
+
+        if not self.reference_ready:
+            # Build the reference window from the first detections seen
+            for name, idx in indices.items():
+                self.reference[name] += np.bincount(idx, minlength=self.sizes[name])
+            self.reference_count += len(classes)
+            if self.reference_count >= self.reference_size:
+                self.reference_frozen_at = datetime.utcnow()
+        else:
+            for name, idx in indices.items():
+                self.current[name].add(idx)
+
+        self.last_observed_at = datetime.utcnow()
+
+    def reset_reference(self):
+        """Rebuild the reference from the next detections, e.g. after a model rollout."""
+        for name in self.reference:
+            self.reference[name][:] = 0
+        self.reference_count = 0
+        self.reference_frozen_at = None
+
+    def _class_slot(self, label: str) -> int:
+        index = self.class_index.get(label)
+        if index is None:
+            if len(self.class_index) >= self.max_classes:
+                return self.max_classes
+            index = len(self.class_index)
+            self.class_index[label] = index
+        return index
+
+class DriftMonitor:
+    """Detects distribution drift in detection output without storing predictions.
+
+    For every model and camera it keeps fixed-size histograms of detection
+    confidence, box size and class mix for a frozen reference window and a
+    sliding current window, and compares them with PSI and KS statistics.
+    """
+
+    def __init__(
+        self,
+        reference_size: int = settings.DRIFT_REFERENCE_SIZE,
+        window_seconds: float = settings.DRIFT_WINDOW_SECONDS,
+        window_slots: int = settings.DRIFT_WINDOW_SLOTS,
+        min_samples: int = settings.DRIFT_MIN_SAMPLES,
+        max_classes: int = settings.DRIFT_MAX_CLASSES
+    ):
+        self.reference_size = reference_size
+        self.window_slots = window_slots
+        self.slot_seconds = window_seconds / window_slots
+        self.min_samples = min_samples
+        self.max_classes = max_classes
+        self._states: Dict[Tuple[str, str], DriftState] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model_id: str, camera_id: Optional[Any], prediction: Any):
+        """Add a prediction's detections to the sketches for its model and camera."""
+        detections = prediction.get('detections', []) if isinstance(prediction, dict) else prediction
+        if not isinstance(detections, list) or not detections:
+            return
+
+        confidences, box_sizes, classes = [], [], []
+        for detection in detections:
+            if not isinstance(detection, dict):
+                continue
+            bbox = detection.get('bbox')
+            if bbox is None or len(bbox) < 4:
+                continue
+            confidences.append(float(detection.get('confidence', 0.0)))
+            box_sizes.append(np.sqrt(max(float(bbox[2]) - float(bbox[0]), 0.0) *
+                                     max(float(bbox[3]) - float(bbox[1]), 0.0)))
+            classes.append(str(detection.get('class', 'unknown')))
+        if not classes:
+            return
+
+        key = (model_id, str(camera_id) if camera_id is not None else 'default')
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = DriftState(self.max_classes, self.reference_size, self.window_slots, self.slot_seconds)
+                self._states[key] = state
+            state.observe(np.array(confidences), np.array(box_sizes), classes)
+
+    def reset_reference(self, model_id: str, camera_id: Optional[Any] = None):
+        """Re-baseline the reference window for a model (optionally one camera)."""
+        with self._lock:
+            for (state_model, state_camera), state in self._states.items():
+                if state_model == model_id and (camera_id is None or state_camera == str(camera_id)):
+                    state.reset_reference()
+
+    def evaluate(self, model_id: str) -> List[Dict[str, Any]]:
+        """Compute PSI and KS for every camera of a model with enough samples."""
+        results = []
+        with self._lock:
+            for (state_model, camera_id), state in self._states.items():
+                if state_model != model_id or not state.reference_ready:
+                    continue
+                for feature, reference in state.reference.items():
+                    current = state.current[feature].counts()
+                    samples = int(current.sum())
+                    if samples < self.min_samples:
+                        continue
+                    results.append({
+                        'camera_id': camera_id,
+                        'feature': feature,
+                        'psi': self.population_stability_index(reference, current),
+                        'ks': self.ks_statistic(reference, current) if feature != 'class_mix' else None,
+                        'samples': samples,
+                        'reference_samples': int(reference.sum()),
+                        'last_observed_at': state.last_observed_at.isoformat() if state.last_observed_at else None
+                    })
+        return results
+
+    @staticmethod
+    def population_stability_index(reference: np.ndarray, current: np.ndarray) -> float:
+        """PSI between two histograms over the same bins."""
+        ref = reference / max(reference.sum(), 1)
+        cur = current / max(current.sum(), 1)
+        ref = np.where(ref == 0, PSI_EPSILON, ref)
+        cur = np.where(cur == 0, PSI_EPSILON, cur)
+        return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+    @staticmethod
+    def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+        """Kolmogorov-Smirnov distance between two binned distributions."""
+        ref_cdf = np.cumsum(reference) / max(reference.sum(), 1)
+        cur_cdf = np.cumsum(current) / max(current.sum(), 1)
+        return float(np.max(np.abs(cur_cdf - ref_cdf)))
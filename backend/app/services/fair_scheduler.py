@@ -0,0 +1,231 @@
+from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import Future
+import heapq
+import itertools
+import threading
+import logging
+import time
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets for time spent waiting for an inference worker, in seconds
+WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Tenant:
+    """Queue, quota and accounting for one camera owner."""
+
+    def __init__(self, owner_id: str, weight: float, max_queue: int, max_inflight: int):
+        self.owner_id = owner_id
+        self.weight = weight
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight  # 0 means no cap beyond the worker pool
+        self.queue: List[tuple] = []  # heap of (priority, seq, job)
+        self.inflight = 0
+        self.finish_tag = 0.0
+        self.cost_estimate = 0.01  # EWMA of service seconds per job
+        self.wait_histogram = Histogram(WAIT_BUCKETS)
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'dropped': 0, 'service_seconds': 0.0}
+
+    @property
+    def runnable(self) -> bool:
+        return bool(self.queue) and (self.max_inflight <= 0 or self.inflight < self.max_inflight)
+
+class Job:
+    __slots__ = ('fn', 'args', 'kwargs', 'future', 'submitted_at', 'priority')
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: Dict[str, Any], priority: int):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.priority = priority
+
+class FairShareScheduler:
+    """Weighted fair queueing of inference work across camera owners.
+
+    Each owner gets its own bounded queue; workers always serve the runnable
+    owner with the smallest virtual finish tag, where a tag advances by the
+    owner's estimated job cost divided by its weight. An owner with many
+    cameras therefore gets its weighted share of workers, not a share
+    proportional to its camera count. Within an owner, lower ``priority``
+    values run first; when an owner's queue is full its oldest lowest-priority
+    job is cancelled so fresh frames win.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.INFERENCE_WORKERS,
+        default_weight: float = settings.TENANT_DEFAULT_WEIGHT,
+        max_queue: int = settings.TENANT_MAX_QUEUE,
+        max_inflight: int = settings.TENANT_MAX_INFLIGHT,
+        tenant_weights: Optional[Dict[str, float]] = None
+    ):
+        self.workers = workers
+        self.default_weight = default_weight
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight
+        self.tenant_weights = {str(k): v for k, v in (tenant_weights or settings.TENANT_WEIGHTS).items()}
+
+        self._tenants: Dict[str, Tenant] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        pipeline_metrics.register_collector(self._collect)
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stop_event.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'inference-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=timeout)
+
+    def configure_tenant(
+        self,
+        owner_id: Any,
+        weight: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        max_inflight: Optional[int] = None
+    ):
+        """Set an owner's weight and quotas."""
+        with self._cond:
+            tenant = self._tenant(str(owner_id))
+            if weight is not None:
+                tenant.weight = weight
+            if max_queue is not None:
+                tenant.max_queue = max_queue
+            if max_inflight is not None:
+                tenant.max_inflight = max_inflight
+            self._cond.notify_all()
+
+    def submit(self, owner_id: Any, fn: Callable, *args, priority: int = 1, **kwargs) -> Future:
+        """Queue a callable under an owner's share; returns a Future for its result."""
+        self.start()
+        job = Job(fn, args, kwargs, priority)
+        with self._cond:
+            tenant = self._tenant(str(owner_id))
+            if not tenant.queue and tenant.inflight == 0:
+                # An owner returning from idle starts at the current virtual time
+                tenant.finish_tag = max(tenant.finish_tag, self._virtual_time)
+            if len(tenant.queue) >= tenant.max_queue:
+                self._shed(tenant)
+            heapq.heappush(tenant.queue, (priority, next(self._seq), job))
+            tenant.stats['submitted'] += 1
+            self._cond.notify()
+        return job.future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-owner throughput, share of service and queueing."""
+        with self._cond:
+            total_service = sum(t.stats['service_seconds'] for t in self._tenants.values())
+            return {
+                owner_id: {
+                    **tenant.stats,
+                    'weight': tenant.weight,
+                    'queue_depth': len(tenant.queue),
+                    'inflight': tenant.inflight,
+                    'service_share': tenant.stats['service_seconds'] / total_service if total_service else 0.0,
+                    'mean_wait': tenant.wait_histogram.sum / tenant.wait_histogram.count if tenant.wait_histogram.count else 0.0
+                }
+                for owner_id, tenant in self._tenants.items()
+            }
+
+    def _tenant(self, owner_id: str) -> Tenant:
+        tenant = self._tenants.get(owner_id)
+        if tenant is None:
+            tenant = Tenant(
+                owner_id,
+                self.tenant_weights.get(owner_id, self.default_weight),
+                self.max_queue,
+                self.max_inflight
+            )
+            self._tenants[owner_id] = tenant
+        return tenant
+
+    def _shed(self, tenant: Tenant):
+        # Drop the oldest job of the lowest priority (largest priority value)
+        victim_index = max(range(len(tenant.queue)), key=lambda i: (tenant.queue[i][0], -tenant.queue[i][1]))
+        _, _, victim = tenant.queue[victim_index]
+        tenant.queue[victim_index] = tenant.queue[-1]
+        tenant.queue.pop()
+        heapq.heapify(tenant.queue)
+        victim.future.cancel()
+        tenant.stats['dropped'] += 1
+
+    def _next(self) -> Optional[tuple]:
+        with self._cond:
+            while not self._stop_event.is_set():
+                runnable = [t for t in self._tenants.values() if t.runnable]
+                if runnable:
+                    tenant = min(runnable, key=lambda t: t.finish_tag)
+                    _, _, job = heapq.heappop(tenant.queue)
+                    self._virtual_time = max(self._virtual_time, tenant.finish_tag)
+                    tenant.finish_tag += tenant.cost_estimate / max(tenant.weight, 1e-6)
+                    tenant.inflight += 1
+                    return tenant, job
+                self._cond.wait()
+        return None
+
+    def _worker(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            tenant, job = item
+            started = time.monotonic()
+            tenant.wait_histogram.observe(started - job.submitted_at)
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+                    outcome = 'completed'
+                except Exception as e:
+                    job.future.set_exception(e)
+                    outcome = 'failed'
+            else:
+                outcome = None
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                tenant.inflight -= 1
+                if outcome:
+                    tenant.stats[outcome] += 1
+                    tenant.stats['service_seconds'] += elapsed
+                    tenant.cost_estimate = 0.8 * tenant.cost_estimate + 0.2 * elapsed
+                self._cond.notify()
+
+    def _collect(self):
+        stats = self.get_stats()
+        with self._cond:
+            waits = [({'owner': owner_id}, tenant.wait_histogram) for owner_id, tenant in sorted(self._tenants.items())]
+        owners = sorted(stats.items())
+        return [
+            ('visioncave_tenant_jobs_total', 'counter', 'Inference jobs per owner by outcome', [
+                ({'owner': owner_id, 'outcome': outcome}, s[outcome])
+                for owner_id, s in owners for outcome in ('submitted', 'completed', 'failed', 'dropped')
+            ]),
+            ('visioncave_tenant_queue_depth', 'gauge', 'Inference jobs waiting per owner',
+             [({'owner': owner_id}, s['queue_depth']) for owner_id, s in owners]),
+            ('visioncave_tenant_inflight', 'gauge', 'Inference jobs running per owner',
+             [({'owner': owner_id}, s['inflight']) for owner_id, s in owners]),
+            ('visioncave_tenant_service_share', 'gauge', 'Fraction of inference worker time used per owner',
+             [({'owner': owner_id}, s['service_share']) for owner_id, s in owners]),
+            ('visioncave_tenant_wait_seconds', 'histogram', 'Time inference jobs wait for a worker', waits)
+        ]
+
+inference_scheduler = FairShareScheduler()
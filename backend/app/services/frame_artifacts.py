@@ -0,0 +1,137 @@
+from typing import Dict, Any, List, Optional, Tuple
+import itertools
+import functools
+import threading
+import weakref
+import logging
+import cv2
+import numpy as np
+from .pipeline_metrics import pipeline_metrics
+from .preprocessing import preprocess_engine, TransformSpec
+
+logger = logging.getLogger(__name__)
+
+# SSD face detector input, same as blobFromImage(resize(frame, 300x300), 1.0, (300, 300), mean)
+BLOB_300 = TransformSpec(size=(300, 300), scale=1.0, mean=(104.0, 177.0, 123.0), layout='chw', batch=True)
+
+# Input for detectors that take a 640x640 letterboxed RGB tensor
+LETTERBOX_640 = TransformSpec(size=(640, 640), letterbox=True, color='rgb', scale=1.0 / 255.0,
+                              layout='chw', batch=True)
+
+class FrameArtifacts:
+    """Views derived from one BGR frame, each computed once on first request.
+
+    Every processor handed the same frame gets the same artifacts, so the
+    grayscale image, its blurs, pyramid levels and model inputs are built
+    once per frame instead of once per processor. Arrays are shared between
+    processors and must be treated as read-only. All of them are owned by
+    the artifacts and may be kept as long as the frame.
+    """
+
+    _tokens = itertools.count()
+
+    def __init__(self, frame: np.ndarray):
+        # Weak, so the registry entry never keeps the frame alive
+        self._frame = weakref.ref(frame)
+        self.token = next(self._tokens)
+        self._cache: Dict[Any, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def frame(self) -> np.ndarray:
+        return self._frame()
+
+    @property
+    def gray(self) -> np.ndarray:
+        frame = self.frame
+        if frame.ndim == 2:
+            return frame
+        return self._get('gray', lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    def blurred(self, ksize: int = 5) -> np.ndarray:
+        """Gaussian-blurred grayscale frame."""
+        return self._get(('blurred', ksize), lambda: cv2.GaussianBlur(self.gray, (ksize, ksize), 0))
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """BGR frame halved ``level`` times with cv2.pyrDown; level 0 is the frame."""
+        if level <= 0:
+            return self.frame
+        return self._get(('pyramid', level), lambda: cv2.pyrDown(self.pyramid(level - 1)))
+
+    def blob300(self) -> np.ndarray:
+        """1x3x300x300 mean-subtracted blob for the SSD face detector."""
+        return self.transformed('face_detector', BLOB_300)
+
+    def letterbox640(self) -> np.ndarray:
+        """1x3x640x640 letterboxed RGB tensor in [0, 1]."""
+        return self.transformed('letterbox640', LETTERBOX_640)
+
+    def transformed(self, key: Any, spec: TransformSpec) -> np.ndarray:
+        """Model input for ``spec``; resizes are shared between specs of the same size."""
+        # Copied out of the engine's ring, whose slots are reused by later frames
+        # of every camera while this frame (and its artifacts) may live on
+        return self._get(('transformed', key, spec),
+                         lambda: preprocess_engine.transform(key, self.frame, spec, token=self.token).copy())
+
+    def _get(self, name: Any, compute) -> Any:
+        value = self._cache.get(name)
+        if value is not None:
+            frame_artifacts.stats['hits'] += 1
+            return value
+        # Held while computing so concurrent processors wait instead of duplicating work
+        with self._lock:
+            value = self._cache.get(name)
+            if value is None:
+                frame_artifacts.stats['computed'] += 1
+                value = compute()
+                self._cache[name] = value
+            else:
+                frame_artifacts.stats['hits'] += 1
+        return value
+
+class FrameArtifactRegistry:
+    """Maps live frame arrays to their FrameArtifacts.
+
+    Entries are dropped when the frame array is garbage collected, so
+    artifacts live exactly as long as the frame is being processed.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[weakref.ref, FrameArtifacts]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'frames': 0, 'computed': 0, 'hits': 0}
+        pipeline_metrics.register_collector(self._collect)
+
+    def __call__(self, frame: np.ndarray) -> FrameArtifacts:
+        """Artifacts for this frame array, created on first use."""
+        key = id(frame)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0]() is frame:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is frame:
+                return entry[1]
+            artifacts = FrameArtifacts(frame)
+            self._entries[key] = (weakref.ref(frame, functools.partial(self._release, key)), artifacts)
+            self.stats['frames'] += 1
+            return artifacts
+
+    def _release(self, key: int, ref: weakref.ref):
+        # May run from any thread during garbage collection, so no locking here
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is ref:
+            self._entries.pop(key, None)
+
+    def _collect(self):
+        return [
+            ('visioncave_frame_artifacts_live', 'gauge', 'Frames with cached derived artifacts',
+             [({}, len(self._entries))]),
+            ('visioncave_frame_artifacts_total', 'counter', 'Derived artifact lookups by outcome', [
+                ({'outcome': 'computed'}, self.stats['computed']),
+                ({'outcome': 'hit'}, self.stats['hits'])
+            ])
+        ]
+
+frame_artifacts = FrameArtifactRegistry()
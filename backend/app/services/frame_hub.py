@@ -0,0 +1,256 @@
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import threading
+import logging
+import time
+import cv2
+import numpy as np
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics
+from .compute_executor import compute_executor
+
+logger = logging.getLogger(__name__)
+
+FULL_TIER = 'full'
+
+class TieredFrame:
+    """One captured frame and its downscaled tiers, each produced once.
+
+    Tiers are sized by maximum width (never upscaled) and are resized from
+    the smallest already-available tier that is still large enough, so a
+    thumbnail is made from the preview rather than from the full frame.
+    """
+
+    def __init__(self, camera_id: str, frame: np.ndarray, context: Any, tiers: Dict[str, int]):
+        self.camera_id = camera_id
+        self.context = context
+        self.seq = getattr(context, 'seq', None)
+        self.captured_at = getattr(context, 'captured_at', None) or time.time()
+        self._widths = tiers
+        self._images: Dict[str, np.ndarray] = {FULL_TIER: frame}
+        self._encoded: Dict[Tuple[str, int], bytes] = {}
+        self._encode_locks: Dict[Tuple[str, int], threading.Lock] = {}
+        # In-flight encodes started from the event loop, awaited by every other viewer
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def frame(self) -> np.ndarray:
+        return self._images[FULL_TIER]
+
+    def get(self, tier: str = FULL_TIER) -> np.ndarray:
+        """The frame at ``tier``; unknown tiers fall back to full resolution."""
+        image = self._images.get(tier)
+        if image is not None:
+            return image
+        if tier not in self._widths:
+            return self.frame
+        with self._lock:
+            image = self._images.get(tier)
+            if image is None:
+                image = self._resize(tier)
+                self._images[tier] = image
+        return image
+
+    def jpeg(self, tier: str = FULL_TIER, quality: int = settings.PREVIEW_JPEG_QUALITY) -> bytes:
+        """JPEG bytes for a tier and quality, encoded once and shared by every viewer."""
+        key = (tier, quality)
+        data = self._encoded.get(key)
+        if data is not None:
+            frame_hub.stats['encode_hits'] += 1
+            return data
+        with self._lock:
+            encode_lock = self._encode_locks.setdefault(key, threading.Lock())
+        # Only callers of the same tier and quality wait on each other
+        with encode_lock:
+            data = self._encoded.get(key)
+            if data is None:
+                ok, buffer = cv2.imencode('.jpg', self.get(tier), [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if not ok:
+                    raise ValueError(f"JPEG encoding failed for camera {self.camera_id}")
+                data = buffer.tobytes()
+                self._encoded[key] = data
+                frame_hub.stats['encodes'] += 1
+                frame_hub.stats['encoded_bytes'] += len(data)
+            else:
+                frame_hub.stats['encode_hits'] += 1
+        return data
+
+    def etag(self, tier: str = FULL_TIER, quality: int = settings.PREVIEW_JPEG_QUALITY) -> str:
+        """Strong HTTP entity tag for this frame's JPEG at a tier and quality."""
+        # Capture time keeps tags unique when sequence numbers restart with the process
+        return f'"{self.camera_id}-{self.seq}-{int(self.captured_at * 1000)}-{tier}-{quality}"'
+
+    def size(self, tier: str = FULL_TIER) -> Tuple[int, int]:
+        """(width, height) of a tier without producing it."""
+        height, width = self.frame.shape[:2]
+        target = self._widths.get(tier)
+        if not target or target >= width:
+            return width, height
+        return target, max(int(round(height * target / width)), 1)
+
+    def _resize(self, tier: str) -> np.ndarray:
+        width, height = self.size(tier)
+        # Smallest produced image that is at least as large as the target
+        source = min(
+            (image for image in self._images.values() if image.shape[1] >= width),
+            key=lambda image: image.shape[1]
+        )
+        if source.shape[1] == width:
+            return source
+        frame_hub.stats['resizes'] += 1
+        return cv2.resize(source, (width, height), interpolation=cv2.INTER_AREA)
+
+class FrameSubscription:
+    """A consumer's interest in one camera tier; wakes async waiters on new frames."""
+
+    def __init__(self, hub: 'FrameHub', camera_id: str, tier: str):
+        self.hub = hub
+        self.camera_id = camera_id
+        self.tier = tier
+        self.last_seq: Optional[int] = None
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+            self._event: Optional[asyncio.Event] = asyncio.Event()
+        except RuntimeError:
+            self._loop = None
+            self._event = None
+
+    def latest(self) -> Optional[TieredFrame]:
+        return self.hub.latest(self.camera_id)
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[TieredFrame]:
+        """Wait for a frame newer than the last one returned; None on timeout."""
+        if self._event is None:
+            raise RuntimeError("Subscribe from a running event loop to await frames")
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            # Cleared before checking so a frame published in between still wakes us
+            self._event.clear()
+            tiered = self.latest()
+            if tiered is not None and (self.last_seq is None or tiered.seq is None or tiered.seq > self.last_seq):
+                self.last_seq = tiered.seq
+                return tiered
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def notify(self):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> 'FrameSubscription':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class FrameHub:
+    """Latest frame per camera, published once by the capture layer in resolution tiers.
+
+    Capture loops publish each decoded frame; consumers subscribe to the
+    tier they need (``inference``, ``preview``, ``thumbnail`` or ``full``).
+    Subscribed tiers are produced eagerly on the capture side, once per
+    frame, so no consumer pays for a full-resolution copy it will shrink.
+    """
+
+    def __init__(self, tiers: Optional[Dict[str, int]] = None):
+        self.tiers = dict(tiers if tiers is not None else settings.FRAME_TIERS)
+        self._latest: Dict[str, TieredFrame] = {}
+        self._subscriptions: Dict[str, List[FrameSubscription]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'published': 0, 'resizes': 0, 'encodes': 0, 'encode_hits': 0, 'encoded_bytes': 0}
+        pipeline_metrics.register_collector(self._collect)
+
+    def publish(self, camera_id: Any, frame: np.ndarray, context: Any = None) -> TieredFrame:
+        camera_id = str(camera_id)
+        tiered = TieredFrame(camera_id, frame, context, self.tiers)
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(camera_id, ()))
+        # Largest first, so smaller tiers cascade from the larger ones
+        for tier in sorted({s.tier for s in subscriptions}, key=lambda t: -self.tiers.get(t, 1 << 30)):
+            tiered.get(tier)
+        self._latest[camera_id] = tiered
+        self.stats['published'] += 1
+        for subscription in subscriptions:
+            subscription.notify()
+        return tiered
+
+    def latest(self, camera_id: Any) -> Optional[TieredFrame]:
+        return self._latest.get(str(camera_id))
+
+    async def encode(self, tiered: TieredFrame, tier: str = FULL_TIER,
+                     quality: int = settings.PREVIEW_JPEG_QUALITY) -> bytes:
+        """JPEG bytes for a frame tier, encoded off the event loop on first request.
+
+        Concurrent viewers of the same frame, tier and quality await a single
+        executor job, so they hold no compute threads or pending slots while
+        they wait.
+        """
+        key = (tier, quality)
+        data = tiered._encoded.get(key)
+        if data is not None:
+            self.stats['encode_hits'] += 1
+            return data
+        pending = tiered._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(compute_executor.run(tiered.jpeg, tier, quality))
+            tiered._pending[key] = pending
+            pending.add_done_callback(lambda _: tiered._pending.pop(key, None))
+        else:
+            self.stats['encode_hits'] += 1
+        # Shielded so a viewer that disconnects does not cancel the others' encode
+        return await asyncio.shield(pending)
+
+    def subscribe(self, camera_id: Any, tier: str = FULL_TIER) -> FrameSubscription:
+        if tier != FULL_TIER and tier not in self.tiers:
+            raise ValueError(f"Unknown frame tier '{tier}'")
+        subscription = FrameSubscription(self, str(camera_id), tier)
+        with self._lock:
+            self._subscriptions.setdefault(subscription.camera_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FrameSubscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.camera_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.camera_id, None)
+
+    def forget_camera(self, camera_id: Any):
+        """Drop the last frame of a stopped camera; subscriptions stay for a restart."""
+        self._latest.pop(str(camera_id), None)
+
+    def _collect(self):
+        with self._lock:
+            counts: Dict[Tuple[str, str], int] = {}
+            for camera_id, subscriptions in self._subscriptions.items():
+                for subscription in subscriptions:
+                    key = (camera_id, subscription.tier)
+                    counts[key] = counts.get(key, 0) + 1
+        return [
+            ('visioncave_frame_tier_subscribers', 'gauge', 'Consumers subscribed to a camera frame tier', [
+                ({'camera': camera_id, 'tier': tier}, count) for (camera_id, tier), count in sorted(counts.items())
+            ]),
+            ('visioncave_frame_hub_published_total', 'counter', 'Frames published to the frame hub',
+             [({}, self.stats['published'])]),
+            ('visioncave_frame_tier_resizes_total', 'counter', 'Tier images produced by resizing',
+             [({}, self.stats['resizes'])]),
+            ('visioncave_frame_jpeg_total', 'counter', 'Preview JPEG requests by outcome', [
+                ({'outcome': 'encoded'}, self.stats['encodes']),
+                ({'outcome': 'cached'}, self.stats['encode_hits'])
+            ]),
+            ('visioncave_frame_jpeg_bytes_total', 'counter', 'Bytes of JPEG encoded for previews',
+             [({}, self.stats['encoded_bytes'])])
+        ]
+
+frame_hub = FrameHub()
@@ -0,0 +1,51 @@
+from typing import Any, Optional
+import asyncio
+import logging
+import time
+from .pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+class FrameSubmission:
+    """A frame received from a client, still encoded; decoded only if it gets processed."""
+
+    __slots__ = ('module', 'payload', 'encoding', 'trace', 'client_seq', 'received_at')
+
+    def __init__(self, module: str, payload: Any, encoding: str, trace: Any, client_seq: Optional[int] = None):
+        self.module = module
+        self.payload = payload
+        self.encoding = encoding  # 'jpeg' or 'base64'
+        self.trace = trace
+        self.client_seq = client_seq
+        self.received_at = time.monotonic()
+
+class LatestFrameSlot:
+    """Holds only the newest unprocessed frame of one connection.
+
+    The receiver puts every frame; a frame still waiting when a newer one
+    arrives is replaced and counted as a 'superseded' drop. The processing
+    loop always takes the newest frame, so a result is never more than one
+    inference behind the client.
+    """
+
+    def __init__(self):
+        self._pending: Optional[FrameSubmission] = None
+        self._ready = asyncio.Event()
+        self.superseded = 0
+
+    def put(self, submission: FrameSubmission):
+        if self._pending is not None:
+            self.superseded += 1
+            pipeline_metrics.record_drop(self._pending.trace.camera_id, 'superseded')
+        self._pending = submission
+        self._ready.set()
+
+    async def get(self) -> FrameSubmission:
+        while self._pending is None:
+            self._ready.clear()
+            await self._ready.wait()
+        submission, self._pending = self._pending, None
+        pipeline_metrics.observe_stage(
+            submission.trace.camera_id, 'queue_wait', time.monotonic() - submission.received_at
+        )
+        return submission
@@ -0,0 +1,124 @@
+from typing import Dict, Any, List, Optional, Callable
+from queue import Queue, Empty, Full
+import threading
+import logging
+from .pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+class FrameJob:
+    """A frame and everything derived from it as it moves between stages."""
+
+    __slots__ = ('frame', 'context', 'processed', 'results')
+
+    def __init__(self, frame: Any, context: Any):
+        self.frame = frame
+        self.context = context
+        self.processed = None
+        self.results: Dict[str, Any] = {}
+
+class PipelineStage:
+    """One step of a frame pipeline run by ``workers`` threads.
+
+    ``fn`` takes a FrameJob and returns it (possibly updated) to pass it on,
+    or None to drop the frame.
+    """
+
+    def __init__(self, name: str, fn: Callable[[FrameJob], Optional[FrameJob]], workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(workers, 1)
+
+class FramePipeline:
+    """Runs per-camera stages concurrently, joined by bounded queues.
+
+    While frame N is in inference, frame N+1 can be preprocessed and frame
+    N-1 published. When a downstream queue is full the oldest waiting frame
+    is discarded in favour of the newer one, so a slow stage sheds stale
+    frames instead of building up latency. The last stage drops results
+    that finish behind a newer frame, so output never goes back in time.
+    """
+
+    def __init__(
+        self,
+        camera_id: Any,
+        stages: List[PipelineStage],
+        input_queue: Queue,
+        stop_event: threading.Event,
+        queue_size: int = 4
+    ):
+        self.camera_id = camera_id
+        self.stages = stages
+        self.stop_event = stop_event
+        self.queues = [input_queue] + [Queue(maxsize=queue_size) for _ in stages[1:]]
+        self.threads: List[threading.Thread] = []
+        self._last_published = 0
+        self._publish_lock = threading.Lock()
+
+    def start(self):
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(index,),
+                    name=f'camera-{self.camera_id}-{stage.name}-{worker}',
+                    daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def join(self, timeout: float = 5.0):
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+
+    def _run_stage(self, index: int):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        last_stage = index == len(self.stages) - 1
+
+        while not self.stop_event.is_set():
+            try:
+                job = inbox.get(timeout=0.1)
+            except Empty:
+                continue
+            pipeline_metrics.set_queue_depth(self.camera_id, f'{stage.name}_in', inbox.qsize())
+            if not isinstance(job, FrameJob):
+                job = FrameJob(*job)
+
+            if last_stage and not self._claim(job):
+                pipeline_metrics.record_drop(self.camera_id, 'out_of_order')
+                continue
+
+            try:
+                with pipeline_metrics.time_stage(self.camera_id, stage.name):
+                    job = stage.fn(job)
+            except Exception as e:
+                pipeline_metrics.record_drop(self.camera_id, 'processing_error')
+                logger.error(f"Error in {stage.name} stage for camera {self.camera_id}: {str(e)}")
+                continue
+
+            if job is not None and not last_stage:
+                self._forward(index + 1, job)
+
+    def _forward(self, index: int, job: FrameJob):
+        outbox = self.queues[index]
+        while True:
+            try:
+                outbox.put_nowait(job)
+                return
+            except Full:
+                try:
+                    outbox.get_nowait()
+                    pipeline_metrics.record_drop(self.camera_id, f'{self.stages[index].name}_full')
+                except Empty:
+                    pass
+
+    def _claim(self, job: FrameJob) -> bool:
+        seq = getattr(job.context, 'seq', None)
+        if seq is None:
+            return True
+        with self._publish_lock:
+            if seq < self._last_published:
+                return False
+            self._last_published = seq
+            return True
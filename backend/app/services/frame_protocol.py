@@ -0,0 +1,67 @@
+from typing import Optional, Tuple, NamedTuple
+import struct
+import numpy as np
+import cv2
+
+# Binary WebSocket frame message:
+#   magic 'VC' | version u8 | type u8 | seq u32 | timestamp f64 (client capture, unix seconds)
+#   | module length u8 | camera id length u8 | module utf-8 | camera id utf-8 | JPEG bytes
+MAGIC = b'VC'
+VERSION = 1
+HEADER = struct.Struct('!2sBBIdBB')
+
+MESSAGE_TYPES = {1: 'video_frame'}
+MESSAGE_CODES = {name: code for code, name in MESSAGE_TYPES.items()}
+
+class FrameProtocolError(ValueError):
+    """Raised for binary messages that do not follow the frame protocol."""
+
+class FrameHeader(NamedTuple):
+    type: str
+    module: str
+    seq: int
+    timestamp: Optional[float]
+    camera_id: Optional[str]
+
+def decode_message(data: bytes) -> Tuple[FrameHeader, memoryview]:
+    """Parse a binary message; the payload is a view into ``data``, not a copy."""
+    if len(data) < HEADER.size:
+        raise FrameProtocolError(f"Message of {len(data)} bytes is shorter than the header")
+    magic, version, code, seq, timestamp, module_len, camera_len = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise FrameProtocolError(f"Unsupported frame message {magic!r} v{version}")
+    if code not in MESSAGE_TYPES:
+        raise FrameProtocolError(f"Unknown frame message type {code}")
+
+    view = memoryview(data)
+    offset = HEADER.size
+    module = bytes(view[offset:offset + module_len]).decode('utf-8')
+    offset += module_len
+    camera_id = bytes(view[offset:offset + camera_len]).decode('utf-8') or None
+    offset += camera_len
+    if offset > len(data):
+        raise FrameProtocolError("Header lengths run past the end of the message")
+
+    header = FrameHeader(MESSAGE_TYPES[code], module, seq, timestamp if timestamp > 0 else None, camera_id)
+    return header, view[offset:]
+
+def encode_message(
+    payload: bytes,
+    module: str,
+    seq: int,
+    timestamp: Optional[float] = None,
+    camera_id: Optional[str] = None,
+    message_type: str = 'video_frame'
+) -> bytes:
+    """Build a binary frame message (used by clients and tools)."""
+    module_bytes = module.encode('utf-8')
+    camera_bytes = (camera_id or '').encode('utf-8')
+    header = HEADER.pack(
+        MAGIC, VERSION, MESSAGE_CODES[message_type], seq & 0xFFFFFFFF,
+        timestamp or 0.0, len(module_bytes), len(camera_bytes)
+    )
+    return b''.join((header, module_bytes, camera_bytes, payload))
+
+def decode_image(payload) -> Optional[np.ndarray]:
+    """Decode JPEG/PNG bytes straight from a bytes-like buffer without copying it first."""
+    return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
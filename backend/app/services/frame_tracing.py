@@ -0,0 +1,173 @@
+from typing import Dict, Any, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import itertools
+import random
+import threading
+import time
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics, Histogram
+
+# Latency hops measured from frame capture, in pipeline order
+HOPS = ('processed', 'kafka', 'delivery', 'client_ack')
+
+# Buckets for capture-to-hop latency in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+class FrameContext:
+    """Identity of a captured frame, carried with everything derived from it."""
+
+    __slots__ = ('camera_id', 'seq', 'captured_at', 'sampled', 'source_ts')
+
+    def __init__(
+        self,
+        camera_id: str,
+        seq: int,
+        captured_at: float,
+        sampled: bool = False,
+        source_ts: Optional[float] = None
+    ):
+        self.camera_id = camera_id
+        self.seq = seq
+        self.captured_at = captured_at  # wall clock, comparable across processes
+        self.sampled = sampled
+        self.source_ts = source_ts  # client-side capture time, if the frame was uploaded
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.time()) - self.captured_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        trace = {
+            'camera_id': self.camera_id,
+            'seq': self.seq,
+            'captured_at': self.captured_at,
+            'sampled': self.sampled
+        }
+        if self.source_ts is not None:
+            trace['source_ts'] = self.source_ts
+        return trace
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional['FrameContext']:
+        if not data or 'seq' not in data or 'captured_at' not in data:
+            return None
+        return cls(
+            str(data.get('camera_id')),
+            int(data['seq']),
+            float(data['captured_at']),
+            bool(data.get('sampled', False)),
+            data.get('source_ts')
+        )
+
+_current_frame: ContextVar[Optional[FrameContext]] = ContextVar('current_frame', default=None)
+
+class FrameTracer:
+    """Stamps frames at capture and aggregates sampled capture-to-hop latency per camera.
+
+    Only a sampled fraction of frames records spans, so tracing every frame
+    costs one counter increment plus a small dict on outgoing messages.
+    """
+
+    def __init__(self, sample_rate: float = settings.TRACE_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._sequences: Dict[str, itertools.count] = {}
+        self._spans: Dict[Tuple[str, str], Histogram] = {}
+        self._last: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        pipeline_metrics.register_collector(self._collect)
+
+    def start_frame(
+        self,
+        camera_id: Any,
+        captured_at: Optional[float] = None,
+        source_ts: Optional[float] = None
+    ) -> FrameContext:
+        """Assign the next sequence number for a camera's freshly captured frame."""
+        camera_id = str(camera_id)
+        counter = self._sequences.get(camera_id)
+        if counter is None:
+            with self._lock:
+                counter = self._sequences.setdefault(camera_id, itertools.count(1))
+        return FrameContext(
+            camera_id,
+            next(counter),
+            captured_at if captured_at is not None else time.time(),
+            random.random() < self.sample_rate,
+            source_ts
+        )
+
+    @contextmanager
+    def activate(self, context: Optional[FrameContext]):
+        """Make a frame the current one for messages sent from the enclosed block."""
+        token = _current_frame.set(context)
+        try:
+            yield context
+        finally:
+            _current_frame.reset(token)
+
+    def current(self) -> Optional[FrameContext]:
+        return _current_frame.get()
+
+    def stamp(self, message: Any, context: Optional[FrameContext] = None, hop: str = 'delivery') -> Any:
+        """Attach the frame trace to an outgoing dict message and record the hop span."""
+        context = context or _current_frame.get()
+        if context is None or not isinstance(message, dict) or 'trace' in message:
+            return message
+        now = time.time()
+        message['trace'] = {**context.to_dict(), 'sent_at': now}
+        self.record(context, hop, now)
+        return message
+
+    def record(self, context: Optional[FrameContext], hop: str, now: Optional[float] = None):
+        """Record capture-to-hop latency for a sampled frame."""
+        if context is None or not context.sampled:
+            return
+        latency = max(context.age(now), 0.0)
+        key = (context.camera_id, hop)
+        with self._lock:
+            histogram = self._spans.get(key)
+            if histogram is None:
+                histogram = Histogram(LATENCY_BUCKETS)
+                self._spans[key] = histogram
+            histogram.observe(latency)
+            self._last[key] = latency
+
+    def record_client_ack(self, trace: Dict[str, Any]):
+        """Close a glass-to-glass span from a trace echoed back by a browser."""
+        self.record(FrameContext.from_dict(trace), 'client_ack')
+
+    def latency_summary(self, camera_id: Any) -> Dict[str, Dict[str, float]]:
+        """Mean, approximate p95 and latest latency per hop for a camera."""
+        camera_id = str(camera_id)
+        summary = {}
+        with self._lock:
+            for (span_camera, hop), histogram in self._spans.items():
+                if span_camera != camera_id or not histogram.count:
+                    continue
+                rank = 0.95 * histogram.count
+                p95 = histogram.buckets[-1]
+                for bound, cumulative in histogram.cumulative():
+                    if cumulative >= rank:
+                        p95 = float(bound)
+                        break
+                summary[hop] = {
+                    'mean': histogram.sum / histogram.count,
+                    'p95': p95,
+                    'last': self._last[(span_camera, hop)],
+                    'count': histogram.count
+                }
+        return summary
+
+    def _collect(self):
+        with self._lock:
+            samples = [
+                ({'camera': camera_id, 'hop': hop}, histogram)
+                for (camera_id, hop), histogram in sorted(self._spans.items())
+            ]
+            # Alerting is on this histogram, e.g. histogram_quantile over a rate window
+            return [(
+                'visioncave_frame_latency_seconds', 'histogram',
+                'Sampled latency from frame capture to each pipeline hop', samples
+            )]
+
+frame_tracer = FrameTracer()
@@ -0,0 +1,344 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from datetime import datetime, timedelta
+import bisect
+import threading
+import logging
+from sqlalchemy import and_, or_
+from ..models.sql_models import ModelMetricsAggregate
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+EPOCH = datetime(1970, 1, 1)
+
+def align_timestamp(timestamp: datetime, seconds: int, ceil: bool = False) -> datetime:
+    """Align a naive UTC timestamp down (or up) to a multiple of ``seconds`` since the epoch."""
+    elapsed = (timestamp - EPOCH).total_seconds()
+    aligned = int(elapsed // seconds) * seconds
+    if ceil and aligned < elapsed:
+        aligned += seconds
+    return EPOCH + timedelta(seconds=aligned)
+
+def plan_rollup_ranges(
+    start_time: datetime,
+    end_time: datetime,
+    resolutions: List[int]
+) -> List[Tuple[int, datetime, datetime]]:
+    """Cover [start_time, end_time) with the coarsest rollup buckets that fit.
+
+    Whole days are read from the day rollup, the remaining whole hours at
+    either edge from the hour rollup, and only the ragged edges from the
+    finest resolution, so the number of rows read is bounded by the number of
+    resolutions rather than by the length of the range or the traffic.
+    """
+    if start_time >= end_time or not resolutions:
+        return []
+
+    resolutions = sorted(resolutions, reverse=True)
+    resolution, finer = resolutions[0], resolutions[1:]
+
+    if not finer:
+        # Finest level: include every bucket that overlaps the range
+        return [(resolution, align_timestamp(start_time, resolution), end_time)]
+
+    inner_start = align_timestamp(start_time, resolution, ceil=True)
+    inner_end = align_timestamp(end_time, resolution)
+    if inner_start >= inner_end:
+        return plan_rollup_ranges(start_time, end_time, finer)
+
+    return (
+        plan_rollup_ranges(start_time, inner_start, finer)
+        + [(resolution, inner_start, inner_end)]
+        + plan_rollup_ranges(inner_end, end_time, finer)
+    )
+
+class MetricBucket:
+    """Streaming count/sum/min/max (and optional histogram) for one metric in one time bucket."""
+
+    def __init__(self, histogram: bool = False):
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.histogram: Optional[List[int]] = [0] * (len(LATENCY_BUCKETS_MS) + 1) if histogram else None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.histogram is not None:
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+
+    def merge(self, count: int, total: float, minimum: Optional[float],
+              maximum: Optional[float], histogram: Optional[List[int]] = None):
+        """Merge pre-aggregated values into this bucket."""
+        if not count:
+            return
+        self.count += count
+        self.sum += total
+        if minimum is not None:
+            self.min = minimum if self.min is None else min(self.min, minimum)
+        if maximum is not None:
+            self.max = maximum if self.max is None else max(self.max, maximum)
+        if histogram:
+            if self.histogram is None:
+                self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for i, bucket_count in enumerate(histogram):
+                self.histogram[i] += bucket_count
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate a percentile from the histogram bucket upper bounds."""
+        if not self.histogram or not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.histogram):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        result = {
+            'average': self.sum / self.count if self.count else 0.0,
+            'min': float(self.min) if self.min is not None else 0.0,
+            'max': float(self.max) if self.max is not None else 0.0,
+            'count': int(self.count)
+        }
+        if self.histogram is not None:
+            result['p50'] = self.percentile(0.5)
+            result['p95'] = self.percentile(0.95)
+            result['p99'] = self.percentile(0.99)
+        return result
+
+class MetricAggregator:
+    """Aggregates model metrics in memory per model and time bucket.
+
+    Each closed bucket is written as a single ModelMetricsAggregate row and
+    merged into the coarser rollups (1 hour and 1 day by default), so storage
+    and query cost grow with elapsed time rather than with traffic.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        bucket_seconds: int = settings.METRICS_BUCKET_SECONDS,
+        flush_interval: float = settings.METRICS_FLUSH_INTERVAL,
+        histogram_metrics: Tuple[str, ...] = ('latency_ms',),
+        rollup_resolutions: Optional[List[int]] = None
+    ):
+        self.session_factory = session_factory
+        self.bucket_seconds = bucket_seconds
+        resolutions = rollup_resolutions or settings.METRICS_ROLLUP_RESOLUTIONS
+        self.resolutions = sorted(
+            {bucket_seconds} | {r for r in resolutions if r > bucket_seconds and r % bucket_seconds == 0}
+        )
+        self.flush_interval = flush_interval
+        self.histogram_metrics = set(histogram_metrics)
+
+        # (model_id, metric_name, bucket_start) -> MetricBucket
+        self._buckets: Dict[Tuple[str, str, datetime], MetricBucket] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            'observations': 0,
+            'rows_written': 0,
+            'flush_errors': 0,
+            'last_flush_at': None
+        }
+
+    def start(self):
+        """Start the periodic flush thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='metric-aggregator', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the flush thread and write all open buckets."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.flush(force=True)
+
+    def bucket_start(self, timestamp: datetime) -> datetime:
+        """Align a timestamp to the start of its bucket."""
+        return align_timestamp(timestamp, self.bucket_seconds)
+
+    def observe(
+        self,
+        model_id: str,
+        metric_name: str,
+        value: float,
+        timestamp: Optional[datetime] = None
+    ):
+        """Add one observation to the current bucket."""
+        key = (model_id, metric_name, self.bucket_start(timestamp or datetime.utcnow()))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = MetricBucket(histogram=metric_name in self.histogram_metrics)
+                self._buckets[key] = bucket
+            bucket.observe(float(value))
+            self.stats['observations'] += 1
+
+    def observe_many(
+        self,
+        model_id: str,
+        metrics: Dict[str, float],
+        timestamp: Optional[datetime] = None
+    ):
+        """Add one observation per metric at the same timestamp."""
+        timestamp = timestamp or datetime.utcnow()
+        for metric_name, value in metrics.items():
+            self.observe(model_id, metric_name, value, timestamp)
+
+    def snapshot(
+        self,
+        model_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        metric_names: Optional[List[str]] = None
+    ) -> Dict[str, MetricBucket]:
+        """Merge the not-yet-flushed buckets in a time range, per metric."""
+        merged: Dict[str, MetricBucket] = {}
+        with self._lock:
+            for (bucket_model, metric_name, bucket_start), bucket in self._buckets.items():
+                if bucket_model != model_id:
+                    continue
+                if metric_names and metric_name not in metric_names:
+                    continue
+                if not (start_time <= bucket_start + timedelta(seconds=self.bucket_seconds)
+                        and bucket_start <= end_time):
+                    continue
+                target = merged.setdefault(metric_name, MetricBucket())
+                target.merge(bucket.count, bucket.sum, bucket.min, bucket.max, bucket.histogram)
+        return merged
+
+    def query(
+        self,
+        db: Any,
+        model_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        metric_names: Optional[List[str]] = None
+    ) -> Dict[str, MetricBucket]:
+        """Merge rollup rows and unflushed buckets covering a time range, per metric."""
+        ranges = plan_rollup_ranges(start_time, end_time, self.resolutions)
+        merged = self.snapshot(model_id, start_time, end_time, metric_names)
+        if not ranges:
+            return merged
+
+        query = (
+            db.query(ModelMetricsAggregate)
+            .filter(ModelMetricsAggregate.model_id == model_id)
+            .filter(or_(*[
+                and_(
+                    ModelMetricsAggregate.resolution == resolution,
+                    ModelMetricsAggregate.bucket_start >= range_start,
+                    ModelMetricsAggregate.bucket_start < range_end
+                )
+                for resolution, range_start, range_end in ranges
+            ]))
+        )
+        if metric_names:
+            query = query.filter(ModelMetricsAggregate.metric_name.in_(metric_names))
+
+        for row in query.all():
+            bucket = merged.setdefault(row.metric_name, MetricBucket())
+            bucket.merge(row.count, row.sum, row.min, row.max, row.histogram)
+        return merged
+
+    def flush(self, force: bool = False) -> int:
+        """Write closed buckets (or all buckets when forced) into every rollup resolution."""
+        cutoff = self.bucket_start(datetime.utcnow())
+        with self._lock:
+            keys = [key for key in self._buckets if force or key[2] < cutoff]
+            pending = {key: self._buckets.pop(key) for key in keys}
+        if not pending:
+            return 0
+
+        # Fold the closed buckets into one delta per rollup bucket
+        rollups: Dict[Tuple[str, str, int, datetime], MetricBucket] = {}
+        for (model_id, metric_name, bucket_start), bucket in pending.items():
+            for resolution in self.resolutions:
+                key = (model_id, metric_name, resolution, align_timestamp(bucket_start, resolution))
+                delta = rollups.setdefault(key, MetricBucket())
+                delta.merge(bucket.count, bucket.sum, bucket.min, bucket.max, bucket.histogram)
+
+        db = self.session_factory()
+        try:
+            for (model_id, metric_name, resolution, bucket_start), bucket in rollups.items():
+                self._upsert(db, model_id, metric_name, resolution, bucket_start, bucket)
+            db.commit()
+            self.stats['rows_written'] += len(rollups)
+            self.stats['last_flush_at'] = datetime.utcnow().isoformat()
+            return len(pending)
+        except Exception as e:
+            db.rollback()
+            self.stats['flush_errors'] += 1
+            logger.error(f"Error flushing metric aggregates: {str(e)}")
+
+            # Put the buckets back so they are retried on the next flush
+            with self._lock:
+                for key, bucket in pending.items():
+                    existing = self._buckets.get(key)
+                    if existing is not None:
+                        bucket.merge(existing.count, existing.sum, existing.min, existing.max, existing.histogram)
+                    self._buckets[key] = bucket
+            return 0
+        finally:
+            db.close()
+
+    def _upsert(
+        self,
+        db: Any,
+        model_id: str,
+        metric_name: str,
+        resolution: int,
+        bucket_start: datetime,
+        bucket: MetricBucket
+    ):
+        """Insert a rollup row or merge the delta into the existing one."""
+        row = (
+            db.query(ModelMetricsAggregate)
+            .filter(ModelMetricsAggregate.model_id == model_id)
+            .filter(ModelMetricsAggregate.resolution == resolution)
+            .filter(ModelMetricsAggregate.bucket_start == bucket_start)
+            .filter(ModelMetricsAggregate.metric_name == metric_name)
+            .first()
+        )
+        if row is None:
+            db.add(ModelMetricsAggregate(
+                model_id=model_id,
+                metric_name=metric_name,
+                resolution=resolution,
+                bucket_start=bucket_start,
+                count=bucket.count,
+                sum=bucket.sum,
+                min=bucket.min,
+                max=bucket.max,
+                histogram=bucket.histogram,
+                updated_at=datetime.utcnow()
+            ))
+            return
+
+        merged = MetricBucket()
+        merged.merge(row.count, row.sum, row.min, row.max, row.histogram)
+        merged.merge(bucket.count, bucket.sum, bucket.min, bucket.max, bucket.histogram)
+        row.count = merged.count
+        row.sum = merged.sum
+        row.min = merged.min
+        row.max = merged.max
+        row.histogram = merged.histogram
+        row.updated_at = datetime.utcnow()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
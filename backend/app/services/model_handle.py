@@ -0,0 +1,169 @@
+from typing import Any, Callable, Optional
+from datetime import datetime
+from contextlib import contextmanager
+import asyncio
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class ModelSession:
+    """A loaded model instance with in-flight request accounting."""
+
+    def __init__(
+        self,
+        model: Any,
+        version: Optional[str] = None,
+        release: Optional[Callable[[Any], None]] = None
+    ):
+        self.model = model
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+        self._release = release
+        self._inflight = 0
+        self._retired = False
+        self._closed = False
+        self._drained = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def retired(self) -> bool:
+        return self._retired
+
+    def _enter(self):
+        with self._lock:
+            self._inflight += 1
+
+    def _exit(self):
+        with self._lock:
+            self._inflight -= 1
+            should_close = self._retired and self._inflight == 0
+        if should_close:
+            self._close()
+
+    def retire(self):
+        """Stop accepting work; the session is released once in-flight work finishes."""
+        with self._lock:
+            self._retired = True
+            should_close = self._inflight == 0
+        if should_close:
+            self._close()
+
+    def wait_drained(self, timeout: Optional[float] = None) -> bool:
+        """Block until the retired session has no in-flight work left."""
+        return self._drained.wait(timeout)
+
+    def _close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        try:
+            if self._release:
+                self._release(self.model)
+        except Exception as e:
+            logger.error(f"Error releasing model session {self.version}: {str(e)}")
+        finally:
+            self.model = None
+            self._drained.set()
+
+class ModelHandle:
+    """Atomic reference to the model session currently serving a model ID.
+
+    Consumers lease the current session for the duration of a batch. A swap
+    loads and warms the replacement off the event loop, flips the reference,
+    and releases the previous session only after its last lease is returned.
+    """
+
+    def __init__(self, model_id: str, session: ModelSession):
+        self.model_id = model_id
+        self._session = session
+        self._lock = threading.Lock()
+        self._swap_lock = asyncio.Lock()
+        self.swap_count = 0
+        self.last_swap_at: Optional[datetime] = None
+
+    @property
+    def session(self) -> ModelSession:
+        return self._session
+
+    @property
+    def model(self) -> Any:
+        return self._session.model
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._session.version
+
+    @contextmanager
+    def lease(self):
+        """Pin the current session for one batch of inference."""
+        with self.lease_session() as session:
+            yield session.model
+
+    @contextmanager
+    def lease_session(self):
+        """Pin the current session, for callers that also need its version."""
+        with self._lock:
+            session = self._session
+            session._enter()
+        try:
+            yield session
+        finally:
+            session._exit()
+
+    async def swap(
+        self,
+        loader: Callable[[], Any],
+        version: Optional[str] = None,
+        warmup: Optional[Callable[[Any], None]] = None,
+        release: Optional[Callable[[Any], None]] = None,
+        drain_timeout: float = 30.0
+    ) -> ModelSession:
+        """Load, warm and atomically install a new model session."""
+        async with self._swap_lock:
+            loop = asyncio.get_running_loop()
+            start_time = time.monotonic()
+
+            # Load and warm the replacement without touching the live session
+            model = await loop.run_in_executor(None, loader)
+            if warmup:
+                await loop.run_in_executor(None, warmup, model)
+            new_session = ModelSession(model, version, release)
+
+            # Flip the handle; new leases go to the replacement from here on
+            with self._lock:
+                old_session = self._session
+                self._session = new_session
+            old_session.retire()
+
+            self.swap_count += 1
+            self.last_swap_at = datetime.utcnow()
+            logger.info(
+                f"Model {self.model_id} swapped {old_session.version} -> {version} "
+                f"in {time.monotonic() - start_time:.2f}s"
+            )
+
+            # Wait for in-flight batches on the old session to finish
+            drained = await loop.run_in_executor(
+                None, old_session.wait_drained, drain_timeout
+            )
+            if not drained:
+                logger.warning(
+                    f"Model {self.model_id} version {old_session.version} still has "
+                    f"{old_session.inflight} in-flight batches; it will be released when they finish"
+                )
+
+            return new_session
+
+    def close(self):
+        """Retire the current session, e.g. when the model is unloaded."""
+        with self._lock:
+            session = self._session
+        session.retire()
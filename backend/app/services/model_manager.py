@@ -12,6 +12,7 @@ from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
 from ..models.sql_models import Model
 from ..core.config import settings
+from .model_handle import ModelHandle, ModelSession
 import asyncio
 import aiofiles
 import requests
@@ -23,6 +24,7 @@ class ModelManager:
     def __init__(self):
         self.model_cache = {}
         self.model_configs = {}
+        self.model_handles: Dict[str, ModelHandle] = {}
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         
         # Ensure model directory exists
@@ -133,13 +135,7 @@ class ModelManager:
             with open(config_path, 'r') as f:
                 config = json.load(f)
             
-            # Load model based on framework
-            if config['framework'] == 'pytorch':
-                model = self._load_pytorch_model(model_path, config)
-            elif config['framework'] == 'tensorflow':
-                model = self._load_tensorflow_model(model_path, config)
-            else:
-                model = self._load_onnx_model(model_path, config)
+            model = self._load_model_file(model_path, config)
             
             self.model_cache[model_id] = model
             self.model_configs[model_id] = config
@@ -149,8 +145,61 @@ class ModelManager:
             logger.error(f"Error loading model {model_id}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
 
+    async def get_handle(self, model_id: str) -> ModelHandle:
+        """Get the hot-swappable serving handle for a model."""
+        if model_id in self.model_handles:
+            return self.model_handles[model_id]
+        
+        model = await self.load_model(model_id)
+        handle = ModelHandle(model_id, ModelSession(model))
+        self.model_handles[model_id] = handle
+        return handle
+
+    async def hot_swap(
+        self, model_id: str, model_path: str, version: Optional[str] = None
+    ) -> bool:
+        """Swap in-process consumers of a model onto a new model file."""
+        handle = self.model_handles.get(model_id)
+        if handle is None:
+            # Nothing is serving this model; the next load picks up the new file
+            self.model_cache.pop(model_id, None)
+            return False
+        
+        config = self.model_configs.get(model_id)
+        if config is None:
+            config_path = os.path.join(settings.MODEL_DIR, f"{model_id}_config.json")
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        
+        await handle.swap(
+            loader=lambda: self._load_model_file(model_path, config),
+            version=version,
+            warmup=lambda model: self._warmup_model(model, config)
+        )
+        
+        self.model_cache[model_id] = handle.model
+        self.model_configs[model_id] = config
+        return True
+
+    async def load_detached_handle(
+        self, model_id: str, model_path: str, version: Optional[str] = None
+    ) -> ModelHandle:
+        """Load a model file into a handle that is not used for serving, e.g. a shadow candidate."""
+        config = self.model_configs.get(model_id)
+        if config is None:
+            config_path = os.path.join(settings.MODEL_DIR, f"{model_id}_config.json")
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        
+        loop = asyncio.get_running_loop()
+        model = await loop.run_in_executor(None, self._load_model_file, model_path, config)
+        await loop.run_in_executor(None, self._warmup_model, model, config)
+        return ModelHandle(model_id, ModelSession(model, version))
+
     async def unload_model(self, model_id: str):
         """Unload a model from memory."""
+        if model_id in self.model_handles:
+            self.model_handles.pop(model_id).close()
         if model_id in self.model_cache:
             del self.model_cache[model_id]
         if model_id in self.model_configs:
@@ -287,6 +336,26 @@ class ModelManager:
             model.error_message = str(e)
             raise
 
+    def _load_model_file(self, path: str, config: Dict[str, Any]) -> Any:
+        """Load a model file based on its framework."""
+        if config['framework'] == 'pytorch':
+            return self._load_pytorch_model(path, config)
+        elif config['framework'] == 'tensorflow':
+            return self._load_tensorflow_model(path, config)
+        return self._load_onnx_model(path, config)
+
+    def _warmup_model(self, model: Any, config: Dict[str, Any]):
+        """Run a dummy batch so the first real frame does not pay lazy-init costs."""
+        input_shape = config.get('input_shape')
+        if not input_shape:
+            return
+        
+        if isinstance(model, torch.nn.Module):
+            with torch.no_grad():
+                model(torch.zeros(input_shape, device=self.device))
+        elif callable(model):
+            model(tf.zeros(input_shape))
+
     def _load_pytorch_model(self, path: str, config: Dict[str, Any]) -> torch.nn.Module:
         """Load PyTorch model."""
         model = torch.jit.load(path, map_location=self.device)
@@ -3,21 +3,36 @@ from datetime import datetime, timedelta
 import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from ..models.sql_models import Model, ModelMetrics, ModelPrediction
+from ..models.sql_models import Model, ModelMetrics, ModelPrediction, ModelMetricsAggregate
 import logging
 import json
 import os
 from ..core.config import settings
+from .prediction_writer import PredictionWriter
+from .metric_aggregator import MetricAggregator
+from .report_engine import StreamingClassificationReport
+from .drift_monitor import DriftMonitor
 import pandas as pd
-from sklearn.metrics import confusion_matrix, classification_report
 import plotly.graph_objects as go
 import plotly.express as px
 
 logger = logging.getLogger(__name__)
 
 class ModelMonitor:
-    def __init__(self):
+    def __init__(
+        self,
+        prediction_writer: Optional[PredictionWriter] = None,
+        metric_aggregator: Optional[MetricAggregator] = None,
+        drift_monitor: Optional[DriftMonitor] = None
+    ):
         self.metrics_cache = {}
+        self.prediction_writer = prediction_writer
+        self.metric_aggregator = metric_aggregator
+        self.drift_monitor = drift_monitor
+        if prediction_writer is not None:
+            prediction_writer.start()
+        if metric_aggregator is not None:
+            metric_aggregator.start()
         os.makedirs(settings.MODEL_METRICS_DIR, exist_ok=True)
 
     async def log_prediction(
@@ -28,8 +43,45 @@ class ModelMonitor:
         prediction: Any,
         ground_truth: Optional[Any] = None,
         metadata: Optional[Dict[str, Any]] = None
-    ) -> ModelPrediction:
-        """Log a model prediction for monitoring."""
+    ) -> Optional[ModelPrediction]:
+        """Log a model prediction for monitoring.
+
+        With a prediction writer configured the record is buffered for a bulk
+        insert and None is returned. Shadow predictions (``metadata['shadow']``)
+        are stored but never counted in the model's metrics or drift.
+        """
+        shadow = bool((metadata or {}).get('shadow'))
+        if self.metric_aggregator is not None and not shadow:
+            self._observe_prediction(model_id, prediction, ground_truth, metadata)
+        
+        if self.drift_monitor is not None and not shadow:
+            camera_id = (metadata or {}).get('camera_id') or (input_data or {}).get('camera_id')
+            self.drift_monitor.observe(model_id, camera_id, prediction)
+        
+        if self.prediction_writer is not None:
+            timestamp = datetime.utcnow()
+            metric_rows = []
+            if ground_truth is not None and self.metric_aggregator is None and not shadow:
+                metric_rows = [
+                    {
+                        'model_id': model_id,
+                        'metric_name': metric_name,
+                        'value': value,
+                        'timestamp': timestamp
+                    }
+                    for metric_name, value in self._calculate_metrics(prediction, ground_truth).items()
+                ]
+            
+            await self.prediction_writer.asubmit({
+                'model_id': model_id,
+                'input_data': input_data,
+                'prediction': prediction,
+                'ground_truth': ground_truth,
+                'metadata': metadata or {},
+                'timestamp': timestamp
+            }, metric_rows)
+            return None
+        
         try:
             prediction_record = ModelPrediction(
                 model_id=model_id,
@@ -45,7 +97,7 @@ class ModelMonitor:
             db.refresh(prediction_record)
             
             # Update real-time metrics if ground truth is available
-            if ground_truth is not None:
+            if ground_truth is not None and self.metric_aggregator is None and not shadow:
                 await self.update_metrics(db, model_id, prediction, ground_truth)
             
             return prediction_record
@@ -63,14 +115,14 @@ class ModelMonitor:
         ground_truth: Any
     ):
         """Update model metrics based on prediction results."""
+        if self.metric_aggregator is not None:
+            self.metric_aggregator.observe_many(
+                model_id, self._calculate_metrics(prediction, ground_truth)
+            )
+            return
+        
         try:
-            # Calculate accuracy
-            is_correct = prediction == ground_truth
-            
-            metrics = {
-                'accuracy': float(is_correct),
-                'prediction_count': 1
-            }
+            metrics = self._calculate_metrics(prediction, ground_truth)
             
             # Add metrics records
             for metric_name, value in metrics.items():
@@ -89,6 +141,41 @@ class ModelMonitor:
             logger.error(f"Error updating metrics: {str(e)}")
             raise
 
+    def _calculate_metrics(self, prediction: Any, ground_truth: Any) -> Dict[str, float]:
+        """Calculate per-prediction metrics against ground truth."""
+        is_correct = prediction == ground_truth
+        
+        return {
+            'accuracy': float(is_correct),
+            'prediction_count': 1
+        }
+
+    def observe_detections(
+        self,
+        model_id: str,
+        camera_id: Any,
+        detections: List[Dict[str, Any]]
+    ):
+        """Track detection distributions for drift without logging the prediction."""
+        if self.drift_monitor is not None:
+            self.drift_monitor.observe(model_id, camera_id, detections)
+
+    def _observe_prediction(
+        self,
+        model_id: str,
+        prediction: Any,
+        ground_truth: Optional[Any],
+        metadata: Optional[Dict[str, Any]]
+    ):
+        """Feed one prediction into the streaming aggregator."""
+        timestamp = datetime.utcnow()
+        metrics = {'prediction_count': 1}
+        if ground_truth is not None:
+            metrics.update(self._calculate_metrics(prediction, ground_truth))
+        if metadata and metadata.get('latency_ms') is not None:
+            metrics['latency_ms'] = float(metadata['latency_ms'])
+        self.metric_aggregator.observe_many(model_id, metrics, timestamp)
+
     async def get_performance_metrics(
         self,
         db: Session,
@@ -103,6 +190,11 @@ class ModelMonitor:
         if not end_time:
             end_time = datetime.utcnow()
             
+        if self.metric_aggregator is not None:
+            return self._get_aggregated_metrics(
+                db, model_id, start_time, end_time, metric_names
+            )
+            
         query = (
             db.query(
                 ModelMetrics.metric_name,
@@ -134,6 +226,25 @@ class ModelMonitor:
             
         return metrics_summary
 
+    def _get_aggregated_metrics(
+        self,
+        db: Session,
+        model_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        metric_names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Summarise metrics from the coarsest rollups covering the range plus unflushed buckets."""
+        merged = self.metric_aggregator.query(
+            db, model_id, start_time, end_time, metric_names
+        )
+        
+        return {
+            metric_name: bucket.summary()
+            for metric_name, bucket in merged.items()
+            if bucket.count
+        }
+
     async def generate_performance_report(
         self,
         db: Session,
@@ -147,25 +258,35 @@ class ModelMonitor:
         if not end_time:
             end_time = datetime.utcnow()
             
-        # Get predictions with ground truth
+        # Stream predictions with ground truth through a server-side cursor
+        chunk_size = settings.REPORT_CHUNK_SIZE
         predictions = (
-            db.query(ModelPrediction)
+            db.query(ModelPrediction.ground_truth, ModelPrediction.prediction)
             .filter(ModelPrediction.model_id == model_id)
             .filter(ModelPrediction.timestamp.between(start_time, end_time))
             .filter(ModelPrediction.ground_truth != None)
-            .all()
+            .execution_options(stream_results=True)
+            .yield_per(chunk_size)
         )
         
-        if not predictions:
+        # Build the confusion matrix incrementally, one chunk at a time
+        report_engine = StreamingClassificationReport()
+        y_true, y_pred = [], []
+        for ground_truth, prediction in predictions:
+            y_true.append(ground_truth)
+            y_pred.append(prediction)
+            if len(y_true) >= chunk_size:
+                report_engine.update(y_true, y_pred)
+                y_true, y_pred = [], []
+        if y_true:
+            report_engine.update(y_true, y_pred)
+        
+        if not report_engine.total:
             return {"error": "No predictions with ground truth found"}
             
-        # Convert to arrays
-        y_true = [p.ground_truth for p in predictions]
-        y_pred = [p.prediction for p in predictions]
-        
         # Calculate metrics
-        conf_matrix = confusion_matrix(y_true, y_pred)
-        class_report = classification_report(y_true, y_pred, output_dict=True)
+        conf_matrix = report_engine.confusion_matrix()
+        class_report = report_engine.classification_report()
         
         # Generate visualizations
         figures = await self._generate_visualizations(
@@ -184,7 +305,7 @@ class ModelMonitor:
                 'classification_report': class_report
             },
             'visualizations': figures,
-            'prediction_count': len(predictions),
+            'prediction_count': report_engine.total,
             'generated_at': datetime.utcnow().isoformat()
         }
         
@@ -206,23 +327,10 @@ class ModelMonitor:
         end_time: datetime
     ) -> Dict[str, Any]:
         """Generate visualizations for the performance report."""
-        # Get metrics over time
-        metrics = (
-            db.query(ModelMetrics)
-            .filter(ModelMetrics.model_id == model_id)
-            .filter(ModelMetrics.timestamp.between(start_time, end_time))
-            .all()
-        )
-        
-        # Convert to DataFrame
-        df = pd.DataFrame([
-            {
-                'metric_name': m.metric_name,
-                'value': m.value,
-                'timestamp': m.timestamp
-            }
-            for m in metrics
-        ])
+        if self.metric_aggregator is not None:
+            df = self._load_rollup_series(db, model_id, start_time, end_time)
+        else:
+            df = self._load_raw_metric_series(db, model_id, start_time, end_time)
         
         figures = {}
         
@@ -248,6 +356,67 @@ class ModelMonitor:
             
         return figures
 
+    def _load_rollup_series(
+        self,
+        db: Session,
+        model_id: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> pd.DataFrame:
+        """Load per-bucket averages at the finest rollup that stays within the chart point budget."""
+        span_seconds = (end_time - start_time).total_seconds()
+        resolutions = self.metric_aggregator.resolutions
+        resolution = next(
+            (r for r in resolutions if span_seconds / r <= settings.REPORT_MAX_CHART_POINTS),
+            resolutions[-1]
+        )
+        
+        rows = (
+            db.query(ModelMetricsAggregate)
+            .filter(ModelMetricsAggregate.model_id == model_id)
+            .filter(ModelMetricsAggregate.resolution == resolution)
+            .filter(ModelMetricsAggregate.bucket_start.between(start_time, end_time))
+            .order_by(ModelMetricsAggregate.bucket_start)
+            .all()
+        )
+        
+        return pd.DataFrame([
+            {
+                'metric_name': row.metric_name,
+                'value': row.sum / row.count if row.count else 0.0,
+                'timestamp': row.bucket_start
+            }
+            for row in rows
+        ])
+
+    def _load_raw_metric_series(
+        self,
+        db: Session,
+        model_id: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> pd.DataFrame:
+        """Load raw metric rows for models monitored without an aggregator."""
+        # Get metrics over time
+        metrics = (
+            db.query(ModelMetrics)
+            .filter(ModelMetrics.model_id == model_id)
+            .filter(ModelMetrics.timestamp.between(start_time, end_time))
+            .all()
+        )
+        
+        # Convert to DataFrame
+        df = pd.DataFrame([
+            {
+                'metric_name': m.metric_name,
+                'value': m.value,
+                'timestamp': m.timestamp
+            }
+            for m in metrics
+        ])
+        
+        return df
+
     async def set_monitoring_alerts(
         self,
         db: Session,
@@ -280,11 +449,18 @@ class ModelMonitor:
     ) -> List[Dict[str, Any]]:
         """Check if any monitoring alerts are triggered."""
         model = db.query(Model).filter(Model.id == model_id).first()
-        if not model or not model.configuration.get('monitoring_alerts'):
+        if not model:
             return []
             
         alerts = []
-        alerts_config = model.configuration['monitoring_alerts']
+        alerts_config = (model.configuration or {}).get('monitoring_alerts') or {}
+        
+        # Drift alerts do not need ground truth, so they are checked even without configured metrics
+        if self.drift_monitor is not None:
+            alerts.extend(self._check_drift_alerts(model_id, alerts_config.get('drift', {})))
+        
+        if not alerts_config:
+            return alerts
         
         # Get recent metrics
         recent_metrics = await self.get_performance_metrics(
@@ -295,6 +471,8 @@ class ModelMonitor:
         
         # Check each alert condition
         for metric_name, thresholds in alerts_config.items():
+            if metric_name == 'drift':
+                continue
             if metric_name in recent_metrics:
                 metric_value = recent_metrics[metric_name]['average']
                 
@@ -319,3 +497,31 @@ class ModelMonitor:
                     })
                     
         return alerts
+
+    def _check_drift_alerts(
+        self,
+        model_id: str,
+        thresholds: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        """Raise alerts for cameras whose detection distributions drifted from the reference."""
+        psi_threshold = thresholds.get('psi', settings.DRIFT_PSI_THRESHOLD)
+        ks_threshold = thresholds.get('ks', settings.DRIFT_KS_THRESHOLD)
+        
+        alerts = []
+        for result in self.drift_monitor.evaluate(model_id):
+            for statistic, threshold in (('psi', psi_threshold), ('ks', ks_threshold)):
+                value = result[statistic]
+                if value is None or value <= threshold:
+                    continue
+                alerts.append({
+                    'model_id': model_id,
+                    'metric_name': f"drift_{result['feature']}_{statistic}",
+                    'camera_id': result['camera_id'],
+                    'current_value': value,
+                    'threshold': threshold,
+                    'samples': result['samples'],
+                    'type': 'distribution_drift',
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+                
+        return alerts
@@ -1,7 +1,9 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+import asyncio
 import json
 import os
+import shutil
 from sqlalchemy.orm import Session
 from ..models.sql_models import Model, ModelVersion, ModelMetrics
 from ..core.config import settings
@@ -10,9 +12,17 @@ import hashlib
 
 logger = logging.getLogger(__name__)
 
+# Name of the model artifact stored in each version directory, by framework
+ARTIFACT_NAMES = {
+    'onnx': 'model.onnx',
+    'pytorch': 'model.pt',
+    'tensorflow': 'saved_model'
+}
+
 class ModelVersionManager:
-    def __init__(self):
+    def __init__(self, model_manager=None):
         self.version_cache = {}
+        self.model_manager = model_manager
         os.makedirs(settings.MODEL_VERSIONS_DIR, exist_ok=True)
 
     async def create_version(
@@ -24,6 +34,12 @@ class ModelVersionManager:
     ) -> ModelVersion:
         """Create a new version of a model."""
         try:
+            model = db.query(Model).filter(Model.id == model_id).first()
+            if not model:
+                raise ValueError("Model not found")
+            if not model.file_path or not os.path.exists(model.file_path):
+                raise ValueError("Model file not found")
+            
             # Generate version hash
             version_hash = self._generate_version_hash(version_data)
             
@@ -31,6 +47,12 @@ class ModelVersionManager:
             version_dir = os.path.join(settings.MODEL_VERSIONS_DIR, model_id, version_hash)
             os.makedirs(version_dir, exist_ok=True)
             
+            # Snapshot the weights being versioned so a rollback restores them
+            artifact_path = os.path.join(version_dir, ARTIFACT_NAMES.get(model.framework, 'model.onnx'))
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._copy_artifact, str(model.file_path), artifact_path
+            )
+            
             # Save version metadata
             metadata_path = os.path.join(version_dir, 'metadata.json')
             with open(metadata_path, 'w') as f:
@@ -139,7 +161,16 @@ class ModelVersionManager:
         model_id: str,
         version_hash: str
     ) -> bool:
-        """Rollback to a previous version."""
+        """Rollback to a previous version.
+
+        Serving weights, the model file and the database change together: if
+        any step fails, the steps already taken are undone.
+        """
+        loop = asyncio.get_running_loop()
+        swapped = False
+        model_path = None
+        backup_path = None
+        previous_version = None
         try:
             # Get version
             version = (
@@ -157,9 +188,26 @@ class ModelVersionManager:
             if not model:
                 raise ValueError("Model not found")
             
-            # Copy version files to model directory
             version_dir = os.path.join(settings.MODEL_VERSIONS_DIR, model_id, version_hash)
-            model_dir = os.path.join(settings.MODEL_DIR, model_id)
+            version_model_path = self._find_artifact(version_dir)
+            if version_model_path is None:
+                raise ValueError("Version model file not found")
+            
+            # Keep the current weights until the rollback is committed
+            model_path = str(model.file_path)
+            if os.path.exists(model_path):
+                backup_path = f"{model_path}.rollback"
+                await loop.run_in_executor(None, self._copy_artifact, model_path, backup_path)
+            
+            # Swap in-process consumers first; the database only records the
+            # rollback once the restored weights are actually serving
+            if self.model_manager is not None:
+                handle = self.model_manager.model_handles.get(model_id)
+                previous_version = handle.version if handle else None
+                swapped = await self.model_manager.hot_swap(model_id, version_model_path, version_hash)
+            
+            # Restore the version's weights as the model file for later loads
+            await loop.run_in_executor(None, self._copy_artifact, version_model_path, model_path)
             
             # Update model metadata
             model.configuration = version.metadata
@@ -172,7 +220,75 @@ class ModelVersionManager:
         except Exception as e:
             db.rollback()
             logger.error(f"Error rolling back version: {str(e)}")
+            await self._undo_rollback(model_id, model_path, backup_path, previous_version, swapped)
             return False
+        
+        finally:
+            if backup_path and os.path.exists(backup_path):
+                await loop.run_in_executor(None, self._remove_artifact, backup_path)
+
+    async def _undo_rollback(
+        self,
+        model_id: str,
+        model_path: Optional[str],
+        backup_path: Optional[str],
+        previous_version: Optional[str],
+        swapped: bool
+    ):
+        """Put the pre-rollback weights back on disk and in serving after a failed rollback."""
+        if not backup_path or not os.path.exists(backup_path):
+            if swapped:
+                logger.error(f"No backup to restore model {model_id} from; serving the rolled-back version")
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._copy_artifact, backup_path, model_path
+            )
+            if swapped:
+                await self.model_manager.hot_swap(model_id, model_path, previous_version)
+        except Exception as e:
+            logger.error(f"Error undoing rollback of model {model_id}; serving and database may disagree: {str(e)}")
+
+    async def load_candidate(self, model_id: str, version_hash: str):
+        """Load a stored version as a standalone handle for shadow evaluation."""
+        if self.model_manager is None:
+            raise ValueError("Model manager is required to load candidate versions")
+        
+        version_dir = os.path.join(settings.MODEL_VERSIONS_DIR, model_id, version_hash)
+        model_path = self._find_artifact(version_dir)
+        if model_path is None:
+            raise ValueError("Version model file not found")
+        
+        return await self.model_manager.load_detached_handle(model_id, model_path, version_hash)
+
+    @staticmethod
+    def _find_artifact(version_dir: str) -> Optional[str]:
+        """Path of the model artifact stored in a version directory, if any."""
+        for name in ARTIFACT_NAMES.values():
+            path = os.path.join(version_dir, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def _copy_artifact(source: str, destination: str):
+        """Copy a model file or SavedModel directory, replacing the destination atomically."""
+        staging = f"{destination}.tmp"
+        if os.path.isdir(source):
+            shutil.rmtree(staging, ignore_errors=True)
+            shutil.copytree(source, staging)
+            shutil.rmtree(destination, ignore_errors=True)
+            os.rename(staging, destination)
+        else:
+            shutil.copy2(source, staging)
+            os.replace(staging, destination)
+
+    @staticmethod
+    def _remove_artifact(path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
 
     def _generate_version_hash(self, version_data: Dict[str, Any]) -> str:
         """Generate unique hash for version."""
@@ -0,0 +1,236 @@
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+import logging
+import time
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics, PipelineMetrics
+
+logger = logging.getLogger(__name__)
+
+# Degradation ladder: (analysis fps scale, input resolution scale)
+DEGRADATION_LEVELS = [
+    (1.0, 1.0),
+    (0.5, 1.0),
+    (0.5, 0.75),
+    (0.25, 0.75),
+    (0.25, 0.5),
+    (0.1, 0.5)
+]
+
+# Lower value = more critical = degraded last and restored first
+MODULE_PRIORITY = {
+    'hospital': 0,
+    'safety': 0,
+    'mine': 1,
+    'school': 2,
+    'traffic': 2,
+    'residential': 3
+}
+DEFAULT_PRIORITY = 2
+
+def camera_priority(config: Optional[Dict[str, Any]]) -> int:
+    """Priority class for a camera from its configuration ('priority' or 'module')."""
+    config = config or {}
+    if config.get('priority') is not None:
+        return int(config['priority'])
+    return MODULE_PRIORITY.get(config.get('module'), DEFAULT_PRIORITY)
+
+class CameraBudget:
+    """Current degradation level and frame gate for one camera."""
+
+    def __init__(self, camera_id: str, priority: int, base_fps: float):
+        self.camera_id = camera_id
+        self.priority = priority
+        self.base_fps = base_fps
+        self.level = 0
+        self.next_frame_at = 0.0
+
+    @property
+    def fps_scale(self) -> float:
+        return DEGRADATION_LEVELS[self.level][0]
+
+    @property
+    def resolution_scale(self) -> float:
+        return DEGRADATION_LEVELS[self.level][1]
+
+class OverloadController:
+    """Sheds analysis load by priority when queueing plus inference latency runs high.
+
+    Every ``interval`` seconds the controller computes mean queue-wait plus
+    inference latency over the last interval. Above the target it degrades
+    one camera by one level, always picking the least critical class first;
+    below ``restore_ratio`` of the target it restores one camera, most
+    critical first. Each step is followed by a cooldown so the effect of a
+    change is observed before the next one.
+    """
+
+    def __init__(
+        self,
+        metrics: PipelineMetrics = pipeline_metrics,
+        target_latency: float = settings.OVERLOAD_TARGET_LATENCY,
+        restore_ratio: float = settings.OVERLOAD_RESTORE_RATIO,
+        interval: float = settings.OVERLOAD_INTERVAL,
+        cooldown_ticks: int = 2
+    ):
+        self.metrics = metrics
+        self.target_latency = target_latency
+        self.restore_ratio = restore_ratio
+        self.interval = interval
+        self.cooldown_ticks = cooldown_ticks
+
+        self._cameras: Dict[str, CameraBudget] = {}
+        self._previous: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        self._cooldown = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.signal = 0.0
+        self.actions = {'degrade': 0, 'restore': 0}
+        self.decisions: List[Dict[str, Any]] = []
+
+        metrics.register_collector(self._collect)
+
+    def register_camera(self, camera_id: Any, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        with self._lock:
+            self._cameras[str(camera_id)] = CameraBudget(
+                str(camera_id),
+                camera_priority(config),
+                float(config.get('frameRate') or settings.DEFAULT_FRAME_RATE)
+            )
+        self.start()
+
+    def unregister_camera(self, camera_id: Any):
+        with self._lock:
+            self._cameras.pop(str(camera_id), None)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='overload-controller', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 2)
+
+    def should_process(self, camera_id: Any) -> bool:
+        """Frame gate: False when the camera's degraded analysis rate says skip."""
+        budget = self._cameras.get(str(camera_id))
+        if budget is None or budget.level == 0:
+            return True
+        now = time.monotonic()
+        if now < budget.next_frame_at:
+            return False
+        budget.next_frame_at = now + 1.0 / max(budget.base_fps * budget.fps_scale, 0.1)
+        return True
+
+    def resolution_scale(self, camera_id: Any) -> float:
+        budget = self._cameras.get(str(camera_id))
+        return budget.resolution_scale if budget else 1.0
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'signal': self.signal,
+                'target_latency': self.target_latency,
+                'actions': dict(self.actions),
+                'cameras': {
+                    camera_id: {
+                        'priority': budget.priority,
+                        'level': budget.level,
+                        'fps_scale': budget.fps_scale,
+                        'resolution_scale': budget.resolution_scale
+                    }
+                    for camera_id, budget in self._cameras.items()
+                },
+                'recent_decisions': list(self.decisions[-20:])
+            }
+
+    def tick(self):
+        """Run one control step."""
+        self.signal = self._measure()
+        with self._lock:
+            if self._cooldown > 0:
+                self._cooldown -= 1
+                return
+            if self.signal > self.target_latency:
+                budget = self._pick_degrade()
+                direction = 'degrade'
+            elif self.signal < self.target_latency * self.restore_ratio:
+                budget = self._pick_restore()
+                direction = 'restore'
+            else:
+                return
+            if budget is None:
+                return
+
+            budget.level += 1 if direction == 'degrade' else -1
+            budget.next_frame_at = 0.0
+            self.actions[direction] += 1
+            self._cooldown = self.cooldown_ticks
+            self.decisions.append({
+                'at': time.time(),
+                'camera_id': budget.camera_id,
+                'direction': direction,
+                'level': budget.level,
+                'signal': self.signal
+            })
+            del self.decisions[:-100]
+        logger.info(
+            f"Overload controller {direction}d camera {budget.camera_id} to level {budget.level} "
+            f"(latency {self.signal:.3f}s, target {self.target_latency:.3f}s)"
+        )
+
+    def _pick_degrade(self) -> Optional[CameraBudget]:
+        candidates = [b for b in self._cameras.values() if b.level < len(DEGRADATION_LEVELS) - 1]
+        if not candidates:
+            return None
+        # Least critical class first, then the least degraded camera within it
+        return min(candidates, key=lambda b: (-b.priority, b.level))
+
+    def _pick_restore(self) -> Optional[CameraBudget]:
+        candidates = [b for b in self._cameras.values() if b.level > 0]
+        if not candidates:
+            return None
+        # Most critical class first, then the most degraded camera within it
+        return min(candidates, key=lambda b: (b.priority, -b.level))
+
+    def _measure(self) -> float:
+        """Mean queue-wait plus inference latency per frame over the last interval."""
+        total = 0.0
+        for stage in ('queue_wait', 'inference'):
+            current = self.metrics.stage_totals(stage)
+            previous = self._previous.get(stage, {})
+            count = sum(c - previous.get(camera, (0, 0.0))[0] for camera, (c, _) in current.items())
+            seconds = sum(s - previous.get(camera, (0, 0.0))[1] for camera, (_, s) in current.items())
+            self._previous[stage] = current
+            if count > 0:
+                total += seconds / count
+        return total
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Error in overload controller: {str(e)}")
+
+    def _collect(self):
+        with self._lock:
+            levels = [({'camera': c, 'priority': b.priority}, b.level) for c, b in sorted(self._cameras.items())]
+            fps_scales = [({'camera': c}, b.fps_scale) for c, b in sorted(self._cameras.items())]
+            resolution_scales = [({'camera': c}, b.resolution_scale) for c, b in sorted(self._cameras.items())]
+            actions = [({'direction': d}, n) for d, n in sorted(self.actions.items())]
+        return [
+            ('visioncave_overload_level', 'gauge', 'Current degradation level per camera', levels),
+            ('visioncave_overload_fps_scale', 'gauge', 'Analysis frame rate scale per camera', fps_scales),
+            ('visioncave_overload_resolution_scale', 'gauge', 'Input resolution scale per camera', resolution_scales),
+            ('visioncave_overload_signal_seconds', 'gauge', 'Mean queue wait plus inference latency', [({}, self.signal)]),
+            ('visioncave_overload_actions_total', 'counter', 'Degrade and restore decisions', actions)
+        ]
+
+overload_controller = OverloadController()
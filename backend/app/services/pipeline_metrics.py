@@ -0,0 +1,260 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from collections import deque
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+# Pipeline stages timed per camera; 'processing' is a frame processor callback
+# end to end, which may itself record its inner stages
+STAGES = (
+    'capture', 'decode', 'queue_wait', 'preprocess', 'inference',
+    'postprocess', 'processing', 'persistence'
+)
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Collector output: (metric name, type, help, [(labels, value), ...]);
+# histogram metrics carry Histogram instances as their values
+CollectedMetric = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+class Histogram:
+    """Fixed-bucket histogram compatible with the Prometheus exposition format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            running += bucket_count
+            result.append((repr(float(bound)), running))
+        result.append(('+Inf', self.count))
+        return result
+
+class FpsMeter:
+    """Frame rate over a sliding time window of frame arrival timestamps."""
+
+    def __init__(self, window_seconds: float = 5.0, max_samples: int = 600):
+        self.window_seconds = window_seconds
+        self.timestamps = deque(maxlen=max_samples)
+
+    def mark(self, timestamp: float):
+        self.timestamps.append(timestamp)
+
+    def fps(self, now: Optional[float] = None) -> float:
+        now = now if now is not None else time.monotonic()
+        while self.timestamps and now - self.timestamps[0] > self.window_seconds:
+            self.timestamps.popleft()
+        if len(self.timestamps) < 2:
+            return 0.0
+        elapsed = self.timestamps[-1] - self.timestamps[0]
+        return (len(self.timestamps) - 1) / elapsed if elapsed > 0 else 0.0
+
+class PipelineMetrics:
+    """Process-wide registry of per-camera pipeline instrumentation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage_histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._queue_depths: Dict[Tuple[str, str], int] = {}
+        self._drops: Dict[Tuple[str, str], int] = {}
+        self._frames: Dict[str, int] = {}
+        self._fps: Dict[str, FpsMeter] = {}
+        self._last_frame_at: Dict[str, float] = {}
+        self._failed: Dict[str, str] = {}
+        self._collectors: List[Callable[[], List[CollectedMetric]]] = []
+
+    def observe_stage(self, camera_id: Any, stage: str, seconds: float):
+        """Record the duration of one pipeline stage for a camera."""
+        key = (str(camera_id), stage)
+        with self._lock:
+            histogram = self._stage_histograms.get(key)
+            if histogram is None:
+                histogram = Histogram()
+                self._stage_histograms[key] = histogram
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time_stage(self, camera_id: Any, stage: str):
+        """Time the enclosed block as one pipeline stage."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(camera_id, stage, time.perf_counter() - start_time)
+
+    def stage_totals(self, stage: str) -> Dict[str, Tuple[int, float]]:
+        """Cumulative (count, sum of seconds) per camera for one stage."""
+        with self._lock:
+            return {
+                camera_id: (histogram.count, histogram.sum)
+                for (camera_id, histogram_stage), histogram in self._stage_histograms.items()
+                if histogram_stage == stage
+            }
+
+    def set_queue_depth(self, camera_id: Any, queue: str, depth: int):
+        self._queue_depths[(str(camera_id), queue)] = depth
+
+    def record_drop(self, camera_id: Any, reason: str, count: int = 1):
+        key = (str(camera_id), reason)
+        with self._lock:
+            self._drops[key] = self._drops.get(key, 0) + count
+
+    def mark_frame(self, camera_id: Any):
+        """Record a captured frame; drives per-camera FPS and frame age."""
+        camera_id = str(camera_id)
+        with self._lock:
+            meter = self._fps.get(camera_id)
+            if meter is None:
+                meter = FpsMeter()
+                self._fps[camera_id] = meter
+            meter.mark(time.monotonic())
+            self._frames[camera_id] = self._frames.get(camera_id, 0) + 1
+            self._last_frame_at[camera_id] = time.monotonic()
+            self._failed.pop(camera_id, None)
+
+    def mark_failed(self, camera_id: Any, reason: str):
+        """Record that a camera's capture died; it stays failed until it produces a frame or is forgotten."""
+        with self._lock:
+            self._failed[str(camera_id)] = reason
+            self._fps.pop(str(camera_id), None)
+
+    def forget_camera(self, camera_id: Any):
+        """Drop a stopped camera's gauges; counters and histograms are kept."""
+        camera_id = str(camera_id)
+        with self._lock:
+            self._fps.pop(camera_id, None)
+            self._last_frame_at.pop(camera_id, None)
+            self._failed.pop(camera_id, None)
+            for key in [key for key in self._queue_depths if key[0] == camera_id]:
+                self._queue_depths.pop(key, None)
+
+    def fps(self, camera_id: Any) -> float:
+        with self._lock:
+            meter = self._fps.get(str(camera_id))
+            return meter.fps() if meter else 0.0
+
+    def last_frame_age(self, camera_id: Any) -> Optional[float]:
+        """Seconds since the camera last produced a frame, or None if it never did."""
+        last_frame_at = self._last_frame_at.get(str(camera_id))
+        return time.monotonic() - last_frame_at if last_frame_at is not None else None
+
+    def cameras(self) -> List[str]:
+        with self._lock:
+            return list(self._last_frame_at.keys() | self._failed.keys())
+
+    def failed_cameras(self) -> Dict[str, str]:
+        """Failure reason per camera whose capture has died."""
+        return dict(self._failed)
+
+    def queue_depths(self) -> Dict[Tuple[str, str], int]:
+        return dict(self._queue_depths)
+
+    def stage_summary(self, camera_id: Any, stage: str) -> Optional[Dict[str, float]]:
+        """Mean and approximate p95 for one camera stage."""
+        with self._lock:
+            histogram = self._stage_histograms.get((str(camera_id), stage))
+            if histogram is None or not histogram.count:
+                return None
+            rank = 0.95 * histogram.count
+            p95 = histogram.buckets[-1]
+            for bound, cumulative in histogram.cumulative():
+                if cumulative >= rank:
+                    p95 = float(bound)
+                    break
+            return {'mean': histogram.sum / histogram.count, 'p95': p95, 'count': histogram.count}
+
+    def register_collector(self, collector: Callable[[], List[CollectedMetric]]):
+        """Register a callable that contributes extra metrics at scrape time."""
+        self._collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        with self._lock:
+            lines.append('# HELP visioncave_stage_duration_seconds Per-camera pipeline stage duration')
+            lines.append('# TYPE visioncave_stage_duration_seconds histogram')
+            for (camera_id, stage), histogram in sorted(self._stage_histograms.items()):
+                lines.extend(self._histogram_samples(
+                    'visioncave_stage_duration_seconds', {'camera': camera_id, 'stage': stage}, histogram
+                ))
+
+            lines.append('# HELP visioncave_queue_depth Current depth of pipeline queues')
+            lines.append('# TYPE visioncave_queue_depth gauge')
+            for (camera_id, queue), depth in sorted(self._queue_depths.items()):
+                lines.append(self._sample('visioncave_queue_depth', {'camera': camera_id, 'queue': queue}, depth))
+
+            lines.append('# HELP visioncave_frames_dropped_total Frames dropped by reason')
+            lines.append('# TYPE visioncave_frames_dropped_total counter')
+            for (camera_id, reason), count in sorted(self._drops.items()):
+                lines.append(self._sample('visioncave_frames_dropped_total', {'camera': camera_id, 'reason': reason}, count))
+
+            lines.append('# HELP visioncave_frames_total Frames captured')
+            lines.append('# TYPE visioncave_frames_total counter')
+            for camera_id, count in sorted(self._frames.items()):
+                lines.append(self._sample('visioncave_frames_total', {'camera': camera_id}, count))
+
+            now = time.monotonic()
+            lines.append('# HELP visioncave_camera_fps Captured frames per second over the last few seconds')
+            lines.append('# TYPE visioncave_camera_fps gauge')
+            for camera_id, meter in sorted(self._fps.items()):
+                lines.append(self._sample('visioncave_camera_fps', {'camera': camera_id}, meter.fps(now)))
+
+            lines.append('# HELP visioncave_last_frame_age_seconds Seconds since the last captured frame')
+            lines.append('# TYPE visioncave_last_frame_age_seconds gauge')
+            for camera_id, last_frame_at in sorted(self._last_frame_at.items()):
+                lines.append(self._sample('visioncave_last_frame_age_seconds', {'camera': camera_id}, now - last_frame_at))
+
+            lines.append('# HELP visioncave_camera_failed Cameras whose capture has died')
+            lines.append('# TYPE visioncave_camera_failed gauge')
+            for camera_id, reason in sorted(self._failed.items()):
+                lines.append(self._sample('visioncave_camera_failed', {'camera': camera_id, 'reason': reason}, 1))
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    if isinstance(value, Histogram):
+                        lines.extend(self._histogram_samples(name, labels, value))
+                    else:
+                        lines.append(self._sample(name, labels, value))
+
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def _histogram_samples(cls, name: str, labels: Dict[str, Any], histogram: Histogram) -> List[str]:
+        lines = [
+            cls._sample(f'{name}_bucket', {**labels, 'le': bound}, cumulative)
+            for bound, cumulative in histogram.cumulative()
+        ]
+        lines.append(cls._sample(f'{name}_sum', labels, histogram.sum))
+        lines.append(cls._sample(f'{name}_count', labels, histogram.count))
+        return lines
+
+    @staticmethod
+    def _sample(name: str, labels: Dict[str, Any], value: float) -> str:
+        if labels:
+            rendered = ','.join(
+                f'{key}="{PipelineMetrics._escape(value)}"' for key, value in labels.items()
+            )
+            return f'{name}{{{rendered}}} {float(value)}'
+        return f'{name} {float(value)}'
+
+    @staticmethod
+    def _escape(value: Any) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+pipeline_metrics = PipelineMetrics()
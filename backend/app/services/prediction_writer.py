@@ -0,0 +1,184 @@
+from typing import Dict, Any, List, Optional, Callable
+from collections import deque
+from datetime import datetime
+import asyncio
+import threading
+import logging
+import time
+from ..models.sql_models import ModelPrediction, ModelMetrics
+from ..core.config import settings
+from .readiness import readiness
+
+logger = logging.getLogger(__name__)
+
+class PredictionWriter:
+    """Buffers monitoring rows in memory and writes them with bulk inserts.
+
+    The buffer holds at most ``max_queue`` entries. When it is full, producers
+    either wait up to ``block_timeout`` seconds for room (backpressure) or the
+    entry is dropped and counted. Batches are flushed when ``batch_size``
+    entries are pending or ``flush_interval`` seconds have passed.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        batch_size: int = settings.PREDICTION_BATCH_SIZE,
+        flush_interval: float = settings.PREDICTION_FLUSH_INTERVAL,
+        max_queue: int = settings.PREDICTION_QUEUE_SIZE,
+        block_timeout: float = 0.0,
+        max_retries: int = 2,
+        name: str = 'prediction-writer'
+    ):
+        self.session_factory = session_factory
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            'submitted': 0,
+            'written': 0,
+            'dropped': 0,
+            'lost': 0,
+            'batches': 0,
+            'retries': 0,
+            'high_watermark': 0,
+            'last_flush_at': None,
+            'last_flush_seconds': 0.0,
+            'last_error': None
+        }
+
+    def start(self):
+        """Start the background flush thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        readiness.register_writer(self.name, self.get_stats)
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting work and flush everything still buffered."""
+        self._stop_event.set()
+        readiness.unregister(self.name)
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._flush_all()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._buffer)
+
+    def submit(
+        self,
+        prediction: Dict[str, Any],
+        metrics: Optional[List[Dict[str, Any]]] = None,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """Buffer a prediction row (and optional metric rows) for the next bulk insert."""
+        timeout = self.block_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while len(self._buffer) >= self.max_queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop_event.is_set():
+                    self.stats['dropped'] += 1
+                    return False
+                self._cond.wait(remaining)
+
+            self._buffer.append((prediction, metrics or []))
+            self.stats['submitted'] += 1
+            depth = len(self._buffer)
+            if depth > self.stats['high_watermark']:
+                self.stats['high_watermark'] = depth
+            if depth >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    async def asubmit(
+        self,
+        prediction: Dict[str, Any],
+        metrics: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
+        """Async variant of submit that waits for room off the event loop."""
+        if len(self._buffer) < self.max_queue or self.block_timeout <= 0:
+            return self.submit(prediction, metrics, timeout=0.0)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.submit, prediction, metrics)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer throughput, backlog and loss counters."""
+        return {
+            **self.stats,
+            'queue_depth': len(self._buffer),
+            'max_queue': self.max_queue
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                if len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            self._flush_batch()
+
+    def _drain(self) -> List[tuple]:
+        with self._cond:
+            count = min(len(self._buffer), self.batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            if batch:
+                # Wake producers blocked on a full buffer
+                self._cond.notify_all()
+        return batch
+
+    def _flush_all(self):
+        while self._buffer:
+            if not self._flush_batch():
+                break
+
+    def _flush_batch(self) -> bool:
+        batch = self._drain()
+        if not batch:
+            return True
+
+        predictions = [prediction for prediction, _ in batch]
+        metrics = [metric for _, metric_rows in batch for metric in metric_rows]
+
+        for attempt in range(self.max_retries + 1):
+            start_time = time.monotonic()
+            db = self.session_factory()
+            try:
+                db.bulk_insert_mappings(ModelPrediction, predictions)
+                if metrics:
+                    db.bulk_insert_mappings(ModelMetrics, metrics)
+                db.commit()
+
+                self.stats['written'] += len(predictions)
+                self.stats['batches'] += 1
+                self.stats['last_flush_at'] = datetime.utcnow().isoformat()
+                self.stats['last_flush_seconds'] = time.monotonic() - start_time
+                return True
+            except Exception as e:
+                db.rollback()
+                self.stats['last_error'] = str(e)
+                if attempt < self.max_retries:
+                    self.stats['retries'] += 1
+                    time.sleep(0.1 * (2 ** attempt))
+                else:
+                    logger.error(f"Error writing {len(predictions)} predictions: {str(e)}")
+            finally:
+                db.close()
+
+        self.stats['lost'] += len(predictions)
+        return False
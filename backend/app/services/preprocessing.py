@@ -0,0 +1,302 @@
+from typing import Dict, Any, List, Optional, Tuple, NamedTuple
+from collections import OrderedDict
+import threading
+import time
+import logging
+import cv2
+import numpy as np
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+class TransformSpec(NamedTuple):
+    """What a consumer needs from a BGR frame, applied in this order.
+
+    ``size`` is (width, height) or None to keep the frame size; with
+    ``letterbox`` the aspect ratio is kept and the rest padded with
+    ``pad_value``. ``scale``, ``mean`` and ``std`` produce float32 output as
+    ``(pixel * scale - mean) / std``; leaving ``scale`` None keeps uint8.
+    """
+    size: Optional[Tuple[int, int]] = None
+    letterbox: bool = False
+    pad_value: int = 114
+    interpolation: int = cv2.INTER_LINEAR
+    color: str = 'bgr'  # 'bgr', 'rgb' or 'gray'
+    blur: int = 0  # Gaussian kernel size, 0 for none
+    scale: Optional[float] = None
+    mean: Tuple[float, ...] = (0.0, 0.0, 0.0)
+    std: Tuple[float, ...] = (1.0, 1.0, 1.0)
+    layout: str = 'hwc'  # 'hwc' or 'chw'
+    batch: bool = False  # prepend a batch axis of 1
+
+    @property
+    def is_identity(self) -> bool:
+        return (self.size is None and self.color == 'bgr' and not self.blur
+                and self.scale is None and self.layout == 'hwc' and not self.batch)
+
+def letterbox_geometry(
+    frame_shape: Tuple[int, ...], size: Tuple[int, int]
+) -> Tuple[float, Tuple[int, int], Tuple[int, int]]:
+    """Scale ratio, (left, top) padding and resized (width, height) for a letterbox."""
+    height, width = frame_shape[:2]
+    ratio = min(size[0] / width, size[1] / height)
+    new_size = (max(int(round(width * ratio)), 1), max(int(round(height * ratio)), 1))
+    return ratio, ((size[0] - new_size[0]) // 2, (size[1] - new_size[1]) // 2), new_size
+
+class BufferSlot:
+    """One set of preallocated intermediate and output arrays for a plan."""
+
+    __slots__ = ('resized', 'color', 'blurred', 'output')
+
+    def __init__(self):
+        self.resized: Optional[np.ndarray] = None
+        self.color: Optional[np.ndarray] = None
+        self.blurred: Optional[np.ndarray] = None
+        self.output: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.resized, self.color, self.blurred, self.output) if a is not None)
+
+class TransformPlan:
+    """A fused transform for one (consumer, spec, frame shape) over a ring of buffers.
+
+    Buffers are allocated once; each call writes into the next slot of the
+    ring, so an output stays valid until ``ring`` further frames have gone
+    through the same plan.
+    """
+
+    def __init__(self, spec: TransformSpec, frame_shape: Tuple[int, ...], ring: int):
+        self.spec = spec
+        self.frame_shape = frame_shape
+        height, width = frame_shape[:2]
+        channels = frame_shape[2] if len(frame_shape) == 3 else 1
+        out_width, out_height = spec.size or (width, height)
+
+        if spec.size and spec.letterbox:
+            self.ratio, self.pad, self.resize_to = letterbox_geometry(frame_shape, spec.size)
+        else:
+            self.ratio = (out_width / width, out_height / height)
+            self.pad = (0, 0)
+            self.resize_to = (out_width, out_height)
+
+        out_channels = 1 if spec.color == 'gray' or channels == 1 else 3
+        self.slots = [self._allocate(frame_shape, out_width, out_height, out_channels) for _ in range(max(ring, 1))]
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+        if spec.scale is not None:
+            std = np.asarray(spec.std[:out_channels], dtype=np.float32)
+            # (x * scale - mean) / std folded into one multiply-add
+            self.alpha = (np.float32(spec.scale) / std).reshape(1, 1, -1)
+            self.beta = (-np.asarray(spec.mean[:out_channels], dtype=np.float32) / std).reshape(1, 1, -1)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(slot.nbytes for slot in self.slots)
+
+    def _allocate(self, frame_shape: Tuple[int, ...], width: int, height: int, channels: int) -> BufferSlot:
+        spec = self.spec
+        slot = BufferSlot()
+        in_channels = frame_shape[2:3]
+        if spec.color != 'bgr' and in_channels:
+            slot.color = np.empty((height, width) + ((3,) if spec.color == 'rgb' else ()), dtype=np.uint8)
+        if spec.blur:
+            slot.blurred = np.empty((height, width) + ((channels,) if channels > 1 else ()), dtype=np.uint8)
+        if spec.scale is not None or spec.layout == 'chw':
+            dtype = np.float32 if spec.scale is not None else np.uint8
+            shape = (channels, height, width) if spec.layout == 'chw' else (height, width, channels)
+            slot.output = np.empty(shape, dtype=dtype)
+        return slot
+
+    def _next_slot(self) -> BufferSlot:
+        self.last_used = time.monotonic()
+        with self._lock:
+            slot = self.slots[self._cursor]
+            self._cursor = (self._cursor + 1) % len(self.slots)
+        return slot
+
+    def resize(self, frame: np.ndarray) -> np.ndarray:
+        """Resize (or letterbox) into the next slot's buffer."""
+        return self._resize(frame, self._next_slot())
+
+    def _resize(self, frame: np.ndarray, slot: BufferSlot) -> np.ndarray:
+        if slot.resized is None:
+            # Allocated on first use: plans fed a shared resize never need one.
+            # The letterbox border is filled here and never written again
+            shape = (self.spec.size[1], self.spec.size[0]) + self.frame_shape[2:3]
+            slot.resized = np.full(shape, self.spec.pad_value, dtype=np.uint8)
+        left, top = self.pad
+        width, height = self.resize_to
+        target = slot.resized[top:top + height, left:left + width]
+        result = cv2.resize(frame, (width, height), dst=target, interpolation=self.spec.interpolation)
+        if not np.may_share_memory(result, target):
+            np.copyto(target, result.reshape(target.shape))
+        return slot.resized
+
+    def apply(self, frame: np.ndarray, resized: Optional[np.ndarray] = None) -> np.ndarray:
+        """Run the whole transform; ``resized`` skips the resize step when shared."""
+        spec = self.spec
+        slot = self._next_slot()
+        image = frame
+        if spec.size:
+            image = resized if resized is not None else self._resize(frame, slot)
+
+        if slot.color is not None:
+            code = cv2.COLOR_BGR2RGB if spec.color == 'rgb' else cv2.COLOR_BGR2GRAY
+            image = cv2.cvtColor(image, code, dst=slot.color)
+
+        if slot.blurred is not None:
+            image = cv2.GaussianBlur(image, (spec.blur, spec.blur), 0, dst=slot.blurred)
+
+        if slot.output is not None:
+            out = slot.output
+            # Writing through a transposed view fuses normalisation with HWC->CHW
+            view = out.transpose(1, 2, 0) if spec.layout == 'chw' else out
+            source = image if image.ndim == 3 else image[:, :, None]
+            if spec.scale is not None:
+                np.multiply(source, self.alpha, out=view)
+                np.add(view, self.beta, out=view)
+            else:
+                np.copyto(view, source)
+            image = out
+
+        return image[None] if spec.batch else image
+
+class PreprocessEngine:
+    """Per-camera, per-model preprocessing into reusable buffers.
+
+    Each consumer describes its input with a TransformSpec and calls
+    ``transform`` with a key (camera or model) for its frames. The first
+    call for a key, spec and frame shape builds a plan with a ring of
+    preallocated buffers; later calls only run OpenCV/numpy kernels into
+    them. Callers that pass a ``token`` unique to the frame share one
+    resized image between all consumers and specs with the same target
+    geometry, so several models at 640x640 resize the frame once.
+
+    Buffers across all plans are bounded by ``max_bytes``; creating a plan
+    beyond it releases the least recently used ones.
+
+    Outputs alias engine buffers: treat them as read-only and copy anything
+    kept for longer than ``ring`` frames.
+    """
+
+    def __init__(self, ring: int = settings.PREPROCESS_BUFFER_RING,
+                 max_bytes: int = settings.PREPROCESS_MAX_BUFFER_BYTES):
+        self.ring = ring
+        self.max_bytes = max_bytes
+        self._plans: Dict[Tuple[Any, TransformSpec, Tuple[int, ...]], TransformPlan] = {}
+        # Resizes are shared by every consumer, keyed by target geometry and frame shape
+        self._resize_plans: Dict[Tuple[Tuple[int, int], bool, int, int, Tuple[int, ...]], TransformPlan] = {}
+        # Recent shared resizes by (token, geometry); no longer than the resize ring so none is overwritten
+        self._shared: 'OrderedDict[Tuple[Any, Tuple[int, int], bool, int, int], np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'frames': 0, 'shared_hits': 0, 'shared_misses': 0, 'evicted_plans': 0}
+        pipeline_metrics.register_collector(self._collect)
+
+    def transform(
+        self,
+        key: Any,
+        frame: np.ndarray,
+        spec: TransformSpec,
+        token: Any = None,
+        ring: Optional[int] = None
+    ) -> np.ndarray:
+        """Apply ``spec`` to a BGR (or grayscale) frame; returns a buffer-backed array."""
+        if spec.is_identity:
+            return frame
+        plan = self.plan(key, spec, frame.shape, ring)
+        self.stats['frames'] += 1
+
+        resized = None
+        if token is not None and spec.size:
+            resized = self._shared_resize(frame, spec, token)
+        return plan.apply(frame, resized)
+
+    def plan(self, key: Any, spec: TransformSpec, frame_shape: Tuple[int, ...],
+             ring: Optional[int] = None) -> TransformPlan:
+        """The plan for a key, spec and frame shape; exposes letterbox ratio and padding."""
+        plan_key = (key, spec, tuple(frame_shape))
+        plan = self._plans.get(plan_key)
+        if plan is None:
+            with self._lock:
+                plan = self._plans.get(plan_key)
+                if plan is None:
+                    plan = TransformPlan(spec, frame_shape, ring or self.ring)
+                    self._plans[plan_key] = plan
+                    self._enforce_budget(plan)
+                    logger.debug(f"Preprocessing plan for {key}: {spec} on {frame_shape}, {plan.nbytes} bytes")
+        return plan
+
+    def forget(self, key: Any):
+        """Release all buffers held for a key, e.g. when a camera stops."""
+        with self._lock:
+            for plan_key in [k for k in self._plans if k[0] == key]:
+                del self._plans[plan_key]
+
+    def _shared_resize(self, frame: np.ndarray, spec: TransformSpec, token: Any) -> np.ndarray:
+        geometry = (spec.size, spec.letterbox, spec.interpolation, spec.pad_value)
+        shared_key = (token,) + geometry
+        with self._lock:
+            resized = self._shared.get(shared_key)
+        if resized is not None:
+            self.stats['shared_hits'] += 1
+            return resized
+
+        self.stats['shared_misses'] += 1
+        plan_key = geometry + (tuple(frame.shape),)
+        plan = self._resize_plans.get(plan_key)
+        if plan is None:
+            with self._lock:
+                plan = self._resize_plans.get(plan_key)
+                if plan is None:
+                    plan = TransformPlan(
+                        TransformSpec(size=spec.size, letterbox=spec.letterbox, pad_value=spec.pad_value,
+                                      interpolation=spec.interpolation),
+                        frame.shape,
+                        self.ring
+                    )
+                    self._resize_plans[plan_key] = plan
+                    self._enforce_budget(plan)
+        resized = plan.resize(frame)
+        with self._lock:
+            self._shared[shared_key] = resized
+            while len(self._shared) > self.ring:
+                self._shared.popitem(last=False)
+        return resized
+
+    def _enforce_budget(self, keep: TransformPlan):
+        """Release least recently used plans until buffers fit in ``max_bytes``; holds ``_lock``."""
+        plans = [(plan.last_used, store, plan_key, plan)
+                 for store in (self._plans, self._resize_plans)
+                 for plan_key, plan in store.items() if plan is not keep]
+        total = keep.nbytes + sum(plan.nbytes for *_, plan in plans)
+        for _, store, plan_key, plan in sorted(plans, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            # Outputs already handed out stay valid; only the engine's reference goes
+            del store[plan_key]
+            total -= plan.nbytes
+            self.stats['evicted_plans'] += 1
+
+    def _collect(self):
+        with self._lock:
+            plans = list(self._plans.values()) + list(self._resize_plans.values())
+        return [
+            ('visioncave_preprocess_plans', 'gauge', 'Preprocessing plans with preallocated buffers',
+             [({}, len(plans))]),
+            ('visioncave_preprocess_buffer_bytes', 'gauge', 'Bytes held in preprocessing buffers',
+             [({}, sum(plan.nbytes for plan in plans))]),
+            ('visioncave_preprocess_frames_total', 'counter', 'Frames run through preprocessing plans',
+             [({}, self.stats['frames'])]),
+            ('visioncave_preprocess_plans_evicted_total', 'counter', 'Idle plans released to stay within the buffer budget',
+             [({}, self.stats['evicted_plans'])]),
+            ('visioncave_preprocess_shared_resize_total', 'counter', 'Shared resize lookups by outcome', [
+                ({'outcome': 'hit'}, self.stats['shared_hits']),
+                ({'outcome': 'miss'}, self.stats['shared_misses'])
+            ])
+        ]
+
+preprocess_engine = PreprocessEngine()
@@ -0,0 +1,155 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import threading
+import logging
+import time
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+# Preview ladder, best first: (frame tier, JPEG quality, max fps)
+PREVIEW_LEVELS = [
+    ('full', 85, 30),
+    ('preview', 80, 30),
+    ('preview', 65, 20),
+    ('preview', 50, 15),
+    ('thumbnail', 70, 10),
+    ('thumbnail', 50, 5),
+    ('thumbnail', 40, 2)
+]
+
+class PreviewViewer:
+    """Flow control for one preview socket.
+
+    Frames are sent one at a time, so a slow socket applies backpressure
+    instead of queueing frames on the server. The time each send takes
+    (EWMA) is compared with the viewer's frame interval: above
+    ``send_budget`` of it the viewer steps down the ladder (lower quality,
+    then smaller tier, then fewer fps); after ``upgrade_after`` cheap sends
+    in a row it steps back up, never above the tier it asked for.
+    """
+
+    def __init__(
+        self,
+        camera_id: str,
+        tier: str = 'preview',
+        send_budget: float = settings.PREVIEW_SEND_BUDGET,
+        stale_after: float = settings.PREVIEW_STALE_SECONDS,
+        upgrade_after: int = 30
+    ):
+        self.camera_id = camera_id
+        tiers = [level[0] for level in PREVIEW_LEVELS]
+        self.best_level = tiers.index(tier) if tier in tiers else tiers.index('preview')
+        self.level = self.best_level
+        self.send_budget = send_budget
+        self.stale_after = stale_after
+        self.upgrade_after = upgrade_after
+        self.send_time = 0.0
+        self.next_send_at = 0.0
+        self._cheap_sends = 0
+        self.stats = {'sent': 0, 'stale': 0, 'bytes': 0, 'degrade': 0, 'upgrade': 0}
+
+    @property
+    def tier(self) -> str:
+        return PREVIEW_LEVELS[self.level][0]
+
+    @property
+    def quality(self) -> int:
+        return PREVIEW_LEVELS[self.level][1]
+
+    @property
+    def fps(self) -> float:
+        return PREVIEW_LEVELS[self.level][2]
+
+    async def wait_turn(self):
+        """Sleep until this viewer's frame rate allows the next send."""
+        delay = self.next_send_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def is_stale(self, captured_at: float) -> bool:
+        """True for frames too old to be worth sending; they are skipped, not queued."""
+        if time.time() - captured_at > self.stale_after:
+            self.stats['stale'] += 1
+            return True
+        return False
+
+    def record_send(self, seconds: float, size: int):
+        """Account for a completed send and adapt quality, tier and rate."""
+        now = time.monotonic()
+        interval = 1.0 / self.fps
+        self.next_send_at = now + interval
+        self.stats['sent'] += 1
+        self.stats['bytes'] += size
+        self.send_time = seconds if self.stats['sent'] == 1 else 0.7 * self.send_time + 0.3 * seconds
+
+        if self.send_time > interval * self.send_budget and self.level < len(PREVIEW_LEVELS) - 1:
+            self._step(1)
+        elif self.send_time < interval * self.send_budget * 0.25 and self.level > self.best_level:
+            self._cheap_sends += 1
+            if self._cheap_sends >= self.upgrade_after:
+                self._step(-1)
+        else:
+            self._cheap_sends = 0
+
+    def _step(self, direction: int):
+        self.level += direction
+        self._cheap_sends = 0
+        # Start the new level's estimate fresh so one change is judged at a time
+        self.send_time = 0.0 if direction < 0 else self.send_time * 0.5
+        self.stats['degrade' if direction > 0 else 'upgrade'] += 1
+        logger.debug(
+            f"Preview viewer on camera {self.camera_id} moved to {self.tier} "
+            f"q{self.quality} @ {self.fps}fps (send {self.send_time:.3f}s)"
+        )
+
+class PreviewFlowControl:
+    """Registry of live preview viewers, for metrics."""
+
+    def __init__(self):
+        self._viewers: List[PreviewViewer] = []
+        self._lock = threading.Lock()
+        self.totals = {'sent': 0, 'stale': 0, 'bytes': 0, 'degrade': 0, 'upgrade': 0}
+        pipeline_metrics.register_collector(self._collect)
+
+    def open(self, camera_id: Any, tier: str = 'preview') -> PreviewViewer:
+        viewer = PreviewViewer(str(camera_id), tier)
+        with self._lock:
+            self._viewers.append(viewer)
+        return viewer
+
+    def close(self, viewer: PreviewViewer):
+        with self._lock:
+            if viewer in self._viewers:
+                self._viewers.remove(viewer)
+                for key, value in viewer.stats.items():
+                    self.totals[key] += value
+
+    def _collect(self):
+        with self._lock:
+            viewers = list(self._viewers)
+            totals = dict(self.totals)
+        for viewer in viewers:
+            for key, value in viewer.stats.items():
+                totals[key] += value
+        levels: Dict[int, int] = {}
+        for viewer in viewers:
+            levels[viewer.level] = levels.get(viewer.level, 0) + 1
+        return [
+            ('visioncave_preview_viewers', 'gauge', 'Preview viewers per quality level', [
+                ({'level': level, 'tier': PREVIEW_LEVELS[level][0], 'quality': PREVIEW_LEVELS[level][1]}, count)
+                for level, count in sorted(levels.items())
+            ]),
+            ('visioncave_preview_frames_total', 'counter', 'Preview frames by outcome', [
+                ({'outcome': 'sent'}, totals['sent']),
+                ({'outcome': 'stale'}, totals['stale'])
+            ]),
+            ('visioncave_preview_bytes_total', 'counter', 'Preview bytes sent', [({}, totals['bytes'])]),
+            ('visioncave_preview_adaptations_total', 'counter', 'Preview quality changes', [
+                ({'direction': 'degrade'}, totals['degrade']),
+                ({'direction': 'upgrade'}, totals['upgrade'])
+            ])
+        ]
+
+preview_flow = PreviewFlowControl()
@@ -0,0 +1,113 @@
+from typing import Dict, Any, List, Callable
+import threading
+import logging
+from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics, PipelineMetrics
+
+logger = logging.getLogger(__name__)
+
+class ReadinessMonitor:
+    """Decides whether this node can take traffic from pipeline lag signals.
+
+    Camera frame age and inference backlog come from the pipeline metrics
+    registry; Kafka consumers and database writers register callables that
+    report their lag and queue depth.
+    """
+
+    def __init__(
+        self,
+        metrics: PipelineMetrics = pipeline_metrics,
+        max_frame_age: float = settings.READY_MAX_FRAME_AGE,
+        max_inference_backlog: int = settings.READY_MAX_INFERENCE_BACKLOG,
+        max_consumer_lag: int = settings.READY_MAX_CONSUMER_LAG,
+        max_writer_fill: float = settings.READY_MAX_WRITER_FILL
+    ):
+        self.metrics = metrics
+        self.max_frame_age = max_frame_age
+        self.max_inference_backlog = max_inference_backlog
+        self.max_consumer_lag = max_consumer_lag
+        self.max_writer_fill = max_writer_fill
+        self._consumers: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._writers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register_consumer(self, name: str, lag_provider: Callable[[], Dict[str, int]]):
+        """Register a callable returning lag (messages behind) per topic partition."""
+        with self._lock:
+            self._consumers[name] = lag_provider
+
+    def register_writer(self, name: str, stats_provider: Callable[[], Dict[str, Any]]):
+        """Register a callable returning 'queue_depth' and 'max_queue' for a writer."""
+        with self._lock:
+            self._writers[name] = stats_provider
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._consumers.pop(name, None)
+            self._writers.pop(name, None)
+
+    def check(self) -> Dict[str, Any]:
+        """Evaluate every readiness check against its threshold."""
+        failing: List[str] = []
+
+        cameras = {}
+        failed = self.metrics.failed_cameras()
+        for camera_id in self.metrics.cameras():
+            age = self.metrics.last_frame_age(camera_id)
+            ok = camera_id not in failed and age is not None and age <= self.max_frame_age
+            cameras[camera_id] = {'last_frame_age': age, 'threshold': self.max_frame_age, 'ok': ok}
+            if camera_id in failed:
+                cameras[camera_id]['error'] = failed[camera_id]
+            if not ok:
+                failing.append(f'camera:{camera_id}')
+
+        backlog = {}
+        for (camera_id, queue), depth in self.metrics.queue_depths().items():
+            ok = depth <= self.max_inference_backlog
+            backlog[f'{camera_id}:{queue}'] = {'depth': depth, 'threshold': self.max_inference_backlog, 'ok': ok}
+            if not ok:
+                failing.append(f'backlog:{camera_id}:{queue}')
+
+        with self._lock:
+            consumers = dict(self._consumers)
+            writers = dict(self._writers)
+
+        consumer_lag = {}
+        for name, lag_provider in consumers.items():
+            try:
+                partitions = lag_provider()
+                total = sum(partitions.values())
+                ok = total <= self.max_consumer_lag
+                consumer_lag[name] = {'lag': total, 'partitions': partitions, 'threshold': self.max_consumer_lag, 'ok': ok}
+            except Exception as e:
+                logger.error(f"Error reading consumer lag for {name}: {str(e)}")
+                consumer_lag[name] = {'error': str(e), 'ok': False}
+            if not consumer_lag[name]['ok']:
+                failing.append(f'consumer:{name}')
+
+        writer_queues = {}
+        for name, stats_provider in writers.items():
+            try:
+                stats = stats_provider()
+                depth, capacity = stats['queue_depth'], stats['max_queue']
+                threshold = int(capacity * self.max_writer_fill)
+                ok = depth <= threshold
+                writer_queues[name] = {'depth': depth, 'max_queue': capacity, 'threshold': threshold, 'ok': ok}
+            except Exception as e:
+                logger.error(f"Error reading writer stats for {name}: {str(e)}")
+                writer_queues[name] = {'error': str(e), 'ok': False}
+            if not writer_queues[name]['ok']:
+                failing.append(f'writer:{name}')
+
+        return {
+            'ready': not failing,
+            'failing': failing,
+            'checks': {
+                'cameras': cameras,
+                'inference_backlog': backlog,
+                'consumer_lag': consumer_lag,
+                'writer_queues': writer_queues
+            }
+        }
+
+readiness = ReadinessMonitor()
@@ -1,4 +1,4 @@
-from kafka import KafkaConsumer
+from kafka import KafkaConsumer, TopicPartition
 from kafka.errors import KafkaError
 import json
 import logging
@@ -10,6 +10,9 @@ import asyncio
 import socketio
 from motor.motor_asyncio import AsyncIOMotorClient
 from ..core.config import settings
+from .pipeline_metrics import pipeline_metrics
+from .frame_tracing import frame_tracer, FrameContext
+from .readiness import readiness
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +43,9 @@ class RealtimeProcessor:
         self.detection_buffer = {}
         self.analytics_buffer = {}
         
+        # Messages behind the partition high watermark, per topic partition
+        self.consumer_lag: Dict[str, int] = {}
+        
         # Start processing
         self.start_processing()
 
@@ -56,10 +62,13 @@ class RealtimeProcessor:
             target=self._aggregate_analytics
         )
         self.processing_threads['analytics'].start()
+        
+        readiness.register_consumer('realtime-processor', self.get_consumer_lag)
 
     async def stop_processing(self):
         """Stop all processing threads."""
         self.stop_event.set()
+        readiness.unregister('realtime-processor')
         for thread in self.processing_threads.values():
             thread.join()
         await self.cleanup()
@@ -73,6 +82,8 @@ class RealtimeProcessor:
 
                 topic = message.topic
                 data = message.value
+                self._update_consumer_lag(message)
+                frame_tracer.record(FrameContext.from_dict(data.get('trace')), 'kafka')
 
                 if topic == 'detections':
                     self._handle_detection(data)
@@ -84,6 +95,18 @@ class RealtimeProcessor:
         finally:
             self.consumer.close()
 
+    def _update_consumer_lag(self, message):
+        """Track lag from the high watermark cached by the consumer's last fetch."""
+        highwater = self.consumer.highwater(TopicPartition(message.topic, message.partition))
+        if highwater is not None:
+            self.consumer_lag[f'{message.topic}:{message.partition}'] = max(highwater - message.offset - 1, 0)
+
+    def get_consumer_lag(self) -> Dict[str, int]:
+        """Get consumer lag per topic partition for readiness checks."""
+        if not self.processing_threads['kafka'].is_alive():
+            raise RuntimeError("Kafka consumer thread is not running")
+        return dict(self.consumer_lag)
+
     def _handle_detection(self, detection_data: Dict[str, Any]):
         """Handle object detection data."""
         try:
@@ -203,7 +226,10 @@ class RealtimeProcessor:
         """Emit detection update via Socket.IO."""
         await self.sio.emit(
             'detection_update',
-            {'camera_id': camera_id, 'data': data},
+            frame_tracer.stamp(
+                {'camera_id': camera_id, 'data': data},
+                FrameContext.from_dict(data.get('trace'))
+            ),
             room=f'camera_{camera_id}'
         )
 
@@ -211,7 +237,10 @@ class RealtimeProcessor:
         """Emit analytics update via Socket.IO."""
         await self.sio.emit(
             'analytics_update',
-            {'camera_id': camera_id, 'data': data},
+            frame_tracer.stamp(
+                {'camera_id': camera_id, 'data': data},
+                FrameContext.from_dict(data.get('trace'))
+            ),
             room=f'camera_{camera_id}'
         )
 
@@ -225,17 +254,19 @@ class RealtimeProcessor:
 
     async def _store_detection(self, detection_data: Dict[str, Any]):
         """Store detection data in MongoDB."""
-        await self.db.detections.insert_one({
-            **detection_data,
-            'created_at': datetime.utcnow()
-        })
+        with pipeline_metrics.time_stage(detection_data.get('camera_id'), 'persistence'):
+            await self.db.detections.insert_one({
+                **detection_data,
+                'created_at': datetime.utcnow()
+            })
 
     async def _store_analytics(self, analytics_data: Dict[str, Any]):
         """Store analytics data in MongoDB."""
-        await self.db.analytics.insert_one({
-            **analytics_data,
-            'created_at': datetime.utcnow()
-        })
+        with pipeline_metrics.time_stage(analytics_data.get('camera_id'), 'persistence'):
+            await self.db.analytics.insert_one({
+                **analytics_data,
+                'created_at': datetime.utcnow()
+            })
 
     async def _store_aggregated_analytics(
         self, camera_id: int, aggregated_data: Dict[str, Any]
@@ -1,15 +1,18 @@
 from fastapi import WebSocket
-from typing import Dict, Set, Any
+from typing import Dict, Set, Any, Optional
 import asyncio
 import json
 from datetime import datetime
 import cv2
 import numpy as np
 from .vision_service import vision_service
+from .frame_tracing import frame_tracer, FrameContext
+from .broadcast_hub import BroadcastHub
+from .serialization import EncodedMessage, send_encoded, negotiate_encoding
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        self.hub = BroadcastHub('realtime')
         self.data_processors = {
             'occupancy': OccupancyProcessor(),
             'traffic': TrafficProcessor(),
@@ -18,24 +21,26 @@ class ConnectionManager:
         }
         self.camera_frames = {}
 
+    @property
+    def active_connections(self) -> Dict[str, Set[WebSocket]]:
+        return {client_id: set(self.hub.members(client_id)) for client_id in self.hub.groups}
+
     async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
-        if client_id not in self.active_connections:
-            self.active_connections[client_id] = set()
-        self.active_connections[client_id].add(websocket)
+        encoding, subprotocol = negotiate_encoding(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        self.hub.add(websocket, client_id, encoding)
 
     async def disconnect(self, websocket: WebSocket, client_id: str):
-        self.active_connections[client_id].remove(websocket)
-        if not self.active_connections[client_id]:
-            del self.active_connections[client_id]
+        self.hub.remove(websocket, client_id)
 
     async def send_personal_message(self, message: Dict, websocket: WebSocket):
-        await websocket.send_json(message)
+        if not self.hub.send_to(websocket, message):
+            await send_encoded(websocket, EncodedMessage(message))
 
     async def broadcast(self, client_id: str, message: Dict):
-        if client_id in self.active_connections:
-            for connection in self.active_connections[client_id]:
-                await connection.send_json(message)
+        # Only enqueues; each socket's writer task sends and times the delivery
+        frame_tracer.stamp(message)
+        self.hub.publish(client_id, message)
 
     async def process_message(self, message: Dict, client_id: str):
         msg_type = message.get('type')
@@ -47,12 +52,17 @@ class ConnectionManager:
                 'payload': response
             })
 
-    async def update_camera_frame(self, camera_id: str, frame: np.ndarray):
+    async def update_camera_frame(
+        self, camera_id: str, frame: np.ndarray, trace: Optional[FrameContext] = None
+    ):
         self.camera_frames[camera_id] = frame
+        trace = trace or frame_tracer.current() or frame_tracer.start_frame(camera_id)
         # Process frame with all relevant processors
-        for processor in self.data_processors.values():
-            if hasattr(processor, 'process_frame'):
-                await processor.process_frame(camera_id, frame)
+        with frame_tracer.activate(trace):
+            for processor in self.data_processors.values():
+                if hasattr(processor, 'process_frame'):
+                    await processor.process_frame(camera_id, frame)
+            frame_tracer.record(trace, 'processed')
 
 class OccupancyProcessor:
     def __init__(self):
@@ -198,7 +208,7 @@ class AnalyticsProcessor:
 
     async def process_frame(self, camera_id: str, frame: np.ndarray):
         # Process frame with vision service
-        result = await vision_service.process_frame(frame)
+        result = await vision_service.process_frame(frame, camera_id)
         if result:
             self.processing_time = result['processing_time']
             self.objects_detected = len(result['detections'])
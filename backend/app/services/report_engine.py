@@ -0,0 +1,104 @@
+from typing import Dict, Any, List, Iterable, Hashable
+import numpy as np
+import json
+
+class StreamingClassificationReport:
+    """Builds a confusion matrix and per-class metrics incrementally.
+
+    Memory is proportional to the number of distinct labels, not to the
+    number of predictions fed in, so reports can be computed from chunked
+    database cursors. The output matches sklearn's ``confusion_matrix`` and
+    ``classification_report(output_dict=True)`` layout.
+    """
+
+    def __init__(self, initial_capacity: int = 16):
+        self._labels: Dict[Hashable, int] = {}
+        self._label_values: List[Any] = []
+        self._matrix = np.zeros((initial_capacity, initial_capacity), dtype=np.int64)
+        self.total = 0
+
+    def update(self, y_true: Iterable[Any], y_pred: Iterable[Any]):
+        """Add a chunk of (ground truth, prediction) pairs."""
+        true_idx = np.fromiter((self._index(v) for v in y_true), dtype=np.int64)
+        pred_idx = np.fromiter((self._index(v) for v in y_pred), dtype=np.int64)
+        if len(true_idx) != len(pred_idx):
+            raise ValueError("y_true and y_pred chunks must have the same length")
+
+        np.add.at(self._matrix, (true_idx, pred_idx), 1)
+        self.total += len(true_idx)
+
+    def labels(self) -> List[Any]:
+        """Labels in report order (sorted when comparable, else first-seen order)."""
+        return [self._label_values[i] for i in self._order()]
+
+    def confusion_matrix(self) -> np.ndarray:
+        order = self._order()
+        return self._matrix[np.ix_(order, order)]
+
+    def classification_report(self) -> Dict[str, Any]:
+        matrix = self.confusion_matrix()
+        true_positive = np.diag(matrix).astype(np.float64)
+        support = matrix.sum(axis=1).astype(np.float64)
+        predicted = matrix.sum(axis=0).astype(np.float64)
+
+        precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+        recall = np.divide(true_positive, support, out=np.zeros_like(true_positive), where=support > 0)
+        denominator = precision + recall
+        f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(true_positive), where=denominator > 0)
+
+        report = {}
+        for i, label in enumerate(self.labels()):
+            report[str(label)] = {
+                'precision': float(precision[i]),
+                'recall': float(recall[i]),
+                'f1-score': float(f1[i]),
+                'support': float(support[i])
+            }
+
+        total_support = support.sum()
+        report['accuracy'] = float(true_positive.sum() / total_support) if total_support else 0.0
+        report['macro avg'] = {
+            'precision': float(precision.mean()) if len(precision) else 0.0,
+            'recall': float(recall.mean()) if len(recall) else 0.0,
+            'f1-score': float(f1.mean()) if len(f1) else 0.0,
+            'support': float(total_support)
+        }
+        weights = support / total_support if total_support else support
+        report['weighted avg'] = {
+            'precision': float((precision * weights).sum()),
+            'recall': float((recall * weights).sum()),
+            'f1-score': float((f1 * weights).sum()),
+            'support': float(total_support)
+        }
+        return report
+
+    def _index(self, value: Any) -> int:
+        key = self._label_key(value)
+        index = self._labels.get(key)
+        if index is None:
+            index = len(self._labels)
+            self._labels[key] = index
+            self._label_values.append(value)
+            if index >= self._matrix.shape[0]:
+                self._grow()
+        return index
+
+    def _grow(self):
+        size = self._matrix.shape[0]
+        grown = np.zeros((size * 2, size * 2), dtype=np.int64)
+        grown[:size, :size] = self._matrix
+        self._matrix = grown
+
+    def _order(self) -> List[int]:
+        count = len(self._label_values)
+        try:
+            return sorted(range(count), key=lambda i: self._label_values[i])
+        except TypeError:
+            return list(range(count))
+
+    @staticmethod
+    def _label_key(value: Any) -> Hashable:
+        """Labels come from JSON columns, so dicts and lists are keyed by their JSON form."""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True)
+        return value
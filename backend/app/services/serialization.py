@@ -0,0 +1,108 @@
+from typing import Any, Dict, Optional, Tuple
+from datetime import date, datetime
+import json
+import logging
+import numpy as np
+from fastapi import WebSocket
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # clients are only offered JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _to_builtin(value: Any) -> Any:
+    """Plain Python value for types the encoders do not handle natively."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+def _builtin_keys(value: Any) -> Any:
+    """Copy of nested dicts and lists with numpy scalar keys made plain Python values."""
+    if isinstance(value, dict):
+        return {
+            (key.item() if isinstance(key, np.generic) else key): _builtin_keys(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_builtin_keys(item) for item in value]
+    return value
+
+def dumps(message: Any) -> bytes:
+    """JSON-encode to UTF-8 bytes; numpy arrays, scalars and scalar keys are supported."""
+    try:
+        return _dumps(message)
+    except TypeError:
+        # Dict keys never reach the default hook; retry with numpy keys converted
+        return _dumps(_builtin_keys(message))
+
+def _dumps(message: Any) -> bytes:
+    if orjson is not None:
+        # Non-contiguous arrays and unusual dtypes fall through to the default hook
+        return orjson.dumps(message, default=_to_builtin, option=_ORJSON_OPTIONS)
+    return json.dumps(message, default=_to_builtin, separators=(',', ':')).encode('utf-8')
+
+def packb(message: Any) -> bytes:
+    """MessagePack-encode; numpy values become plain lists and numbers."""
+    return msgpack.packb(message, default=_to_builtin, use_bin_type=True)
+
+class EncodedMessage:
+    """A message serialized once per wire format and shared by every recipient."""
+
+    __slots__ = ('message', '_encoded')
+
+    def __init__(self, message: Any):
+        self.message = message
+        self._encoded: Dict[str, Any] = {}
+
+    def prepare(self, encoding: str) -> Any:
+        """The wire payload for ``encoding``: str for JSON text frames, bytes for MessagePack.
+
+        JSON stays a text frame because browser clients parse ``event.data``
+        as a string, and ASGI only accepts text frames as ``str``; the server
+        UTF-8 encodes it on send. Clients that want one shared byte buffer on
+        the wire should negotiate MessagePack.
+        """
+        payload = self._encoded.get(encoding)
+        if payload is None:
+            if encoding == 'msgpack':
+                payload = packb(self.message)
+            else:
+                payload = dumps(self.message).decode('utf-8')
+            self._encoded[encoding] = payload
+        return payload
+
+async def send_encoded(websocket: WebSocket, message: EncodedMessage, encoding: str = 'json'):
+    payload = message.prepare(encoding)
+    if encoding == 'msgpack':
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+
+def negotiate_encoding(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """Pick a client's encoding from the 'msgpack' subprotocol or ?encoding=msgpack.
+
+    Returns the encoding and the subprotocol to accept (None for none).
+    """
+    if msgpack is None:
+        return 'json', None
+    if 'msgpack' in websocket.scope.get('subprotocols', ()):
+        return 'msgpack', 'msgpack'
+    if websocket.query_params.get('encoding') == 'msgpack':
+        return 'msgpack', None
+    return 'json', None
@@ -0,0 +1,334 @@
+from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import asyncio
+import threading
+import logging
+import random
+import time
+from .model_handle import ModelHandle
+from .model_monitoring import ModelMonitor
+
+logger = logging.getLogger(__name__)
+
+def shadow_model_id(model_id: str, version: Optional[str]) -> str:
+    """Model ID shadow predictions are stored under, kept apart from the live model's."""
+    return f"{model_id}@shadow:{version or 'unversioned'}"
+
+class TokenBucket:
+    """Thread-safe token bucket used to cap the shadow sampling rate."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+class ShadowTarget:
+    """Candidate model version evaluated in shadow against the active one."""
+
+    def __init__(
+        self,
+        model_id: str,
+        candidate: ModelHandle,
+        infer: Callable[[Any, np.ndarray], List[Dict[str, Any]]],
+        sample_rate: float,
+        max_per_second: float,
+        iou_threshold: float
+    ):
+        self.model_id = model_id
+        self.candidate = candidate
+        self.infer = infer
+        self.sample_rate = sample_rate
+        self.iou_threshold = iou_threshold
+        self.bucket = TokenBucket(max_per_second)
+        self.stats = {
+            'offered': 0,
+            'sampled': 0,
+            'rate_limited': 0,
+            'dropped': 0,
+            'evaluated': 0,
+            'errors': 0,
+            'agreement_sum': 0.0,
+            'active_latency_sum': 0.0,
+            'candidate_latency_sum': 0.0,
+            'count_diff_sum': 0.0
+        }
+
+class ShadowEvaluator:
+    """Runs candidate model versions on a sample of live frames.
+
+    Evaluation runs on a dedicated event loop thread with its own inference
+    executor, so the production path only pays for a sampling decision and,
+    for sampled frames, a frame copy.
+    """
+
+    def __init__(
+        self,
+        monitor: ModelMonitor,
+        session_factory: Callable[[], Any],
+        max_workers: int = 2,
+        max_pending: int = 8
+    ):
+        self.monitor = monitor
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.targets: Dict[str, ShadowTarget] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shadow')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def register(
+        self,
+        model_id: str,
+        candidate: ModelHandle,
+        infer: Callable[[Any, np.ndarray], List[Dict[str, Any]]],
+        sample_rate: float = 0.05,
+        max_per_second: float = 2.0,
+        iou_threshold: float = 0.5
+    ):
+        """Start shadowing a model with a candidate version."""
+        self.targets[model_id] = ShadowTarget(
+            model_id, candidate, infer, sample_rate, max_per_second, iou_threshold
+        )
+        self.start()
+
+    def unregister(self, model_id: str):
+        """Stop shadowing a model."""
+        self.targets.pop(model_id, None)
+
+    def start(self):
+        """Start the shadow evaluation loop if it is not running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='shadow-evaluator', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def stop(self):
+        """Stop the evaluation loop and its workers."""
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+
+    def offer(
+        self,
+        model_id: str,
+        frame: np.ndarray,
+        active_detections: List[Dict[str, Any]],
+        active_latency: float,
+        active_version: Optional[str] = None,
+        camera_id: Optional[Any] = None
+    ) -> bool:
+        """Offer a production frame for shadow evaluation; never blocks."""
+        target = self.targets.get(model_id)
+        # Read once: stop() may clear or close the loop while we are here
+        loop = self._loop
+        if target is None or loop is None or loop.is_closed():
+            return False
+
+        target.stats['offered'] += 1
+        if random.random() >= target.sample_rate:
+            return False
+        if not target.bucket.try_acquire():
+            target.stats['rate_limited'] += 1
+            return False
+
+        target.stats['sampled'] += 1
+        job = {
+            'target': target,
+            'frame': frame.copy(),
+            'active_detections': active_detections,
+            'active_latency': active_latency,
+            'active_version': active_version,
+            'camera_id': camera_id,
+            'timestamp': datetime.utcnow()
+        }
+        try:
+            loop.call_soon_threadsafe(self._enqueue, job)
+        except RuntimeError:
+            # The loop closed after the check above
+            target.stats['dropped'] += 1
+            return False
+        return True
+
+    def get_stats(self, model_id: str) -> Dict[str, Any]:
+        """Get running shadow comparison statistics for a model."""
+        target = self.targets.get(model_id)
+        if target is None:
+            return {}
+
+        stats = target.stats
+        evaluated = stats['evaluated'] or 1
+        return {
+            'model_id': model_id,
+            'candidate_version': target.candidate.version,
+            'offered': stats['offered'],
+            'sampled': stats['sampled'],
+            'rate_limited': stats['rate_limited'],
+            'dropped': stats['dropped'],
+            'evaluated': stats['evaluated'],
+            'errors': stats['errors'],
+            'mean_agreement': stats['agreement_sum'] / evaluated,
+            'mean_active_latency_ms': stats['active_latency_sum'] / evaluated * 1000,
+            'mean_candidate_latency_ms': stats['candidate_latency_sum'] / evaluated * 1000,
+            'mean_count_diff': stats['count_diff_sum'] / evaluated
+        }
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        for _ in range(self.max_workers):
+            self._loop.create_task(self._worker())
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    def _enqueue(self, job: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            job['target'].stats['dropped'] += 1
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            target = job['target']
+            try:
+                candidate_detections, candidate_latency, candidate_version = await loop.run_in_executor(
+                    self.executor, self._run_candidate, target, job['frame']
+                )
+                await self._record(job, candidate_detections, candidate_latency, candidate_version)
+            except Exception as e:
+                target.stats['errors'] += 1
+                logger.error(f"Error in shadow evaluation for model {target.model_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _run_candidate(self, target: ShadowTarget, frame: np.ndarray):
+        with target.candidate.lease() as model:
+            start_time = time.monotonic()
+            detections = target.infer(model, frame)
+            latency = time.monotonic() - start_time
+        return detections, latency, target.candidate.version
+
+    async def _record(
+        self,
+        job: Dict[str, Any],
+        candidate_detections: List[Dict[str, Any]],
+        candidate_latency: float,
+        candidate_version: Optional[str]
+    ):
+        target = job['target']
+        active_detections = job['active_detections']
+        agreement = self.detection_agreement(
+            active_detections, candidate_detections, target.iou_threshold
+        )
+
+        stats = target.stats
+        stats['evaluated'] += 1
+        stats['agreement_sum'] += agreement
+        stats['active_latency_sum'] += job['active_latency']
+        stats['candidate_latency_sum'] += candidate_latency
+        stats['count_diff_sum'] += len(candidate_detections) - len(active_detections)
+
+        db = self.session_factory()
+        try:
+            await self.monitor.log_prediction(
+                db,
+                shadow_model_id(target.model_id, candidate_version),
+                input_data={
+                    'camera_id': job['camera_id'],
+                    'frame_shape': list(job['frame'].shape)
+                },
+                prediction=self._serialize_detections(candidate_detections),
+                metadata={
+                    'shadow': True,
+                    'model_id': target.model_id,
+                    'active_version': job['active_version'],
+                    'candidate_version': candidate_version,
+                    'active_latency_ms': job['active_latency'] * 1000,
+                    'candidate_latency_ms': candidate_latency * 1000,
+                    'active_count': len(active_detections),
+                    'candidate_count': len(candidate_detections),
+                    'agreement': agreement,
+                    'frame_timestamp': job['timestamp'].isoformat()
+                }
+            )
+        finally:
+            db.close()
+
+    @staticmethod
+    def detection_agreement(
+        active: List[Dict[str, Any]],
+        candidate: List[Dict[str, Any]],
+        iou_threshold: float = 0.5
+    ) -> float:
+        """F1-style agreement between two detection sets using greedy same-class IoU matching."""
+        if not active and not candidate:
+            return 1.0
+        if not active or not candidate:
+            return 0.0
+
+        matched = 0
+        used = set()
+        for a in sorted(active, key=lambda d: d.get('confidence', 0), reverse=True):
+            best_iou, best_index = 0.0, None
+            for i, c in enumerate(candidate):
+                if i in used or c.get('class') != a.get('class'):
+                    continue
+                iou = ShadowEvaluator._iou(a['bbox'], c['bbox'])
+                if iou > best_iou:
+                    best_iou, best_index = iou, i
+            if best_index is not None and best_iou >= iou_threshold:
+                used.add(best_index)
+                matched += 1
+
+        return 2.0 * matched / (len(active) + len(candidate))
+
+    @staticmethod
+    def _iou(box1, box2) -> float:
+        """Intersection over union of two [x1, y1, x2, y2] boxes."""
+        x1 = max(box1[0], box2[0])
+        y1 = max(box1[1], box2[1])
+        x2 = min(box1[2], box2[2])
+        y2 = min(box1[3], box2[3])
+        intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
+        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+        union = area1 + area2 - intersection
+        return float(intersection / union) if union > 0 else 0.0
+
+    @staticmethod
+    def _serialize_detections(detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'class': d.get('class'),
+                'confidence': float(d.get('confidence', 0)),
+                'bbox': [float(v) for v in d['bbox']]
+            }
+            for d in detections
+        ]
@@ -1,9 +1,18 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 import cv2
+import torch
 from datetime import datetime
 import asyncio
+import threading
 from .vision_service import vision_service
+from .compute_executor import compute_executor
+from .analysis_scheduler import AnalysisScheduler, AnalysisTask
+from .preprocessing import TransformSpec
+from .frame_artifacts import frame_artifacts
+
+# Keypoint R-CNN takes float RGB in [0, 1], channels first
+POSE_INPUT = TransformSpec(color='rgb', scale=1.0 / 255.0, layout='chw')
 
 class ClassroomActivityProcessor:
     def __init__(self):
@@ -11,6 +20,9 @@ class ClassroomActivityProcessor:
         self.attention_history = {}
         self.activity_levels = {}
         self.last_processed = {}
+        # Cascade classifiers are not thread-safe, so each compute thread loads its own
+        self._local = threading.local()
+        self._activity_lock = threading.Lock()
 
     async def process_frame(self, camera_id: str, frame: np.ndarray):
         classroom_id = self.get_classroom_id(camera_id)
@@ -54,9 +66,14 @@ class ClassroomActivityProcessor:
         ]
 
     async def detect_faces(self, frame: np.ndarray) -> List[Dict]:
-        # Use vision service to detect faces
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return await compute_executor.run(self._detect_faces_sync, frame)
+
+    def _detect_faces_sync(self, frame: np.ndarray) -> List[Dict]:
+        face_cascade = getattr(self._local, 'face_cascade', None)
+        if face_cascade is None:
+            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self._local.face_cascade = face_cascade
+        gray = frame_artifacts(frame).gray
         faces = face_cascade.detectMultiScale(gray, 1.1, 4)
         
         return [{'x': x, 'y': y, 'w': w, 'h': h} for (x, y, w, h) in faces]
@@ -77,14 +94,17 @@ class ClassroomActivityProcessor:
         return sum(attention_scores) / len(attention_scores) * 100
 
     async def calculate_activity_level(self, frame: np.ndarray) -> float:
-        # Calculate activity level using frame differencing
-        if not hasattr(self, 'previous_frame'):
-            self.previous_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            return 0.0
+        return await compute_executor.run(self._calculate_activity_level_sync, frame)
 
-        current_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        frame_diff = cv2.absdiff(current_frame, self.previous_frame)
-        self.previous_frame = current_frame
+    def _calculate_activity_level_sync(self, frame: np.ndarray) -> float:
+        # Calculate activity level using frame differencing
+        current_frame = frame_artifacts(frame).gray
+        with self._activity_lock:
+            if not hasattr(self, 'previous_frame'):
+                self.previous_frame = current_frame
+                return 0.0
+            frame_diff = cv2.absdiff(current_frame, self.previous_frame)
+            self.previous_frame = current_frame
 
         # Calculate activity level as percentage of pixels with significant change
         activity_level = (np.count_nonzero(frame_diff > 30) / frame_diff.size) * 100
@@ -159,12 +179,14 @@ class EquipmentMonitorProcessor:
                     self.alerts.pop()
 
     async def analyze_equipment_status(self, frame: np.ndarray, equipment_id: str) -> Dict[str, Any]:
+        return await compute_executor.run(self._analyze_equipment_status_sync, frame, equipment_id)
+
+    def _analyze_equipment_status_sync(self, frame: np.ndarray, equipment_id: str) -> Dict[str, Any]:
         # Implement equipment-specific analysis
         # This is a placeholder - real implementation would use more sophisticated analysis
         
         # Simulate equipment analysis using image processing
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+        blur = frame_artifacts(frame).blurred(5)
         
         # Detect edges - could indicate equipment state
         edges = cv2.Canny(blur, 50, 150)
@@ -243,6 +265,19 @@ class SafetyMonitorProcessor:
         self.restricted_zones = []  # Will be configured via API
         self.required_ppe = {}  # Zone-specific PPE requirements
         
+        # Pose checks are time-critical; PPE checks can run less often
+        self.scheduler = AnalysisScheduler([
+            AnalysisTask('unsafe_behavior', lambda f, r: compute_executor.run(self.detect_unsafe_behavior, f),
+                         target_fps=10, priority=0, deadline=0.3, default=[]),
+            AnalysisTask('ppe_violations', lambda f, r: compute_executor.run(self.detect_ppe_violations, f, r['persons']),
+                         target_fps=2, priority=1, deadline=1.0, default=[])
+        ], name='safety')
+        
+    async def analyze(self, camera_id: str, frame: np.ndarray, persons: List[Dict],
+                      captured_at: Optional[float] = None) -> Dict[str, Any]:
+        """Run the safety checks due for this frame; late checks are dropped, not queued"""
+        return await self.scheduler.run(camera_id, frame, captured_at, inputs={'persons': persons})
+        
     def configure_zones(self, zones: List[Dict]):
         """Configure restricted zones and their PPE requirements"""
         self.restricted_zones = zones
@@ -320,8 +355,10 @@ class SafetyMonitorProcessor:
         
     def _detect_poses(self, frame: np.ndarray) -> List[Dict]:
         """Detect human poses in the frame"""
+        # Zero-copy view of a preallocated buffer, valid for this call
+        image = torch.from_numpy(frame_artifacts(frame).transformed('pose_model', POSE_INPUT))
         with torch.no_grad():
-            prediction = self.pose_model([torch.from_numpy(frame).permute(2, 0, 1)])
+            prediction = self.pose_model([image])
             
         poses = []
         for score, keypoints in zip(prediction[0]['scores'], prediction[0]['keypoints']):
@@ -1,11 +1,13 @@
 import cv2
 import numpy as np
 import torch
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Optional
 import asyncio
 import logging
 from datetime import datetime
 from .websocket_service import manager
+from .frame_tracing import frame_tracer, FrameContext
+from .compute_executor import compute_executor
 
 logger = logging.getLogger(__name__)
 
@@ -32,17 +34,28 @@ class VideoAnalyticsService:
             logger.error(f"Error initializing models: {str(e)}")
             raise
 
-    async def process_frame(self, frame: np.ndarray, module_type: str) -> Dict:
+    async def process_frame(
+        self, frame: np.ndarray, module_type: str, trace: Optional[FrameContext] = None
+    ) -> Dict:
         """Process a single frame based on module type"""
         if module_type not in self.processing_modules:
             raise ValueError(f"Unknown module type: {module_type}")
         
-        return await self.processing_modules[module_type](frame)
+        # Messages broadcast while processing carry the frame's trace
+        trace = trace or frame_tracer.current()
+        with frame_tracer.activate(trace):
+            results = await self.processing_modules[module_type](frame)
+        frame_tracer.record(trace, 'processed')
+        return results
+
+    def _infer(self, frame: np.ndarray):
+        """Run YOLOv5 on a compute thread and return detections as a DataFrame"""
+        with torch.no_grad():
+            return self.model(frame).pandas().xyxy[0]
 
     async def process_residential(self, frame: np.ndarray) -> Dict:
         """Process frame for residential module"""
-        results = self.model(frame)
-        detections = results.pandas().xyxy[0]
+        detections = await compute_executor.run(self._infer, frame)
         
         # Count people
         people_count = len(detections[detections['name'] == 'person'])
@@ -79,8 +92,7 @@ class VideoAnalyticsService:
 
     async def process_school(self, frame: np.ndarray) -> Dict:
         """Process frame for school module"""
-        results = self.model(frame)
-        detections = results.pandas().xyxy[0]
+        detections = await compute_executor.run(self._infer, frame)
         
         # Count students
         student_count = len(detections[detections['name'] == 'person'])
@@ -95,8 +107,7 @@ class VideoAnalyticsService:
 
     async def process_hospital(self, frame: np.ndarray) -> Dict:
         """Process frame for hospital module"""
-        results = self.model(frame)
-        detections = results.pandas().xyxy[0]
+        detections = await compute_executor.run(self._infer, frame)
         
         # Detect people and their poses
         people = detections[detections['name'] == 'person']
@@ -111,8 +122,7 @@ class VideoAnalyticsService:
 
     async def process_mine(self, frame: np.ndarray) -> Dict:
         """Process frame for mine site module"""
-        results = self.model(frame)
-        detections = results.pandas().xyxy[0]
+        detections = await compute_executor.run(self._infer, frame)
         
         # Detect vehicles and equipment
         vehicles = detections[detections['name'].isin(['truck', 'car'])]
@@ -123,8 +133,7 @@ class VideoAnalyticsService:
 
     async def process_traffic(self, frame: np.ndarray) -> Dict:
         """Process frame for traffic module"""
-        results = self.model(frame)
-        detections = results.pandas().xyxy[0]
+        detections = await compute_executor.run(self._infer, frame)
         
         # Count vehicles
         vehicles = detections[detections['name'].isin(['car', 'truck', 'bus', 'motorcycle'])]
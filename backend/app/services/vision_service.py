@@ -4,10 +4,16 @@ import torch
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 import asyncio
+import threading
 from collections import deque
 import tensorflow as tf
 from ..models.detection import YOLODetector
 from ..config import settings
+from .pipeline_metrics import pipeline_metrics
+from .analysis_scheduler import AnalysisScheduler, AnalysisTask
+from .frame_tracing import frame_tracer
+from .compute_executor import compute_executor
+from .frame_artifacts import frame_artifacts
 
 class VisionService:
     def __init__(self):
@@ -30,6 +36,11 @@ class VisionService:
         self.object_tracker = cv2.TrackerCSRT_create()
         self.tracked_objects = {}
         
+        # OpenCV nets and trackers are not safe for concurrent use from compute threads
+        self._face_lock = threading.Lock()
+        self._motion_lock = threading.Lock()
+        self._tracking_lock = threading.Lock()
+        
         # Initialize analytics storage
         self.analytics_buffer = {
             'detections': deque(maxlen=1000),
@@ -39,63 +50,84 @@ class VisionService:
         }
         
         # Performance metrics
-        self.fps_buffer = deque(maxlen=100)
+        self.fps_buffer = deque(maxlen=100)  # seconds between consecutive frames
+        self.last_frame_time = None
         self.processing_times = deque(maxlen=100)
         self.detection_counts = deque(maxlen=100)
         
-    async def process_frame(self, frame: np.ndarray) -> Dict:
-        """Process a single frame with all available analytics"""
+        # Each analysis runs at its own rate; work that would miss its deadline is dropped
+        self.scheduler = AnalysisScheduler([
+            AnalysisTask('detections', lambda f, r: self._detect_objects(f),
+                         target_fps=10, priority=0, deadline=0.2, default=[]),
+            AnalysisTask('tracked', lambda f, r: self._track_objects(f, r['detections']),
+                         target_fps=10, priority=0, deadline=0.25, default={}, requires=('detections',)),
+            AnalysisTask('safety_violations', lambda f, r: self._analyze_safety(f, r['detections'], r['tracked']),
+                         target_fps=10, priority=0, deadline=0.3, default=[], requires=('detections', 'tracked')),
+            AnalysisTask('motion', lambda f, r: self._analyze_motion(f),
+                         target_fps=5, priority=1, deadline=0.5, default={'activity_level': 0.0}),
+            AnalysisTask('faces', lambda f, r: self._detect_faces(f),
+                         target_fps=2, priority=2, deadline=1.0, default=[]),
+            AnalysisTask('emotions', lambda f, r: self._analyze_emotions(f, r['faces']),
+                         target_fps=1, priority=3, deadline=1.5, default=[], requires=('faces',))
+        ], name='vision')
+        for name, overrides in settings.ANALYSIS_SCHEDULE.items():
+            self.scheduler.configure(name, **overrides)
+        
+    async def process_frame(
+        self, frame: np.ndarray, camera_id: str = 'vision', captured_at: Optional[float] = None
+    ) -> Dict:
+        """Process a single frame with the analytics that are due for it"""
         start_time = datetime.now()
         
-        # Basic object detection
-        detections = await self._detect_objects(frame)
-        
-        # Face and emotion analysis
-        faces = await self._detect_faces(frame)
-        emotions = await self._analyze_emotions(frame, faces)
-        
-        # Motion and activity analysis
-        motion = await self._analyze_motion(frame)
+        # Track frame arrival intervals for FPS
+        if self.last_frame_time is not None:
+            self.fps_buffer.append((start_time - self.last_frame_time).total_seconds())
+        self.last_frame_time = start_time
         
-        # Track objects across frames
-        tracked = await self._track_objects(frame, detections)
+        if captured_at is None and frame_tracer.current() is not None:
+            captured_at = frame_tracer.current().captured_at
         
-        # Safety analysis
-        safety_violations = await self._analyze_safety(frame, detections, tracked)
+        with pipeline_metrics.time_stage(camera_id, 'inference'):
+            results = await self.scheduler.run(camera_id, frame, captured_at)
         
         # Calculate processing metrics
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         self.processing_times.append(processing_time)
         
-        # Update analytics buffer
-        self._update_analytics(detections, emotions, safety_violations)
+        # History only takes results produced on this frame, never carried-over ones
+        ran = results['_schedule']['ran']
+        fresh = {name: results[name] if name in ran else None
+                 for name in ('detections', 'emotions', 'safety_violations')}
+        self._update_analytics(fresh['detections'], fresh['emotions'], fresh['safety_violations'])
         
         return {
-            'detections': detections,
-            'faces': faces,
-            'emotions': emotions,
-            'motion': motion,
-            'tracked': tracked,
-            'safety_violations': safety_violations,
+            'detections': results['detections'],
+            'faces': results['faces'],
+            'emotions': results['emotions'],
+            'motion': results['motion'],
+            'tracked': results['tracked'],
+            'safety_violations': results['safety_violations'],
+            'schedule': results['_schedule'],
             'processing_time': processing_time,
             'analytics': self._get_analytics_summary()
         }
         
     async def _detect_objects(self, frame: np.ndarray) -> List[Dict]:
         """Detect objects in frame using YOLO"""
-        detections = self.yolo_detector.detect(frame)
+        detections = await compute_executor.run(self.yolo_detector.detect, frame)
         self.detection_counts.append(len(detections))
         return detections
         
     async def _detect_faces(self, frame: np.ndarray) -> List[Dict]:
         """Detect faces in frame"""
-        blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (300, 300)), 1.0,
-            (300, 300), (104.0, 177.0, 123.0)
-        )
-        self.face_detector.setInput(blob)
-        detections = self.face_detector.forward()
+        return await compute_executor.run(self._detect_faces_sync, frame)
+        
+    def _detect_faces_sync(self, frame: np.ndarray) -> List[Dict]:
+        blob = frame_artifacts(frame).blob300()
+        with self._face_lock:
+            self.face_detector.setInput(blob)
+            detections = self.face_detector.forward()
         
         faces = []
         for i in range(detections.shape[2]):
@@ -112,16 +144,21 @@ class VisionService:
         
     async def _analyze_emotions(self, frame: np.ndarray, faces: List[Dict]) -> List[Dict]:
         """Analyze emotions in detected faces"""
+        if not faces:
+            return []
+        return await compute_executor.run(self._analyze_emotions_sync, frame, faces)
+        
+    def _analyze_emotions_sync(self, frame: np.ndarray, faces: List[Dict]) -> List[Dict]:
+        gray = frame_artifacts(frame).gray
         emotions = []
         for face in faces:
             x1, y1, x2, y2 = face['bbox']
-            face_img = frame[y1:y2, x1:x2]
+            face_img = gray[y1:y2, x1:x2]
             if face_img.size == 0:
                 continue
                 
             # Preprocess for emotion detection
             face_img = cv2.resize(face_img, (48, 48))
-            face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
             face_img = np.expand_dims(face_img, axis=0)
             face_img = np.expand_dims(face_img, axis=-1)
             
@@ -140,22 +177,25 @@ class VisionService:
         
     async def _analyze_motion(self, frame: np.ndarray) -> Dict:
         """Analyze motion and activity levels"""
-        # Convert frame to grayscale for motion detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        return await compute_executor.run(self._analyze_motion_sync, frame)
+        
+    def _analyze_motion_sync(self, frame: np.ndarray) -> Dict:
+        # Blurred grayscale shared with the other processors of this frame
+        gray = frame_artifacts(frame).blurred(21)
         
-        # Compare with previous frame if available
-        if not hasattr(self, 'prev_frame'):
+        with self._motion_lock:
+            # Compare with previous frame if available
+            if not hasattr(self, 'prev_frame'):
+                self.prev_frame = gray
+                return {'activity_level': 0.0}
+                
+            # Calculate frame difference
+            frame_diff = cv2.absdiff(self.prev_frame, gray)
             self.prev_frame = gray
-            return {'activity_level': 0.0}
-            
-        # Calculate frame difference
-        frame_diff = cv2.absdiff(self.prev_frame, gray)
         thresh = cv2.threshold(frame_diff, 25, 255, cv2.THRESH_BINARY)[1]
         
         # Calculate activity level
         activity_level = np.sum(thresh > 0) / thresh.size
-        self.prev_frame = gray
         
         return {
             'activity_level': float(activity_level),
@@ -166,6 +206,13 @@ class VisionService:
     async def _track_objects(self, frame: np.ndarray, 
                            detections: List[Dict]) -> Dict[str, Dict]:
         """Track detected objects across frames"""
+        return await compute_executor.run(self._track_objects_sync, frame, detections)
+        
+    def _track_objects_sync(self, frame: np.ndarray, detections: List[Dict]) -> Dict[str, Dict]:
+        with self._tracking_lock:
+            return self._update_trackers(frame, detections)
+        
+    def _update_trackers(self, frame: np.ndarray, detections: List[Dict]) -> Dict[str, Dict]:
         current_objects = {}
         
         # Update existing trackers
@@ -215,24 +262,28 @@ class VisionService:
                         
         return violations
         
-    def _update_analytics(self, detections: List[Dict],
-                         emotions: List[Dict],
-                         violations: List[Dict]):
-        """Update analytics buffer with new data"""
+    def _update_analytics(self, detections: Optional[List[Dict]],
+                         emotions: Optional[List[Dict]],
+                         violations: Optional[List[Dict]]):
+        """Update analytics buffer with new data; None means not produced for this frame"""
         timestamp = datetime.now().isoformat()
         
-        self.analytics_buffer['detections'].append({
-            'timestamp': timestamp,
-            'count': len(detections),
-            'classes': {cls: sum(1 for d in detections if d['class'] == cls)
-                       for cls in set(d['class'] for d in detections)}
-        })
+        if detections is not None:
+            self.analytics_buffer['detections'].append({
+                'timestamp': timestamp,
+                'count': len(detections),
+                'classes': {cls: sum(1 for d in detections if d['class'] == cls)
+                           for cls in set(d['class'] for d in detections)}
+            })
         
-        self.analytics_buffer['emotions'].append({
-            'timestamp': timestamp,
-            'emotions': {e['emotion']: e['confidence'] for e in emotions}
-        })
+        if emotions is not None:
+            self.analytics_buffer['emotions'].append({
+                'timestamp': timestamp,
+                'emotions': {e['emotion']: e['confidence'] for e in emotions}
+            })
         
+        if violations is None:
+            return
         self.analytics_buffer['violations'].append({
             'timestamp': timestamp,
             'count': len(violations),
@@ -246,7 +297,7 @@ class VisionService:
         
         return {
             'performance': {
-                'fps': len(self.fps_buffer) / sum(self.fps_buffer) if self.fps_buffer else 0,
+                'fps': len(self.fps_buffer) / sum(self.fps_buffer) if sum(self.fps_buffer) > 0 else 0,
                 'avg_processing_time': sum(self.processing_times) / len(self.processing_times) if self.processing_times else 0,
                 'detection_rate': sum(self.detection_counts) / len(self.detection_counts) if self.detection_counts else 0
             },
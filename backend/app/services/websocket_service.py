@@ -2,38 +2,42 @@ from fastapi import WebSocket, WebSocketDisconnect
 from typing import Dict, List
 import json
 import logging
+from .frame_tracing import frame_tracer
+from .broadcast_hub import BroadcastHub
+from .serialization import EncodedMessage, send_encoded, negotiate_encoding
 
 logger = logging.getLogger(__name__)
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        # Each socket gets its own bounded send queue and writer task
+        self.hub = BroadcastHub('modules')
+
+    @property
+    def active_connections(self) -> Dict[str, List[WebSocket]]:
+        return {module: self.hub.members(module) for module in self.hub.groups}
 
     async def connect(self, websocket: WebSocket, module: str):
-        await websocket.accept()
-        if module not in self.active_connections:
-            self.active_connections[module] = []
-        self.active_connections[module].append(websocket)
+        # JSON by default; clients may ask for MessagePack
+        encoding, subprotocol = negotiate_encoding(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        self.hub.add(websocket, module, encoding)
         logger.info(f"Client connected to module: {module}")
 
     def disconnect(self, websocket: WebSocket, module: str):
-        if module in self.active_connections:
-            self.active_connections[module].remove(websocket)
+        if self.hub.remove(websocket, module):
             logger.info(f"Client disconnected from module: {module}")
 
     async def broadcast_to_module(self, message: dict, module: str):
-        if module in self.active_connections:
-            for connection in self.active_connections[module]:
-                try:
-                    await connection.send_json(message)
-                except WebSocketDisconnect:
-                    await self.disconnect(connection, module)
-                except Exception as e:
-                    logger.error(f"Error broadcasting message: {str(e)}")
+        # Only enqueues; writer tasks do the sending, so slow clients delay no one
+        frame_tracer.stamp(message)
+        self.hub.publish(module, message)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         try:
-            await websocket.send_json(message)
+            frame_tracer.stamp(message)
+            if not self.hub.send_to(websocket, message):
+                await send_encoded(websocket, EncodedMessage(message))
         except Exception as e:
             logger.error(f"Error sending personal message: {str(e)}")
 
@@ -1,8 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, JSONResponse
 from pathlib import Path
 import uvicorn
+from app.services.pipeline_metrics import pipeline_metrics
+from app.services.readiness import readiness
+from app.services.overload_controller import overload_controller
+from app.services.compute_executor import compute_executor
 
 app = FastAPI(
     title="Visioncave API",
@@ -26,6 +31,10 @@ Path("models").mkdir(exist_ok=True)
 # Mount static files
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+@app.on_event("shutdown")
+async def shutdown_compute():
+    compute_executor.shutdown(wait=False)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Visioncave API"}
@@ -34,5 +43,24 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe; 503 when capture, inference, Kafka or DB writes are lagging"""
+    report = readiness.check()
+    return JSONResponse(report, status_code=200 if report['ready'] else 503)
+
+@app.get("/overload")
+async def overload_state():
+    """Current per-camera degradation levels and recent controller decisions"""
+    return overload_controller.get_state()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint for pipeline stage latencies, queues and FPS"""
+    return PlainTextResponse(
+        pipeline_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('pydantic_settings')
+
+from app.services.broadcast_hub import BroadcastHub
+
+class FakeSocket:
+    """Records sent messages; a stalled socket never completes a send."""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, payload):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(payload)
+
+    async def send_bytes(self, payload):
+        await self.send_text(payload)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+def test_slow_consumer_is_evicted_without_delaying_a_fast_one():
+    async def scenario():
+        hub = BroadcastHub('test-slow', queue_size=4, overflow='drop_oldest', max_drops=3, send_timeout=30)
+        fast, slow = FakeSocket(), FakeSocket(stalled=True)
+        hub.add(fast, 'camera')
+        hub.add(slow, 'camera')
+        # Frames arrive spaced out, as from a camera, so the fast client keeps up
+        for seq in range(10):
+            hub.publish('camera', {'seq': seq})
+            await asyncio.sleep(0.005)
+        return hub, fast, slow
+
+    hub, fast, slow = asyncio.run(scenario())
+    assert len(fast.sent) == 10
+    assert slow.sent == []
+    assert slow.close_code == 1013
+    assert hub.members('camera') == [fast]
+    assert hub._counts[('camera', 'evicted_slow_consumer')] == 1
+    assert hub._counts[('camera', 'dropped')] == 3
+
+def test_stalled_send_is_evicted_after_the_timeout():
+    async def scenario():
+        hub = BroadcastHub('test-timeout', queue_size=4, send_timeout=0.05)
+        stalled = FakeSocket(stalled=True)
+        hub.add(stalled, 'camera')
+        hub.publish('camera', {'seq': 0})
+        await asyncio.sleep(0.2)
+        return hub, stalled
+
+    hub, stalled = asyncio.run(scenario())
+    assert stalled.close_code == 1013
+    assert hub.members('camera') == []
+    assert hub._counts[('camera', 'evicted_send_timeout')] == 1
+
+def test_evict_policy_closes_a_client_with_a_full_queue():
+    async def scenario():
+        hub = BroadcastHub('test-evict', queue_size=1, overflow='evict', send_timeout=30)
+        stalled = FakeSocket(stalled=True)
+        hub.add(stalled, 'camera')
+        # The first message is taken by the writer, the second fills the queue
+        accepted = []
+        for seq in range(3):
+            accepted.append(hub.publish('camera', {'seq': seq}))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        return hub, stalled, accepted
+
+    hub, stalled, accepted = asyncio.run(scenario())
+    assert accepted == [1, 1, 0]
+    assert stalled.close_code == 1013
+    assert hub.members('camera') == []
+    assert hub._counts[('camera', 'evicted_queue_full')] == 1
@@ -0,0 +1,83 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip('pydantic_settings')
+
+from app.services.fair_scheduler import FairShareScheduler
+
+def _scheduler(**kwargs) -> FairShareScheduler:
+    options = {'workers': 1, 'default_weight': 1.0, 'max_queue': 64, 'max_inflight': 0, 'tenant_weights': {}}
+    options.update(kwargs)
+    return FairShareScheduler(**options)
+
+def _hold_worker(scheduler: FairShareScheduler, owner: str = 'gate'):
+    """Occupy a worker until the returned event is set, so jobs queue up behind it."""
+    release, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit(owner, hold)
+    assert started.wait(5)
+    return release
+
+def test_owners_share_one_worker_by_weight():
+    scheduler = _scheduler(tenant_weights={'light': 1.0, 'heavy': 3.0})
+    order = []
+
+    def job(owner):
+        time.sleep(0.005)
+        order.append(owner)
+
+    try:
+        release = _hold_worker(scheduler)
+        futures = [scheduler.submit(owner, job, owner) for _ in range(20) for owner in ('light', 'heavy')]
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        scheduler.stop()
+
+    # While both owners have work queued, 'heavy' gets three turns for each of 'light''s
+    first = order[:16]
+    assert first.count('heavy') >= 11
+    assert first.count('light') >= 3
+
+def test_full_queue_sheds_the_oldest_lowest_priority_job():
+    scheduler = _scheduler(max_queue=2)
+    try:
+        release = _hold_worker(scheduler)
+        oldest = scheduler.submit('owner', lambda: 'oldest', priority=1)
+        newer = scheduler.submit('owner', lambda: 'newer', priority=1)
+        urgent = scheduler.submit('owner', lambda: 'urgent', priority=0)
+        release.set()
+
+        assert oldest.cancelled()
+        assert newer.result(timeout=5) == 'newer'
+        assert urgent.result(timeout=5) == 'urgent'
+        assert scheduler.get_stats()['owner']['dropped'] == 1
+    finally:
+        scheduler.stop()
+
+def test_inflight_cap_leaves_workers_for_other_owners():
+    scheduler = _scheduler(workers=2)
+    scheduler.configure_tenant('busy', max_inflight=1)
+    release = threading.Event()
+    try:
+        first = scheduler.submit('busy', release.wait, 5)
+        second = scheduler.submit('busy', lambda: 'second')
+        other = scheduler.submit('other', lambda: 'other')
+
+        # The second worker serves 'other' rather than a second 'busy' job
+        assert other.result(timeout=5) == 'other'
+        assert not second.done()
+        assert scheduler.get_stats()['busy']['inflight'] == 1
+
+        release.set()
+        assert first.result(timeout=5) is True
+        assert second.result(timeout=5) == 'second'
+    finally:
+        release.set()
+        scheduler.stop()
@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+from app.services.frame_ingest import FrameSubmission, LatestFrameSlot
+from app.services.pipeline_metrics import pipeline_metrics
+
+def _submission(camera_id: str, seq: int) -> FrameSubmission:
+    return FrameSubmission('vision', b'jpeg', 'jpeg', SimpleNamespace(camera_id=camera_id), seq)
+
+def _superseded_drops(camera_id: str) -> float:
+    sample = f'visioncave_frames_dropped_total{{camera="{camera_id}",reason="superseded"}}'
+    for line in pipeline_metrics.render_prometheus().splitlines():
+        if line.startswith(sample):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+def test_get_returns_the_newest_frame_and_counts_the_rest():
+    async def scenario():
+        slot = LatestFrameSlot()
+        for seq in range(5):
+            slot.put(_submission('ingest-newest', seq))
+        return slot, await slot.get()
+
+    slot, submission = asyncio.run(scenario())
+    assert submission.client_seq == 4
+    assert slot.superseded == 4
+    assert _superseded_drops('ingest-newest') == 4
+
+def test_frames_taken_before_the_next_arrives_are_not_superseded():
+    async def scenario():
+        slot = LatestFrameSlot()
+        taken = []
+        for seq in range(3):
+            slot.put(_submission('ingest-taken', seq))
+            taken.append((await slot.get()).client_seq)
+        return slot, taken
+
+    slot, taken = asyncio.run(scenario())
+    assert taken == [0, 1, 2]
+    assert slot.superseded == 0
+    assert _superseded_drops('ingest-taken') == 0
+
+def test_get_waits_for_a_frame():
+    async def scenario():
+        slot = LatestFrameSlot()
+        waiter = asyncio.create_task(slot.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        slot.put(_submission('ingest-wait', 1))
+        return await asyncio.wait_for(waiter, 1.0)
+
+    assert asyncio.run(scenario()).client_seq == 1
+
+def test_consumer_only_sees_the_latest_of_each_burst():
+    async def scenario():
+        slot = LatestFrameSlot()
+        seen = []
+        for burst in range(3):
+            for seq in range(burst * 10, burst * 10 + 10):
+                slot.put(_submission('ingest-burst', seq))
+            seen.append((await slot.get()).client_seq)
+        return slot, seen
+
+    slot, seen = asyncio.run(scenario())
+    assert seen == [9, 19, 29]
+    assert slot.superseded == 27
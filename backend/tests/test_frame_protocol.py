@@ -0,0 +1,66 @@
+import pytest
+from app.services.frame_protocol import (
+    HEADER, MAGIC, VERSION, FrameProtocolError, decode_message, encode_message
+)
+
+def test_round_trip_keeps_header_and_payload():
+    message = encode_message(b'\xff\xd8jpeg', 'vision', 42, timestamp=1700000000.25, camera_id='cam-1')
+    header, payload = decode_message(message)
+
+    assert header.type == 'video_frame'
+    assert header.module == 'vision'
+    assert header.seq == 42
+    assert header.timestamp == 1700000000.25
+    assert header.camera_id == 'cam-1'
+    assert bytes(payload) == b'\xff\xd8jpeg'
+
+def test_payload_is_a_view_into_the_message():
+    message = bytearray(encode_message(b'abc', 'vision', 1))
+    _, payload = decode_message(message)
+    message[-1:] = b'z'
+    assert bytes(payload) == b'abz'
+
+def test_missing_timestamp_and_camera_decode_as_none():
+    header, _ = decode_message(encode_message(b'', 'vision', 7))
+    assert header.timestamp is None
+    assert header.camera_id is None
+
+def test_sequence_wraps_to_32_bits():
+    header, _ = decode_message(encode_message(b'', 'vision', 2 ** 32 + 5))
+    assert header.seq == 5
+
+def test_unicode_names_round_trip():
+    header, _ = decode_message(encode_message(b'', 'sécurité', 1, camera_id='caméra'))
+    assert header.module == 'sécurité'
+    assert header.camera_id == 'caméra'
+
+@pytest.mark.parametrize('length', [0, 1, HEADER.size - 1])
+def test_message_shorter_than_header_is_rejected(length):
+    message = encode_message(b'payload', 'vision', 1)
+    with pytest.raises(FrameProtocolError):
+        decode_message(message[:length])
+
+def test_lengths_past_the_end_are_rejected():
+    # Header claims a module and camera id that were cut off
+    message = encode_message(b'', 'vision', 1, camera_id='cam-1')
+    with pytest.raises(FrameProtocolError):
+        decode_message(message[:HEADER.size + 3])
+
+def test_bad_magic_is_rejected():
+    message = b'XX' + encode_message(b'', 'vision', 1)[2:]
+    with pytest.raises(FrameProtocolError):
+        decode_message(message)
+
+def test_unsupported_version_is_rejected():
+    message = HEADER.pack(MAGIC, VERSION + 1, 1, 1, 0.0, 0, 0)
+    with pytest.raises(FrameProtocolError):
+        decode_message(message)
+
+def test_unknown_message_type_is_rejected():
+    message = HEADER.pack(MAGIC, VERSION, 99, 1, 0.0, 0, 0)
+    with pytest.raises(FrameProtocolError):
+        decode_message(message)
+
+def test_protocol_errors_are_value_errors():
+    with pytest.raises(ValueError):
+        decode_message(b'')
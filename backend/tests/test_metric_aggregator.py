@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from app.services.metric_aggregator import align_timestamp, plan_rollup_ranges
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = [MINUTE, HOUR, DAY]
+
+def test_align_timestamp_down_and_up():
+    timestamp = datetime(2024, 1, 1, 10, 17, 45)
+    assert align_timestamp(timestamp, HOUR) == datetime(2024, 1, 1, 10)
+    assert align_timestamp(timestamp, HOUR, ceil=True) == datetime(2024, 1, 1, 11)
+    assert align_timestamp(datetime(2024, 1, 1, 10), HOUR, ceil=True) == datetime(2024, 1, 1, 10)
+
+def test_empty_or_inverted_range_plans_nothing():
+    start = datetime(2024, 1, 1)
+    assert plan_rollup_ranges(start, start, RESOLUTIONS) == []
+    assert plan_rollup_ranges(start, start - timedelta(hours=1), RESOLUTIONS) == []
+    assert plan_rollup_ranges(start, start + timedelta(hours=1), []) == []
+
+def test_whole_days_read_only_the_day_rollup():
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 3)
+    assert plan_rollup_ranges(start, end, RESOLUTIONS) == [(DAY, start, end)]
+
+def test_ragged_edges_fall_back_to_finer_rollups():
+    start, end = datetime(2024, 1, 1, 22, 30), datetime(2024, 1, 3, 1, 15)
+    assert plan_rollup_ranges(start, end, RESOLUTIONS) == [
+        (MINUTE, datetime(2024, 1, 1, 22, 30), datetime(2024, 1, 1, 23)),
+        (HOUR, datetime(2024, 1, 1, 23), datetime(2024, 1, 2)),
+        (DAY, datetime(2024, 1, 2), datetime(2024, 1, 3)),
+        (HOUR, datetime(2024, 1, 3), datetime(2024, 1, 3, 1)),
+        (MINUTE, datetime(2024, 1, 3, 1), datetime(2024, 1, 3, 1, 15))
+    ]
+
+def test_range_shorter_than_a_coarse_bucket_uses_finer_ones():
+    start, end = datetime(2024, 1, 1, 10, 5), datetime(2024, 1, 1, 12, 10)
+    assert plan_rollup_ranges(start, end, RESOLUTIONS) == [
+        (MINUTE, datetime(2024, 1, 1, 10, 5), datetime(2024, 1, 1, 11)),
+        (HOUR, datetime(2024, 1, 1, 11), datetime(2024, 1, 1, 12)),
+        (MINUTE, datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 12, 10))
+    ]
+
+def test_finest_level_includes_the_partially_covered_first_bucket():
+    start, end = datetime(2024, 1, 1, 10, 0, 30), datetime(2024, 1, 1, 10, 5)
+    assert plan_rollup_ranges(start, end, RESOLUTIONS) == [(MINUTE, datetime(2024, 1, 1, 10), end)]
+
+def test_resolution_order_does_not_matter():
+    start, end = datetime(2024, 1, 1, 22, 30), datetime(2024, 1, 3, 1, 15)
+    assert plan_rollup_ranges(start, end, [DAY, MINUTE, HOUR]) == plan_rollup_ranges(start, end, RESOLUTIONS)
+
+@pytest.mark.parametrize('start, end', [
+    (datetime(2024, 1, 1, 0, 0, 1), datetime(2024, 3, 1, 23, 59, 59)),
+    (datetime(2024, 2, 28, 23, 59), datetime(2024, 3, 1, 0, 1)),
+    (datetime(2024, 1, 1, 5, 30), datetime(2024, 1, 1, 5, 31))
+])
+def test_ranges_are_contiguous_and_at_most_one_per_level_and_edge(start, end):
+    plan = plan_rollup_ranges(start, end, RESOLUTIONS)
+    assert plan[0][1] == align_timestamp(start, MINUTE)
+    assert plan[-1][2] == end
+    for (_, _, previous_end), (_, next_start, _) in zip(plan, plan[1:]):
+        assert previous_end == next_start
+    assert len(plan) <= 2 * len(RESOLUTIONS) - 1
@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip('pydantic_settings')
+
+from app.services.overload_controller import OverloadController, DEGRADATION_LEVELS
+from app.services.pipeline_metrics import PipelineMetrics
+
+@pytest.fixture
+def controller():
+    metrics = PipelineMetrics()
+    controller = OverloadController(metrics, target_latency=0.5, restore_ratio=0.6, interval=60, cooldown_ticks=0)
+    controller.register_camera('lobby', {'module': 'residential', 'frameRate': 10})
+    controller.register_camera('ward', {'module': 'hospital', 'frameRate': 10})
+    yield controller
+    controller.stop()
+
+def _tick(controller: OverloadController, latency: float):
+    """Run one control step after a frame with the given queue wait."""
+    controller.metrics.observe_stage('lobby', 'queue_wait', latency)
+    controller.tick()
+
+def _levels(controller: OverloadController):
+    cameras = controller.get_state()['cameras']
+    return cameras['lobby']['level'], cameras['ward']['level']
+
+def test_degrades_by_priority_and_restores_critical_cameras_first(controller):
+    bottom = len(DEGRADATION_LEVELS) - 1
+    for step in range(bottom):
+        _tick(controller, 1.0)
+        assert _levels(controller) == (step + 1, 0)
+
+    # The residential camera is at the bottom of the ladder; the hospital one goes next
+    _tick(controller, 1.0)
+    assert _levels(controller) == (bottom, 1)
+
+    # Between the restore threshold and the target nothing changes
+    _tick(controller, 0.4)
+    assert _levels(controller) == (bottom, 1)
+
+    _tick(controller, 0.1)
+    assert _levels(controller) == (bottom, 0)
+    _tick(controller, 0.1)
+    assert _levels(controller) == (bottom - 1, 0)
+    assert controller.actions == {'degrade': bottom + 1, 'restore': 2}
+
+def test_cooldown_skips_steps_after_a_change(controller):
+    controller.cooldown_ticks = 2
+    for _ in range(3):
+        _tick(controller, 1.0)
+    assert _levels(controller) == (1, 0)
+    _tick(controller, 1.0)
+    assert _levels(controller) == (2, 0)
+
+def test_degraded_camera_skips_frames_and_downscales(controller):
+    assert controller.should_process('lobby') and controller.should_process('lobby')
+    for _ in range(2):
+        _tick(controller, 1.0)
+
+    fps_scale, resolution_scale = DEGRADATION_LEVELS[2]
+    assert controller.resolution_scale('lobby') == resolution_scale
+    # At 10 fps scaled by 0.5 the gate admits one frame per 0.2s
+    assert fps_scale == 0.5
+    assert controller.should_process('lobby')
+    assert not controller.should_process('lobby')
+    assert controller.resolution_scale('ward') == 1.0
@@ -0,0 +1,75 @@
+from datetime import datetime
+from types import SimpleNamespace
+import json
+import numpy as np
+import pytest
+
+pytest.importorskip('fastapi')
+
+from app.services import serialization
+from app.services.serialization import EncodedMessage, dumps, negotiate_encoding
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Run a test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == 'orjson':
+        if serialization.orjson is None:
+            pytest.skip('orjson is not installed')
+    else:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+def test_numpy_arrays_and_scalars(encoder):
+    message = {
+        'boxes': np.arange(6, dtype=np.float32).reshape(2, 3),
+        'count': np.int64(2),
+        'score': np.float32(0.5),
+        'flag': np.bool_(True)
+    }
+    assert json.loads(dumps(message)) == {
+        'boxes': [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]], 'count': 2, 'score': 0.5, 'flag': True
+    }
+
+def test_non_contiguous_arrays(encoder):
+    array = np.arange(12, dtype=np.int32).reshape(3, 4)
+    assert json.loads(dumps({'columns': array[:, ::2], 'transposed': array.T})) == {
+        'columns': array[:, ::2].tolist(), 'transposed': array.T.tolist()
+    }
+
+def test_numpy_dict_keys(encoder):
+    message = {np.int64(3): 1, 'nested': [{np.int32(7): {np.str_('zone'): np.float64(0.25)}}]}
+    assert json.loads(dumps(message)) == {'3': 1, 'nested': [{'7': {'zone': 0.25}}]}
+
+def test_datetimes_sets_and_tuples(encoder):
+    message = {'at': datetime(2024, 1, 2, 3, 4, 5), 'ids': {1}, 'point': (1, 2)}
+    assert json.loads(dumps(message)) == {'at': '2024-01-02T03:04:05', 'ids': [1], 'point': [1, 2]}
+
+def test_unserializable_values_raise_type_error(encoder):
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip('msgpack')
+    message = {'boxes': np.ones((2, 2), dtype=np.uint8), np.int64(4): np.float32(1.5)}
+    payload = EncodedMessage(message).prepare('msgpack')
+    assert msgpack.unpackb(payload, strict_map_key=False) == {'boxes': [[1, 1], [1, 1]], 4: 1.5}
+
+def test_encoded_message_is_serialized_once_per_encoding():
+    encoded = EncodedMessage({'value': np.arange(3)})
+    text = encoded.prepare('json')
+    assert isinstance(text, str)
+    assert encoded.prepare('json') is text
+    assert json.loads(text) == {'value': [0, 1, 2]}
+
+def _websocket(subprotocols=(), query=None):
+    return SimpleNamespace(scope={'subprotocols': list(subprotocols)}, query_params=query or {})
+
+def test_negotiate_encoding(monkeypatch):
+    monkeypatch.setattr(serialization, 'msgpack', object())
+    assert negotiate_encoding(_websocket()) == ('json', None)
+    assert negotiate_encoding(_websocket(['msgpack'])) == ('msgpack', 'msgpack')
+    assert negotiate_encoding(_websocket(query={'encoding': 'msgpack'})) == ('msgpack', None)
+
+def test_negotiate_encoding_without_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, 'msgpack', None)
+    assert negotiate_encoding(_websocket(['msgpack'])) == ('json', None)